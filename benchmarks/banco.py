@@ -0,0 +1,225 @@
+"""
+Benchmark das leituras de modules/database.py contra um Postgres local.
+
+Sobe um Postgres descartável (initdb + pg_ctl numa pasta temporária, sem fsync),
+cria o esquema com o init_db do app e carrega, para cada escala, um usuário
+sintético com benchmarks/gerar_dados.py (~N lançamentos e volumes
+proporcionais de cartão e investimentos). Depois cronometra cada loader:
+
+  frio   o cache do Streamlit é limpo antes de cada chamada (.clear()), então
+         toda chamada vai ao banco (o cache de páginas do Postgres fica quente);
+  quente o resultado já está no cache (st.cache_data ou, nos loaders de
+         DataFrame, o cache compartilhado; só para loaders em cache).
+
+Relata p50/p95 (ms), linhas devolvidas e linhas/s por loader e escala.
+
+Uso:
+    python benchmarks/banco.py [--escalas 1000 100000 1000000] [--repeticoes 20]
+    python benchmarks/banco.py --dsn postgresql://... # banco já existente (vazio, de testes)
+
+Precisa dos binários do Postgres (initdb, pg_ctl) no PATH ou em
+/usr/lib/postgresql/*/bin quando --dsn não é informado.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import psycopg2
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from benchmarks import gerar_dados  # noqa: E402
+
+ESCALAS_PADRAO = [1_000, 100_000, 1_000_000]
+ANOS = 5
+PORTA_PADRAO = 55432
+
+# ==============================================================================
+# 🐘 POSTGRES DESCARTÁVEL
+# ==============================================================================
+
+def _binario(nome):
+    caminho = shutil.which(nome)
+    if caminho:
+        return caminho
+    candidatos = sorted(glob.glob(f"/usr/lib/postgresql/*/bin/{nome}"))
+    if not candidatos:
+        sys.exit(f"{nome} não encontrado: instale o Postgres ou use --dsn")
+    return candidatos[-1]
+
+
+@contextmanager
+def postgres_temporario(porta=PORTA_PADRAO):
+    """Cluster Postgres numa pasta temporária (socket na própria pasta). Devolve o DSN."""
+    with tempfile.TemporaryDirectory(prefix="financas-pg-") as pasta:
+        dados = os.path.join(pasta, "dados")
+        subprocess.run([_binario("initdb"), "-D", dados, "-U", "bench", "--auth=trust", "-E", "UTF8"],
+                       check=True, capture_output=True)
+        opcoes = (f"-p {porta} -k {pasta} -c listen_addresses='' -c fsync=off "
+                  f"-c synchronous_commit=off -c full_page_writes=off -c shared_buffers=256MB")
+        subprocess.run([_binario("pg_ctl"), "-D", dados, "-o", opcoes, "-l", os.path.join(pasta, "log"),
+                        "-w", "start"], check=True, capture_output=True)
+        try:
+            conn = psycopg2.connect(host=pasta, port=porta, user="bench", dbname="postgres")
+            conn.autocommit = True
+            conn.cursor().execute("CREATE DATABASE bench")
+            conn.close()
+            yield f"postgresql://bench@/bench?host={pasta}&port={porta}"
+        finally:
+            subprocess.run([_binario("pg_ctl"), "-D", dados, "-m", "fast", "stop"], capture_output=True)
+
+# ==============================================================================
+# 📦 CARGA POR ESCALA
+# ==============================================================================
+
+def carregar_escala(dsn, linhas, limpar):
+    """Um usuário com ~`linhas` lançamentos; devolve os parâmetros de cada loader."""
+    meses = ANOS * 12
+    escala = linhas / (gerar_dados.PERFIL["lancamentos_mes"] * meses)
+    prefixo = f"escala{linhas}_"
+    inicio = time.perf_counter()
+    totais = gerar_dados.gerar(dsn, 1, ANOS, seed=linhas, escala=escala, lote=1, limpar=limpar,
+                               prefixo=prefixo, verboso=False)
+    print(f"Escala {linhas:,}: {sum(totais.values()):,} linhas carregadas em {time.perf_counter() - inicio:.1f} s")
+
+    conn = psycopg2.connect(dsn)
+    c = conn.cursor()
+    c.execute("SELECT id FROM users WHERE username = %s", (f"{prefixo}000000",))
+    user_id = c.fetchone()[0]
+    c.execute("""
+        SELECT cartao_id, mes_fatura FROM lancamentos_cartao WHERE user_id = %s
+        GROUP BY cartao_id, mes_fatura ORDER BY COUNT(*) DESC LIMIT 1
+    """, (user_id,))
+    cartao_id, mes_fatura = c.fetchone()
+    c.execute("SELECT id FROM reservas WHERE user_id = %s ORDER BY id LIMIT 1", (user_id,))
+    reserva_id = c.fetchone()[0]
+    # Sessão válida garantida (as geradas podem já ter expirado)
+    token = str(uuid.uuid4())
+    c.execute("INSERT INTO sessions (token, user_id, expires_at) VALUES (%s, %s, NOW() + INTERVAL '30 days')",
+              (token, user_id))
+    conn.commit()
+    c.execute("SELECT ano, mes FROM metas WHERE user_id = %s ORDER BY ano DESC, mes DESC LIMIT 1", (user_id,))
+    ano, mes = c.fetchone()
+    conn.close()
+    return {
+        "user_id": user_id,
+        "totais": totais,
+        "chamadas": {
+            "carregar_dados": (user_id,),
+            "carregar_fatura": (user_id, cartao_id, str(mes_fatura)),
+            "buscar_historico_compras": (user_id, cartao_id),
+            "carregar_extrato_reserva": (user_id, reserva_id),
+            "buscar_metas_saldo_restante": (user_id, mes, ano),
+            "validar_sessao": (token,),
+        },
+    }
+
+# ==============================================================================
+# ⏱️ MEDIÇÃO
+# ==============================================================================
+
+def _linhas(resultado):
+    if isinstance(resultado, tuple):  # carregar_extrato_reserva -> (df, tem_mais)
+        resultado = resultado[0]
+    if resultado is None:
+        return 0
+    return len(resultado) if hasattr(resultado, "__len__") and not isinstance(resultado, dict) else 1
+
+
+def _percentil(ordenados, p):
+    return ordenados[min(len(ordenados) - 1, int(round(p * (len(ordenados) - 1))))]
+
+
+def _resumo(tempos, linhas):
+    ordenados = sorted(tempos)
+    p50 = statistics.median(ordenados)
+    return {
+        "p50_ms": p50 * 1000, "p95_ms": _percentil(ordenados, 0.95) * 1000,
+        "linhas": linhas, "linhas_por_s": linhas / p50 if p50 > 0 and linhas else None,
+        "amostras": len(tempos),
+    }
+
+
+def medir_loader(funcao, args, repeticoes):
+    """{"frio": ..., "quente": ...} (quente só quando a função tem cache)."""
+    em_cache = hasattr(funcao, "clear")
+    tempos, linhas = [], 0
+    for _ in range(repeticoes):
+        if em_cache:
+            funcao.clear()
+        inicio = time.perf_counter()
+        linhas = _linhas(funcao(*args))
+        tempos.append(time.perf_counter() - inicio)
+    resultado = {"frio": _resumo(tempos, linhas)}
+    if em_cache:
+        funcao(*args)
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            funcao(*args)
+            tempos.append(time.perf_counter() - inicio)
+        resultado["quente"] = _resumo(tempos, linhas)
+    return resultado
+
+
+def executar(dsn, escalas, repeticoes):
+    os.environ["DATABASE_URL"] = dsn  # get_connection lê do ambiente fora do Streamlit
+    os.environ.setdefault("CONSULTA_LENTA_MS", "1e12")  # sem EXPLAIN em segundo plano durante as medições
+    from modules import database
+
+    resultados = {}
+    for i, linhas in enumerate(escalas):
+        escala = carregar_escala(dsn, linhas, limpar=(i == 0))
+        por_loader = {}
+        for nome, args in escala["chamadas"].items():
+            por_loader[nome] = medir_loader(getattr(database, nome), args, repeticoes)
+            frio = por_loader[nome]["frio"]
+            quente = por_loader[nome].get("quente")
+            print(f"  {nome:<28} frio p50 {frio['p50_ms']:>9.1f} ms  p95 {frio['p95_ms']:>9.1f} ms"
+                  f"  {frio['linhas']:>9,} linhas  {frio['linhas_por_s'] or 0:>12,.0f} linhas/s"
+                  + (f"  | quente p50 {quente['p50_ms']:.2f} ms" if quente else ""), flush=True)
+        resultados[str(linhas)] = {"linhas_carregadas": escala["totais"], "loaders": por_loader}
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escalas", nargs="*", type=int, default=ESCALAS_PADRAO, help="Lançamentos por usuário")
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--dsn", help="Usa um banco existente em vez do Postgres descartável (as tabelas são truncadas)")
+    parser.add_argument("--porta", type=int, default=PORTA_PADRAO)
+    parser.add_argument("--saida", type=Path, default=RAIZ / "benchmarks" / "resultados" / "banco.json")
+    args = parser.parse_args()
+
+    if args.dsn:
+        resultados = executar(args.dsn, args.escalas, args.repeticoes)
+    else:
+        with postgres_temporario(args.porta) as dsn:
+            resultados = executar(dsn, args.escalas, args.repeticoes)
+
+    saida = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "repeticoes": args.repeticoes,
+        "escalas": resultados,
+    }
+    args.saida.parent.mkdir(parents=True, exist_ok=True)
+    args.saida.write_text(json.dumps(saida, indent=2, ensure_ascii=False, default=str), encoding="utf-8")
+    print(f"Resultados salvos em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
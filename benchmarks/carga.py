@@ -0,0 +1,210 @@
+"""
+Teste de carga: K sessões logadas ao mesmo tempo numa réplica do app.
+
+Uma réplica do Streamlit é um processo só, com uma thread de script por sessão;
+aqui cada nível de concorrência roda num processo novo (a "réplica") com K
+threads, cada uma dona de uma sessão AppTest logada como um usuário sintético
+diferente. Cada sessão navega pelo menu (?pagina= sorteada) com tempo de
+pensar exponencial entre os cliques. As cotações são falsas (com latência de
+rede configurável) e o banco é um Postgres local.
+
+Por nível mede:
+  - latência das reexecuções (p50/p95/p99/máx) e vazão (reexecuções/s);
+  - conexões abertas por segundo (métrica do app) e pico de conexões
+    simultâneas no Postgres (pg_stat_activity, amostrado);
+  - CPU da réplica (núcleos usados em média) e memória (pico de RSS).
+A tabela final é a curva vazão x usuários para dimensionar réplicas: quando a
+vazão para de crescer e a p95 dispara, as reexecuções estão enfileirando.
+
+Uso:
+    python benchmarks/carga.py [--usuarios 1 2 4 8 16] [--duracao 60] [--pensar 3] [--dsn ...]
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import psycopg2
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from benchmarks import comum  # noqa: E402
+
+NIVEIS_PADRAO = [1, 2, 4, 8, 16]
+PREFIXO = "carga_"
+
+# ==============================================================================
+# 👥 RÉPLICA (PROCESSO FILHO)
+# ==============================================================================
+
+def _rss_atual_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def _amostrar_conexoes(dsn, parar, amostras):
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    c = conn.cursor()
+    while not parar.is_set():
+        c.execute("SELECT count(*) FROM pg_stat_activity WHERE datname = current_database() AND pid <> pg_backend_pid()")
+        amostras.append(c.fetchone()[0])
+        parar.wait(0.25)
+    conn.close()
+
+
+def _sessao(dsn, user_id, paginas, duracao, pensar, seed, latencias, erros):
+    rng = random.Random(seed)
+    at = comum.nova_sessao(dsn, user_id, paginas[0])
+    fim = time.monotonic() + duracao
+    while time.monotonic() < fim:
+        at.query_params["pagina"] = rng.choice(paginas)
+        inicio = time.perf_counter()
+        at.run()
+        latencias.append(time.perf_counter() - inicio)
+        if at.exception:
+            erros.append(at.exception[0].message)
+        time.sleep(rng.expovariate(1 / pensar) if pensar > 0 else 0)
+
+
+def replica(dsn, user_ids, duracao, pensar, latencia_cotacoes, seed):
+    """Roda len(user_ids) sessões concorrentes por `duracao` s e devolve as medições."""
+    from modules import metricas
+
+    paginas = comum.paginas()
+    latencias, erros, conexoes_pg = [], [], []
+    parar = threading.Event()
+    monitor = threading.Thread(target=_amostrar_conexoes, args=(dsn, parar, conexoes_pg), daemon=True)
+
+    with comum.cotacoes_falsas(latencia_cotacoes):
+        conexoes_antes = metricas.valor("financas_db_conexoes_total")
+        uso_antes = resource.getrusage(resource.RUSAGE_SELF)
+        inicio = time.perf_counter()
+        monitor.start()
+        threads = [
+            threading.Thread(target=_sessao, args=(dsn, uid, paginas, duracao, pensar, seed + i, latencias, erros))
+            for i, uid in enumerate(user_ids)
+        ]
+        for t in threads:
+            t.start()
+        rss_max = 0.0
+        while any(t.is_alive() for t in threads):
+            rss_max = max(rss_max, _rss_atual_mb())
+            time.sleep(0.5)
+        parede = time.perf_counter() - inicio
+        parar.set()
+        uso = resource.getrusage(resource.RUSAGE_SELF)
+        conexoes = metricas.valor("financas_db_conexoes_total") - conexoes_antes
+
+    ordenadas = sorted(latencias)
+
+    def pct(p):
+        return ordenadas[min(len(ordenadas) - 1, int(p * len(ordenadas)))] * 1000 if ordenadas else None
+
+    cpu = (uso.ru_utime - uso_antes.ru_utime) + (uso.ru_stime - uso_antes.ru_stime)
+    return {
+        "usuarios": len(user_ids),
+        "reexecucoes": len(latencias),
+        "vazao_por_s": len(latencias) / parede,
+        "p50_ms": statistics.median(ordenadas) * 1000 if ordenadas else None,
+        "p95_ms": pct(0.95), "p99_ms": pct(0.99), "max_ms": ordenadas[-1] * 1000 if ordenadas else None,
+        "conexoes_por_s": conexoes / parede,
+        "conexoes_pg_pico": max(conexoes_pg, default=0),
+        "cpu_nucleos": cpu / parede,
+        "rss_pico_mb": max(rss_max, uso.ru_maxrss / 1024),
+        "erros": len(erros), "exemplo_erro": erros[0] if erros else None,
+    }
+
+# ==============================================================================
+# 📈 CURVA (PROCESSO PAI)
+# ==============================================================================
+
+def preparar_usuarios(dsn, quantidade, linhas):
+    """Carrega `quantidade` usuários sintéticos e devolve os ids."""
+    from benchmarks import gerar_dados
+    escala = linhas / (gerar_dados.PERFIL["lancamentos_mes"] * 12 * 5)
+    gerar_dados.gerar(dsn, quantidade, 5, seed=1, escala=escala, limpar=True, prefixo=PREFIXO, verboso=False)
+    conn = psycopg2.connect(dsn)
+    c = conn.cursor()
+    c.execute("SELECT id FROM users WHERE username LIKE %s ORDER BY username", (PREFIXO + "%",))
+    ids = [r[0] for r in c.fetchall()]
+    conn.close()
+    return ids
+
+
+def rodar_nivel(dsn, user_ids, args):
+    """Executa uma réplica num processo novo (memória e CPU isolados por nível)."""
+    entrada = json.dumps({
+        "dsn": dsn, "user_ids": user_ids, "duracao": args.duracao, "pensar": args.pensar,
+        "latencia_cotacoes": args.latencia_cotacoes, "seed": args.seed,
+    })
+    env = {**os.environ, "DATABASE_URL": dsn, "CONSULTA_LENTA_MS": os.environ.get("CONSULTA_LENTA_MS", "1e12")}
+    proc = subprocess.run([sys.executable, __file__, "--replica"], input=entrada, capture_output=True,
+                          text=True, cwd=RAIZ, env=env, timeout=args.duracao * 10 + 300)
+    if proc.returncode != 0:
+        return {"usuarios": len(user_ids), "erro": (proc.stderr.strip().splitlines() or ["falhou"])[-1]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def executar(dsn, args):
+    niveis = sorted(args.usuarios)
+    user_ids = preparar_usuarios(dsn, max(niveis), args.linhas)
+    curva = []
+    print(f"{'usuários':>8} {'reexec/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'conex/s':>8} {'pg pico':>7} {'CPU':>5} {'RSS MB':>7} {'erros':>5}")
+    for k in niveis:
+        r = rodar_nivel(dsn, user_ids[:k], args)
+        curva.append(r)
+        if "erro" in r:
+            print(f"{k:>8} ERRO: {r['erro']}")
+            continue
+        print(f"{k:>8} {r['vazao_por_s']:>9.2f} {r['p50_ms'] or 0:>8.0f} {r['p95_ms'] or 0:>8.0f} "
+              f"{r['p99_ms'] or 0:>8.0f} {r['conexoes_por_s']:>8.1f} {r['conexoes_pg_pico']:>7} "
+              f"{r['cpu_nucleos']:>5.2f} {r['rss_pico_mb']:>7.0f} {r['erros']:>5}", flush=True)
+    return curva
+
+
+def main():
+    if "--replica" in sys.argv:
+        entrada = json.loads(sys.stdin.read())
+        print(json.dumps(replica(entrada["dsn"], entrada["user_ids"], entrada["duracao"], entrada["pensar"],
+                                 entrada["latencia_cotacoes"], entrada["seed"])))
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--usuarios", nargs="*", type=int, default=NIVEIS_PADRAO, help="Níveis de concorrência")
+    parser.add_argument("--duracao", type=float, default=60, help="Segundos por nível")
+    parser.add_argument("--pensar", type=float, default=3.0, help="Tempo médio de pensar entre cliques (s)")
+    parser.add_argument("--latencia-cotacoes", type=float, default=0.3, help="Latência simulada do yfinance (s)")
+    parser.add_argument("--linhas", type=int, default=5_000, help="Lançamentos por usuário sintético")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--dsn", help="Banco existente (as tabelas são truncadas); padrão: Postgres descartável")
+    parser.add_argument("--saida", type=Path, default=RAIZ / "benchmarks" / "resultados" / "carga.json")
+    args = parser.parse_args()
+
+    if args.dsn:
+        curva = executar(args.dsn, args)
+    else:
+        from benchmarks import banco
+        with banco.postgres_temporario() as dsn:
+            curva = executar(dsn, args)
+
+    args.saida.parent.mkdir(parents=True, exist_ok=True)
+    args.saida.write_text(json.dumps({
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "duracao_s": args.duracao, "pensar_s": args.pensar, "linhas": args.linhas, "curva": curva,
+    }, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Resultados salvos em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
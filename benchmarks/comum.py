@@ -0,0 +1,81 @@
+"""
+Peças compartilhadas pelos benchmarks que renderizam o app (paginas, carga, memoria):
+banco com um usuário sintético, sessão AppTest já logada numa página, contagem
+de consultas do processo e cotações falsas no lugar do yfinance.
+"""
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from modules.paginas import PAGINAS  # noqa: E402
+
+# Consultas feitas pela thread de manutenção (não pertencem a nenhuma página)
+ORIGENS_IGNORADAS = {"limpar_sessoes_expiradas", "limitar_sessoes_por_usuario"}
+
+
+@contextmanager
+def banco_com_usuario(dsn=None, linhas=10_000, porta=None):
+    """(dsn, user_id) de um usuário sintético com ~`linhas` lançamentos; sem `dsn`, num Postgres descartável."""
+    from benchmarks import banco
+    if dsn:
+        yield dsn, banco.carregar_escala(dsn, linhas, limpar=True)["user_id"]
+        return
+    with banco.postgres_temporario(porta or banco.PORTA_PADRAO) as dsn_temporario:
+        yield dsn_temporario, banco.carregar_escala(dsn_temporario, linhas, limpar=True)["user_id"]
+
+
+def nova_sessao(dsn, user_id, pagina=None, timeout=120):
+    """AppTest do main.py com o usuário já logado (sem passar pelo formulário) e `?pagina=`."""
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(str(RAIZ / "main.py"), default_timeout=timeout)
+    at.secrets["DATABASE_URL"] = dsn
+    at.session_state["logged_in"] = True
+    at.session_state["user_id"] = user_id
+    at.session_state["user_name"] = "Benchmark"
+    at.session_state["username"] = "benchmark"
+    if pagina:
+        at.query_params["pagina"] = pagina
+    return at
+
+
+def consultas_processo():
+    """Total de chamadas ao banco registradas no processo até agora (fora a manutenção)."""
+    from modules import instrumentacao
+    return sum(h["qtd"] for origem, h in instrumentacao.histogramas().items() if origem not in ORIGENS_IGNORADAS)
+
+
+def consultas_por_origem():
+    from modules import instrumentacao
+    return {origem: h["qtd"] for origem, h in instrumentacao.histogramas().items() if origem not in ORIGENS_IGNORADAS}
+
+
+def diferenca_origens(antes, depois):
+    return {o: n - antes.get(o, 0) for o, n in depois.items() if n - antes.get(o, 0)}
+
+
+@contextmanager
+def cotacoes_falsas(latencia_s=0.0, seed=0):
+    """Troca yfinance.download por preços sintéticos (com latência opcional, para simular a rede)."""
+    rng = np.random.default_rng(seed)
+
+    def download(tickers, *args, **kwargs):
+        if latencia_s:
+            time.sleep(latencia_s)
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        colunas = pd.MultiIndex.from_product([["Close"], tickers])
+        return pd.DataFrame([rng.uniform(5, 300, len(tickers))], columns=colunas)
+
+    with mock.patch("yfinance.download", download):
+        yield
+
+
+def paginas(selecionadas=None):
+    return [p for p in PAGINAS if not selecionadas or p in selecionadas]
@@ -0,0 +1,411 @@
+"""
+Gerador determinístico de dados sintéticos para testes de escala.
+
+Cria N usuários com volumes realistas em todas as tabelas do init_db:
+  - users e sessions (algumas expiradas);
+  - lancamentos: salário, contas fixas (casando com as recorrências) e gastos
+    avulsos espalhados por constants.CATEGORIAS ao longo de vários anos;
+  - cartoes_credito, lancamentos_cartao (compras parceladas, mesma regra de
+    fechamento de salvar_compra_credito) e faturas_controle (faturas pagas);
+  - investimentos (compras e vendas em ações, FIIs, ETFs, cripto e renda fixa);
+  - reservas e reserva_transacoes (aportes mensais, resgates e rendimento
+    diário em dia útil, com origem='auto' como o motor de rendimentos);
+  - metas mensais e recorrencias.
+
+Mesmo --seed e mesmo --fim => mesmo banco: cada usuário tem seu próprio gerador
+(seed, índice), então o resultado não depende de --lote. A carga é via COPY,
+um lote de usuários por transação; com o perfil padrão, 1000 usuários x 5 anos
+dão ~10 milhões de linhas.
+
+Uso:
+    DATABASE_URL=postgresql://... python benchmarks/gerar_dados.py --usuarios 1000 --anos 5 [--limpar]
+
+Todos os usuários entram com a senha de --senha (padrão "benchmark").
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import uuid
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import psycopg2
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from modules.constants import CATEGORIAS  # noqa: E402
+
+# ==============================================================================
+# 📐 PERFIL DE VOLUME (POR USUÁRIO; MULTIPLICADO POR --escala)
+# ==============================================================================
+
+PERFIL = {
+    "lancamentos_mes": 45,      # gastos/receitas avulsos por mês
+    "cartoes": 2,
+    "compras_cartao_mes": 8,    # por cartão (cada uma vira 1..12 parcelas)
+    "operacoes_mes": 3,         # investimentos
+    "reservas": 3,
+    "sessoes": 3,
+}
+
+CONTAS = ["Conta Principal", "Nubank", "Inter", "Carteira"]
+FORMAS = ["PIX", "Cartão de Débito", "Boleto", "Transferência", "Dinheiro"]
+PARCELAS = np.array([1, 2, 3, 4, 6, 10, 12])
+PESOS_PARCELAS = np.array([0.55, 0.12, 0.1, 0.06, 0.07, 0.05, 0.05])
+NOMES_CARTOES = ["Nubank", "Inter", "C6 Bank", "Itaú"]
+
+# (nome, categoria, subcategoria, valor base, dia, tipo)
+RECORRENCIAS = [
+    ("Aluguel", "Moradia", "Aluguel", 1800.0, 5, "Despesa"),
+    ("Energia", "Moradia", "Energia", 220.0, 12, "Despesa"),
+    ("Internet", "Moradia", "Internet", 110.0, 15, "Despesa"),
+    ("Streaming", "Lazer", "Streaming", 55.0, 20, "Despesa"),
+    ("Academia", "Saúde", "Academia", 120.0, 10, "Despesa"),
+    ("Plano de Saúde", "Saúde", "Plano de Saúde", 450.0, 8, "Despesa"),
+    ("Salário", "Trabalho Principal", "Salário Líquido", 7500.0, 5, "Receita"),
+]
+
+# (ticker, classe, preço base)
+ATIVOS = [
+    ("PETR4", "Ação", 35.0), ("VALE3", "Ação", 65.0), ("ITUB4", "Ação", 30.0),
+    ("WEGE3", "Ação", 40.0), ("MXRF11", "FII", 10.0), ("HGLG11", "FII", 160.0),
+    ("IVVB11", "ETF", 300.0), ("BOVA11", "ETF", 120.0), ("BTC-USD", "Cripto", 300000.0),
+    ("TESOURO SELIC", "Renda Fixa", 14000.0),
+]
+
+# (nome, tipo_aplicacao, índice, taxa %, taxa diária aproximada do índice)
+RESERVAS = [
+    ("Reserva de Emergência", "CDB", "CDI", 100.0, 0.00045),
+    ("Tesouro", "Tesouro Direto", "Selic", 100.0, 0.00045),
+    ("Viagem", "Poupança", "Poupança", 100.0, 0.00025),
+    ("Carro", "LCI/LCA", "CDI", 95.0, 0.00045),
+]
+
+TAMANHO_LOTE_PADRAO = 50
+
+# Pares (tipo, categoria, subcategoria) sorteáveis, com peso para o tipo
+_DESPESAS = [("Despesa", cat, sub) for cat, subs in CATEGORIAS["Despesa"].items() for sub in subs]
+_RECEITAS = [("Receita", cat, sub) for cat, subs in CATEGORIAS["Receita"].items() for sub in subs
+             if sub != "Salário Líquido"]
+_CATEGORIAS_META = ["Alimentação", "Transporte", "Lazer", "Saúde", "Pessoal", "Tecnologia"]
+
+# ==============================================================================
+# 🎲 GERAÇÃO POR USUÁRIO
+# ==============================================================================
+
+def _datas(rng, inicio, fim, n):
+    dias = (fim - inicio).days + 1
+    return pd.to_datetime(inicio) + pd.to_timedelta(rng.integers(0, dias, n), unit="D")
+
+
+def _valores(rng, media, n, dispersao=0.8):
+    """Valores log-normais (muitos pequenos, poucos grandes), arredondados em centavos."""
+    return np.round(rng.lognormal(np.log(media), dispersao, n), 2)
+
+
+def gerar_usuario(indice, user_id, ids, inicio, fim, escala, seed, senha_hash, prefixo):
+    """Dict tabela -> DataFrame com todas as linhas de um usuário. `ids` traz os ids de cartões/reservas."""
+    rng = np.random.default_rng([seed, indice])
+    meses = pd.date_range(inicio.replace(day=1), fim, freq="MS")
+    hoje = pd.Timestamp(fim)
+    t = {}
+
+    t["users"] = pd.DataFrame({
+        "id": [user_id], "username": [f"{prefixo}{indice:06d}"],
+        "password_hash": [senha_hash], "name": [f"Usuário {indice}"],
+    })
+
+    n_sess = PERFIL["sessoes"]
+    criado = hoje - pd.to_timedelta(rng.integers(0, 60, n_sess), unit="D")
+    t["sessions"] = pd.DataFrame({
+        "token": [str(uuid.UUID(bytes=rng.bytes(16), version=4)) for _ in range(n_sess)],
+        "user_id": user_id, "created_at": criado, "expires_at": criado + pd.Timedelta(days=30),
+    })
+
+    # --- Lançamentos: avulsos + pagamentos das recorrências ---
+    n = int(len(meses) * PERFIL["lancamentos_mes"] * escala)
+    eh_receita = rng.random(n) < 0.05
+    idx_desp = rng.integers(0, len(_DESPESAS), n)
+    idx_rec = rng.integers(0, len(_RECEITAS), n)
+    pares = [(_RECEITAS[r] if e else _DESPESAS[d]) for e, d, r in zip(eh_receita, idx_desp, idx_rec)]
+    datas = _datas(rng, inicio, fim, n)
+    avulsos = pd.DataFrame({
+        "data": datas,
+        "tipo": [p[0] for p in pares], "categoria": [p[1] for p in pares], "subcategoria": [p[2] for p in pares],
+        "descricao": [p[2] for p in pares],
+        "valor": np.where(eh_receita, _valores(rng, 600, n), _valores(rng, 80, n)),
+        "conta": np.array(CONTAS)[rng.integers(0, len(CONTAS), n)],
+        "forma_pagamento": np.array(FORMAS)[rng.integers(0, len(FORMAS), n)],
+    })
+
+    fixos = []
+    for nome, cat, sub, base, dia, tipo in RECORRENCIAS:
+        fator = rng.uniform(0.7, 1.4)
+        fixos.append(pd.DataFrame({
+            "data": meses + pd.Timedelta(days=dia - 1),
+            "tipo": tipo, "categoria": cat, "subcategoria": sub,
+            "descricao": nome if tipo == "Despesa" else f"{nome} {rng.choice(['Empresa', 'Matriz'])}",
+            "valor": np.round(base * fator * rng.uniform(0.95, 1.05, len(meses)), 2),
+            "conta": "Conta Principal", "forma_pagamento": "Boleto/Automático" if tipo == "Despesa" else "Transferência",
+        }))
+    lanc = pd.concat([avulsos, *fixos], ignore_index=True)
+    lanc = lanc[lanc["data"] <= hoje]
+    recentes = lanc["data"] > hoje - pd.Timedelta(days=3)
+    lanc["status"] = np.where(recentes, "Pendente", "Pago/Recebido")
+    lanc.insert(0, "user_id", user_id)
+    t["lancamentos"] = lanc
+
+    # --- Recorrências ---
+    t["recorrencias"] = pd.DataFrame({
+        "user_id": user_id,
+        "nome": [r[0] for r in RECORRENCIAS],
+        "valor": [r[3] for r in RECORRENCIAS],
+        "categoria": [r[1] for r in RECORRENCIAS],
+        "dia_vencimento": [r[4] for r in RECORRENCIAS],
+        "tipo": [r[5] for r in RECORRENCIAS],
+        "ativa": True,
+    })
+
+    # --- Cartões, parcelas e faturas pagas ---
+    cartao_ids = ids["cartoes"]
+    fechamentos = rng.integers(1, 29, len(cartao_ids))
+    t["cartoes_credito"] = pd.DataFrame({
+        "id": cartao_ids, "user_id": user_id,
+        "nome_cartao": [NOMES_CARTOES[i % len(NOMES_CARTOES)] for i in range(len(cartao_ids))],
+        "dia_fechamento": fechamentos, "dia_vencimento": (fechamentos + 7 - 1) % 28 + 1,
+    })
+    compras = []
+    for cartao_id, fechamento in zip(cartao_ids, fechamentos):
+        n = int(len(meses) * PERFIL["compras_cartao_mes"] * escala)
+        data_compra = _datas(rng, inicio, fim, n)
+        qtd = rng.choice(PARCELAS, n, p=PESOS_PARCELAS)
+        total = _valores(rng, 150, n) * np.where(qtd > 1, 4, 1)
+        i_desp = rng.integers(0, len(_DESPESAS), n)
+        # Mesma regra de salvar_compra_credito: a partir do fechamento, cai na fatura seguinte
+        primeira = data_compra.year * 12 + data_compra.month - 1 + (data_compra.day >= fechamento)
+        rep = np.repeat(np.arange(n), qtd)
+        parcela = np.arange(len(rep)) - np.repeat(np.cumsum(qtd) - qtd, qtd) + 1
+        mes_fatura = np.asarray(primeira)[rep] + parcela - 1
+        compras.append(pd.DataFrame({
+            "user_id": user_id, "cartao_id": cartao_id,
+            "data_compra": data_compra[rep],
+            "descricao": [_DESPESAS[i][2] for i in i_desp[rep]],
+            "categoria": [_DESPESAS[i][1] for i in i_desp[rep]],
+            "valor_parcela": np.round(total[rep] / qtd[rep], 2),
+            "parcela_numero": parcela, "qtd_parcelas": qtd[rep],
+            "mes_fatura": pd.to_datetime({"year": mes_fatura // 12, "month": mes_fatura % 12 + 1, "day": 1}),
+        }))
+    cartao = pd.concat(compras, ignore_index=True)
+    t["lancamentos_cartao"] = cartao
+
+    mes_atual = hoje.to_period("M").to_timestamp()
+    pagas = (cartao[cartao["mes_fatura"] < mes_atual]
+             .groupby(["cartao_id", "mes_fatura"], as_index=False)["valor_parcela"].sum())
+    venc = pagas["cartao_id"].map(dict(zip(cartao_ids, t["cartoes_credito"]["dia_vencimento"])))
+    t["faturas_controle"] = pd.DataFrame({
+        "user_id": user_id, "cartao_id": pagas["cartao_id"], "mes_referencia": pagas["mes_fatura"],
+        "status": np.where(rng.random(len(pagas)) < 0.9, "Paga", "Paga Externo"),
+        "data_pagamento": pagas["mes_fatura"] + pd.to_timedelta(venc - 1, unit="D"),
+        "valor_pago": pagas["valor_parcela"].round(2),
+    })
+
+    # --- Investimentos ---
+    n = int(len(meses) * PERFIL["operacoes_mes"] * escala)
+    ativo = rng.integers(0, len(ATIVOS), n)
+    compra = rng.random(n) < 0.85
+    base = np.array([a[2] for a in ATIVOS])[ativo]
+    preco = np.round(base * rng.lognormal(0, 0.15, n), 2)
+    qtd = np.where(compra, rng.integers(1, 50, n), rng.integers(1, 10, n)).astype(float)
+    qtd = np.where(base > 10000, np.round(rng.uniform(0.001, 0.05, n), 4), qtd)  # cripto/tesouro fracionados
+    taxas = np.round(np.where(rng.random(n) < 0.3, rng.uniform(0, 10, n), 0.0), 2)
+    bruto = qtd * preco
+    t["investimentos"] = pd.DataFrame({
+        "user_id": user_id, "data": _datas(rng, inicio, fim, n),
+        "ticker": [ATIVOS[i][0] for i in ativo], "tipo_operacao": np.where(compra, "Compra", "Venda"),
+        "classe": [ATIVOS[i][1] for i in ativo], "quantidade": qtd, "preco_unitario": preco,
+        "taxas": taxas, "total_operacao": np.round(np.where(compra, bruto + taxas, bruto - taxas), 2),
+        "notas": "",
+    }).sort_values("data")
+
+    # --- Metas mensais ---
+    t["metas"] = pd.DataFrame({
+        "user_id": user_id,
+        "categoria": np.tile(_CATEGORIAS_META, len(meses)),
+        "valor_meta": np.round(rng.uniform(200, 1500, len(meses) * len(_CATEGORIAS_META)), -1),
+        "mes": np.repeat(meses.month, len(_CATEGORIAS_META)),
+        "ano": np.repeat(meses.year, len(_CATEGORIAS_META)),
+    })
+
+    # --- Reservas com aportes mensais e rendimento diário ---
+    dias_uteis = pd.bdate_range(inicio, fim)
+    reservas, transacoes = [], []
+    for reserva_id, (nome, tipo_apl, indice_res, taxa, taxa_dia) in zip(ids["reservas"], RESERVAS):
+        r = taxa_dia * taxa / 100
+        fluxo = np.zeros(len(dias_uteis))
+        primeiro_util = ~pd.Series(dias_uteis.to_period("M")).duplicated().to_numpy()
+        aportes = np.round(rng.uniform(200, 1500, primeiro_util.sum()), 2)
+        fluxo[primeiro_util] = aportes
+        resgate = primeiro_util.copy()
+        resgate[primeiro_util] = rng.random(primeiro_util.sum()) < 0.08
+        # Saldo em forma fechada: S_t = P_t * cumsum(F/P), P_t = (1+r)^t;
+        # cada resgate leva 20% do saldo do dia (recalculado a cada resgate, são poucos)
+        fator = (1 + r) ** np.arange(len(dias_uteis))
+        saques = np.zeros(len(dias_uteis))
+        for k in np.flatnonzero(resgate):
+            saldo_k = fator[k] * np.sum((fluxo[:k + 1] - saques[:k + 1]) / fator[:k + 1])
+            saques[k] = round(saldo_k * 0.2, 2)
+        saldo = fator * np.cumsum((fluxo - saques) / fator)
+        rend = np.round(np.concatenate([[0.0], saldo[:-1] * r]), 2)
+        tem_rend = rend > 0
+
+        movs = [
+            pd.DataFrame({"data": dias_uteis[primeiro_util], "tipo": "Aporte", "valor": aportes,
+                          "descricao": f"Aporte: {nome}", "origem": None}),
+            pd.DataFrame({"data": dias_uteis[resgate], "tipo": "Resgate", "valor": saques[resgate],
+                          "descricao": f"Resgate: {nome}", "origem": None}),
+            pd.DataFrame({"data": dias_uteis[tem_rend], "tipo": "Rendimento", "valor": rend[tem_rend],
+                          "descricao": f"Rendimento {indice_res}", "origem": "auto"}),
+        ]
+        mov = pd.concat(movs, ignore_index=True).sort_values("data", kind="stable")
+        mov.insert(0, "reserva_id", reserva_id)
+        mov.insert(0, "user_id", user_id)
+        transacoes.append(mov)
+
+        saldo_final = (mov["valor"].where(mov["tipo"] != "Resgate", -mov["valor"])).sum()
+        reservas.append({
+            "id": reserva_id, "user_id": user_id, "nome": nome, "tipo_aplicacao": tipo_apl,
+            "indice": indice_res, "taxa": taxa, "rentabilidade": f"{taxa}% {indice_res}",
+            "saldo_atual": round(saldo_final, 2), "meta_valor": float(np.round(rng.uniform(5000, 50000), -2)),
+        })
+    t["reservas"] = pd.DataFrame(reservas)
+    t["reserva_transacoes"] = pd.concat(transacoes, ignore_index=True)
+    return t
+
+# ==============================================================================
+# 🚚 CARGA VIA COPY
+# ==============================================================================
+
+# Ordem respeita as chaves estrangeiras
+ORDEM_TABELAS = [
+    "users", "sessions", "cartoes_credito", "reservas", "lancamentos", "lancamentos_cartao",
+    "faturas_controle", "investimentos", "metas", "recorrencias", "reserva_transacoes",
+]
+
+# Tabelas com id explícito (referenciado por outras): sequência ajustada no fim
+TABELAS_COM_ID = ["users", "cartoes_credito", "reservas"]
+# Tabelas SERIAL sem id explícito: também ajustadas se --limpar reiniciou a sequência
+TABELAS_SERIAIS = ["users", "cartoes_credito", "reservas", "lancamentos", "lancamentos_cartao",
+                   "investimentos", "recorrencias", "reserva_transacoes"]
+
+
+def copiar(cursor, tabela, df):
+    """COPY de um DataFrame (CSV em memória; campo vazio = NULL)."""
+    if df.empty:
+        return 0
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False, date_format="%Y-%m-%d %H:%M:%S")
+    buffer.seek(0)
+    colunas = ", ".join(df.columns)
+    cursor.copy_expert(f"COPY {tabela} ({colunas}) FROM STDIN WITH (FORMAT csv)", buffer)
+    return len(df)
+
+
+def criar_esquema(dsn):
+    """Cria/migra as tabelas com o próprio init_db do app."""
+    os.environ["DATABASE_URL"] = dsn
+    from modules.database import init_db
+    init_db()
+
+
+def proximo_id(cursor, tabela):
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {tabela}")
+    return cursor.fetchone()[0]
+
+
+def gerar(dsn, usuarios, anos, seed=42, fim=None, escala=1.0, lote=TAMANHO_LOTE_PADRAO,
+          limpar=False, senha="benchmark", prefixo="bench", verboso=True):
+    """Gera e carrega os dados; retorna {tabela: linhas inseridas}."""
+    import bcrypt  # só aqui: um único hash, compartilhado por todos os usuários
+
+    fim = pd.Timestamp(fim or date.today()).normalize()
+    inicio = (fim - pd.DateOffset(years=anos)).normalize() + pd.Timedelta(days=1)
+    criar_esquema(dsn)
+    senha_hash = bcrypt.hashpw(senha.encode("utf-8"), bcrypt.gensalt(rounds=10)).decode("utf-8")
+
+    conn = psycopg2.connect(dsn)
+    c = conn.cursor()
+    if limpar:
+        c.execute("TRUNCATE " + ", ".join(ORDEM_TABELAS) + " RESTART IDENTITY CASCADE")
+        conn.commit()
+
+    proximo = {tab: proximo_id(c, tab) for tab in TABELAS_COM_ID}
+    n_cartoes, n_reservas = PERFIL["cartoes"], min(PERFIL["reservas"], len(RESERVAS))
+    totais = {tab: 0 for tab in ORDEM_TABELAS}
+    inicio_carga = time.perf_counter()
+
+    for inicio_lote in range(0, usuarios, lote):
+        partes = {tab: [] for tab in ORDEM_TABELAS}
+        for i in range(inicio_lote, min(inicio_lote + lote, usuarios)):
+            ids = {
+                "cartoes": list(range(proximo["cartoes_credito"] + i * n_cartoes,
+                                      proximo["cartoes_credito"] + (i + 1) * n_cartoes)),
+                "reservas": list(range(proximo["reservas"] + i * n_reservas,
+                                       proximo["reservas"] + (i + 1) * n_reservas)),
+            }
+            dados = gerar_usuario(i, proximo["users"] + i, ids, inicio, fim, escala, seed, senha_hash, prefixo)
+            for tab, df in dados.items():
+                partes[tab].append(df)
+        for tab in ORDEM_TABELAS:
+            totais[tab] += copiar(c, tab, pd.concat(partes[tab], ignore_index=True))
+        conn.commit()
+        if verboso:
+            linhas = sum(totais.values())
+            decorrido = time.perf_counter() - inicio_carga
+            print(f"  {min(inicio_lote + lote, usuarios)}/{usuarios} usuários, {linhas:,} linhas "
+                  f"({linhas / decorrido:,.0f} linhas/s)", flush=True)
+
+    for tab in TABELAS_SERIAIS:
+        c.execute(f"SELECT setval(pg_get_serial_sequence('{tab}', 'id'), COALESCE((SELECT MAX(id) FROM {tab}), 0) + 1, false)")
+    conn.commit()
+    conn.autocommit = True
+    c.execute("ANALYZE")
+    conn.close()
+    return totais
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos determinísticos para testes de escala.")
+    parser.add_argument("--usuarios", type=int, default=1000)
+    parser.add_argument("--anos", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--fim", help="Última data gerada (AAAA-MM-DD, padrão hoje; fixe para reproduzir)")
+    parser.add_argument("--escala", type=float, default=1.0, help="Multiplicador dos volumes mensais do PERFIL")
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE_PADRAO, help="Usuários por transação de COPY")
+    parser.add_argument("--dsn", help="Padrão: DATABASE_URL do ambiente")
+    parser.add_argument("--limpar", action="store_true", help="TRUNCATE em todas as tabelas antes de carregar")
+    parser.add_argument("--senha", default="benchmark")
+    parser.add_argument("--prefixo", default="bench", help="Prefixo dos usernames (bench000000, ...)")
+    args = parser.parse_args()
+
+    dsn = args.dsn or os.environ.get("DATABASE_URL")
+    if not dsn:
+        parser.error("informe --dsn ou DATABASE_URL")
+
+    inicio = time.perf_counter()
+    print(f"Gerando {args.usuarios} usuários x {args.anos} anos (seed={args.seed}, fim={args.fim or date.today()})")
+    totais = gerar(dsn, args.usuarios, args.anos, seed=args.seed, fim=args.fim, escala=args.escala,
+                   lote=args.lote, limpar=args.limpar, senha=args.senha, prefixo=args.prefixo)
+    decorrido = time.perf_counter() - inicio
+    for tab, n in totais.items():
+        print(f"{tab:<20} {n:>12,}")
+    total = sum(totais.values())
+    print(f"{'TOTAL':<20} {total:>12,}  em {decorrido:.1f} s ({total / decorrido:,.0f} linhas/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Relatório de memória por loader e por página, com teto por usuário.
+
+Com um usuário sintético de --linhas lançamentos:
+  loaders  para cada loader em cache de database.py: pico e retido (tracemalloc)
+           na chamada fria, o que um acerto de cache aloca de novo (perto de zero
+           nos loaders compartilhados, que devolvem uma visão sem cópia; um hit do
+           st.cache_data desserializa uma cópia) e o DataFrame devolvido por
+           coluna (dtype e DataFrame.memory_usage(deep=True));
+  páginas  pico de alocação de uma renderização fria e de uma reexecução, e as
+           linhas de modules/ que mais alocaram (diferença de snapshots).
+
+Teto: o maior pico entre as páginas (frio) precisa ficar abaixo de --teto-mb e
+a soma dos DataFrames do usuário abaixo de --teto-dados-mb; senão sai com 1.
+
+Uso:
+    python benchmarks/memoria.py [--linhas 100000] [--teto-mb 512] [--teto-dados-mb 128] [--dsn ...]
+"""
+import argparse
+import json
+import sys
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from benchmarks import comum  # noqa: E402
+
+MB = 2 ** 20
+LINHAS_PADRAO = 100_000
+TETO_PAGINA_MB = 512    # pico de uma renderização fria, com LINHAS_PADRAO lançamentos
+TETO_DADOS_MB = 128     # soma dos DataFrames dos loaders do usuário
+TOP_LINHAS = 10
+
+
+def _frame(resultado):
+    """DataFrame devolvido pelo loader (carregar_extrato_reserva devolve (df, tem_mais))."""
+    if isinstance(resultado, tuple):
+        resultado = resultado[0]
+    return resultado if isinstance(resultado, pd.DataFrame) else None
+
+
+def pegada(df):
+    """Bytes por coluna (deep=True), com dtype, ordenado do maior para o menor."""
+    uso = df.memory_usage(deep=True, index=True)
+    colunas = [{"coluna": str(c), "dtype": str(df[c].dtype) if c in df.columns else "índice", "mb": uso[c] / MB}
+               for c in uso.index]
+    return {"linhas": len(df), "total_mb": uso.sum() / MB, "colunas": sorted(colunas, key=lambda x: x["mb"], reverse=True)}
+
+
+def _medir_alocacao(funcao):
+    """(resultado, pico_mb, retido_mb) de funcao() sob tracemalloc."""
+    tracemalloc.start()
+    try:
+        base, _ = tracemalloc.get_traced_memory()
+        resultado = funcao()
+        atual, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return resultado, (pico - base) / MB, (atual - base) / MB
+
+
+def _top_linhas(antes, depois):
+    """Linhas de modules/ (e main.py) que mais alocaram entre dois snapshots."""
+    filtros = [tracemalloc.Filter(True, str(RAIZ / "modules" / "*")), tracemalloc.Filter(True, str(RAIZ / "main.py"))]
+    estat = depois.filter_traces(filtros).compare_to(antes.filter_traces(filtros), "lineno")
+    return [{"local": f"{Path(s.traceback[0].filename).name}:{s.traceback[0].lineno}", "mb": s.size_diff / MB}
+            for s in estat[:TOP_LINHAS] if s.size_diff > 0]
+
+# ==============================================================================
+# 📥 LOADERS
+# ==============================================================================
+
+def chamadas_loaders(dsn, user_id):
+    import psycopg2
+    conn = psycopg2.connect(dsn)
+    c = conn.cursor()
+    c.execute("SELECT cartao_id, mes_fatura FROM lancamentos_cartao WHERE user_id = %s "
+              "GROUP BY 1, 2 ORDER BY COUNT(*) DESC LIMIT 1", (user_id,))
+    cartao_id, mes_fatura = c.fetchone() or (None, None)
+    conn.close()
+    hoje = datetime.now()
+    return {
+        "carregar_dados": (user_id,),
+        "carregar_investimentos": (user_id,),
+        "carregar_extrato_reserva": (user_id,),
+        "carregar_reservas": (user_id,),
+        "carregar_cartoes": (user_id,),
+        "carregar_fatura": (user_id, cartao_id, str(mes_fatura)),
+        "carregar_recorrencias": (user_id,),
+        "carregar_metas": (user_id, hoje.month, hoje.year),
+        "buscar_faturas_futuras": (user_id,),
+    }
+
+
+def medir_loaders(dsn, user_id):
+    from modules import database
+    resultados = {}
+    for nome, args in chamadas_loaders(dsn, user_id).items():
+        funcao = getattr(database, nome)
+        funcao.clear()
+        resultado, pico, retido = _medir_alocacao(lambda: funcao(*args))
+        _, pico_hit, retido_hit = _medir_alocacao(lambda: funcao(*args))
+        df = _frame(resultado)
+        resultados[nome] = {
+            "frio_pico_mb": pico, "frio_retido_mb": retido,
+            "hit_pico_mb": pico_hit, "hit_retido_mb": retido_hit,
+            "frame": pegada(df) if df is not None else None,
+        }
+        r = resultados[nome]
+        print(f"  {nome:<26} frame {r['frame']['total_mb'] if r['frame'] else 0:>8.1f} MB"
+              f" ({r['frame']['linhas'] if r['frame'] else 0:>8,} linhas) | frio pico {pico:>7.1f} MB"
+              f" | hit aloca {pico_hit:>7.1f} MB", flush=True)
+    return resultados
+
+# ==============================================================================
+# 🖥️ PÁGINAS
+# ==============================================================================
+
+def medir_paginas(dsn, user_id, selecionadas):
+    from modules import database
+    resultados = {}
+    for pagina in comum.paginas(selecionadas):
+        database.clear_cache()
+        at = comum.nova_sessao(dsn, user_id, pagina)
+        tracemalloc.start(25)
+        try:
+            base, _ = tracemalloc.get_traced_memory()
+            antes = tracemalloc.take_snapshot()
+            at.run()
+            _, pico_frio = tracemalloc.get_traced_memory()
+            depois = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+            base_quente, _ = tracemalloc.get_traced_memory()
+            at.run()
+            _, pico_quente = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        resultados[pagina] = {
+            "frio_pico_mb": (pico_frio - base) / MB,
+            "quente_pico_mb": (pico_quente - base_quente) / MB,
+            "top_linhas": _top_linhas(antes, depois),
+            "erro": at.exception[0].message if at.exception else None,
+        }
+        r = resultados[pagina]
+        print(f"  {pagina:<16} frio pico {r['frio_pico_mb']:>7.1f} MB | reexecução pico {r['quente_pico_mb']:>7.1f} MB"
+              + (f" | ERRO: {r['erro']}" if r["erro"] else ""), flush=True)
+        for item in r["top_linhas"][:3]:
+            print(f"      {item['local']:<40} {item['mb']:>7.1f} MB")
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=LINHAS_PADRAO, help="Lançamentos do usuário sintético")
+    parser.add_argument("--paginas", nargs="*", help="Padrão: todas as do menu")
+    parser.add_argument("--teto-mb", type=float, default=TETO_PAGINA_MB, help="Pico máximo de uma página (frio)")
+    parser.add_argument("--teto-dados-mb", type=float, default=TETO_DADOS_MB, help="Soma máxima dos DataFrames do usuário")
+    parser.add_argument("--dsn", help="Banco existente (as tabelas são truncadas); padrão: Postgres descartável")
+    parser.add_argument("--saida", type=Path, default=RAIZ / "benchmarks" / "resultados" / "memoria.json")
+    args = parser.parse_args()
+
+    with comum.cotacoes_falsas(), comum.banco_com_usuario(args.dsn, args.linhas) as (dsn, user_id):
+        print("Loaders:")
+        loaders = medir_loaders(dsn, user_id)
+        print("Páginas:")
+        paginas = medir_paginas(dsn, user_id, args.paginas)
+
+    dados_mb = sum(r["frame"]["total_mb"] for r in loaders.values() if r["frame"])
+    pior_pagina = max(paginas.items(), key=lambda x: x[1]["frio_pico_mb"], default=(None, {"frio_pico_mb": 0}))
+    args.saida.parent.mkdir(parents=True, exist_ok=True)
+    args.saida.write_text(json.dumps({
+        "data": datetime.now().isoformat(timespec="seconds"), "linhas": args.linhas,
+        "dados_usuario_mb": dados_mb, "loaders": loaders, "paginas": paginas,
+    }, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Resultados salvos em {args.saida}")
+
+    print(f"\nDataFrames do usuário: {dados_mb:.1f} MB (teto {args.teto_dados_mb:.0f} MB)")
+    print(f"Maior pico de página: {pior_pagina[0]} com {pior_pagina[1]['frio_pico_mb']:.1f} MB (teto {args.teto_mb:.0f} MB)")
+    falhas = []
+    if dados_mb > args.teto_dados_mb:
+        falhas.append("dados do usuário acima do teto")
+    if pior_pagina[1]["frio_pico_mb"] > args.teto_mb:
+        falhas.append(f"página {pior_pagina[0]} acima do teto")
+    falhas += [f"erro ao renderizar {p}" for p, r in paginas.items() if r["erro"]]
+    for falha in falhas:
+        print(f"FALHOU: {falha}")
+    if falhas:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
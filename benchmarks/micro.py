@@ -0,0 +1,221 @@
+"""
+Micro-benchmarks dos cálculos puros (modules/calculos.py), sem banco e sem Streamlit.
+
+Casos (o "tamanho" é o volume de entrada de cada um):
+  calcular_carteira               n operações de investimento
+  preparar_dados_pizza_detalhada  n lançamentos
+  simular_projecao                n linhas (metade recorrências, metade faturas), 6 meses
+  simular_fire                    n meses simulados
+  simular_sac                     n meses de prazo
+  contas_fixas_quitadas           n lançamentos no mês x 20 contas fixas
+
+Cada caso roda nos tamanhos de --tamanhos (padrão 100 a 1M). Por tamanho, repete
+até somar --tempo-min segundos (no mínimo 3 vezes) e guarda a mediana, a
+vazão (linhas/s) e o expoente de escala em relação ao tamanho anterior
+(1 = linear, 2 = quadrático). Quando a estimativa do próximo tamanho passa de
+--limite-s por chamada, os tamanhos maiores daquele caso são pulados.
+
+Regressão: com --base, compara a vazão com um resultado anterior e sai com
+código 1 se algum ponto ficou mais lento que a tolerância.
+
+Uso:
+    python benchmarks/micro.py --saida benchmarks/resultados/micro_base.json
+    python benchmarks/micro.py --base benchmarks/resultados/micro_base.json [--tolerancia 0.2]
+"""
+import argparse
+import json
+import math
+import platform
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from modules import calculos  # noqa: E402
+from modules.esquemas import tipar  # noqa: E402
+from benchmarks.gerar_dados import ATIVOS, RECORRENCIAS, _DESPESAS, _RECEITAS  # noqa: E402
+
+TAMANHOS_PADRAO = [100, 1_000, 10_000, 100_000, 1_000_000]
+TOLERANCIA_PADRAO = 0.2
+SEED = 7
+
+# ==============================================================================
+# 🧪 ENTRADAS SINTÉTICAS (MESMO FORMATO DOS LOADERS: TIPADAS POR esquemas.tipar)
+# ==============================================================================
+
+def _centavos(valores):
+    return np.round(valores, 2)
+
+
+def _lancamentos(n, rng):
+    pares = [_DESPESAS[i] if i < len(_DESPESAS) else _RECEITAS[i - len(_DESPESAS)]
+             for i in rng.integers(0, len(_DESPESAS) + len(_RECEITAS), n)]
+    hoje = date.today()
+    return tipar(pd.DataFrame({
+        "data": [hoje - timedelta(days=int(d)) for d in rng.integers(0, 28, n)],
+        "tipo": [p[0] for p in pares], "categoria": [p[1] for p in pares],
+        "subcategoria": [p[2] for p in pares], "descricao": [p[2] for p in pares],
+        "valor": _centavos(rng.lognormal(np.log(80), 0.8, n)),
+    }), "lancamentos")
+
+
+def _investimentos(n, rng):
+    ativo = rng.integers(0, len(ATIVOS), n)
+    compra = rng.random(n) < 0.85
+    qtd = rng.integers(1, 50, n)
+    preco = np.array([a[2] for a in ATIVOS])[ativo]
+    return tipar(pd.DataFrame({
+        "data": pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 2000, n), unit="D"),
+        "ticker": [ATIVOS[i][0] for i in ativo], "classe": [ATIVOS[i][1] for i in ativo],
+        "tipo_operacao": np.where(compra, "Compra", "Venda"),
+        "quantidade": qtd, "total_operacao": _centavos(qtd * preco),
+    }), "investimentos")
+
+
+def _projecao(n, rng):
+    n_fixas, n_faturas = n - n // 2, n // 2
+    base = [RECORRENCIAS[i] for i in rng.integers(0, len(RECORRENCIAS), n_fixas)]
+    df_fixas = tipar(pd.DataFrame({
+        "nome": [r[0] for r in base], "tipo": [r[5] for r in base],
+        "valor": _centavos(rng.uniform(50, 3000, n_fixas)),
+        "dia_vencimento": rng.integers(1, 29, n_fixas),
+    }), "recorrencias")
+    hoje = date.today().replace(day=1)
+    df_faturas = tipar(pd.DataFrame({
+        "mes_fatura": [pd.Timestamp(hoje) + pd.DateOffset(months=int(m)) for m in rng.integers(0, 12, n_faturas)],
+        "dia_vencimento": rng.integers(1, 29, n_faturas),
+        "total_fatura": _centavos(rng.uniform(100, 5000, n_faturas)),
+    }), "lancamentos_cartao")
+    inicio = date.today()
+    fim = (pd.Timestamp(inicio) + pd.DateOffset(months=6)).date()
+    return (10000.0, df_fixas, df_faturas, inicio, fim, {})
+
+
+def _contas_fixas(n, rng):
+    df = _lancamentos(n, rng)
+    # Parte dos lançamentos corresponde às contas fixas (descrição contém o nome)
+    fixas = [f"Conta fixa {i}" for i in range(20)]
+    marcados = rng.random(n) < 0.01
+    df.loc[marcados, "descricao"] = [f"Conta fixa {i} - pagamento" for i in rng.integers(0, 40, marcados.sum())]
+    hoje = date.today()
+    return (df, fixas, hoje.month, hoje.year)
+
+
+def _executar_contas_fixas(df, fixas, mes, ano):
+    descricoes = calculos.descricoes_do_mes(df, "Despesa", mes, ano)
+    return [calculos.recorrencia_quitada(nome, descricoes) for nome in fixas]
+
+
+# nome -> (preparar(n, rng) -> args, executar(*args))
+CASOS = {
+    "calcular_carteira": (lambda n, rng: (_investimentos(n, rng),), calculos.calcular_carteira),
+    "preparar_dados_pizza_detalhada": (lambda n, rng: (_lancamentos(n, rng),), calculos.preparar_dados_pizza_detalhada),
+    "simular_projecao": (_projecao, calculos.simular_projecao),
+    "simular_fire": (lambda n, rng: (0.0, 1000.0, float("inf"), 0.008, n), calculos.simular_fire),
+    "simular_sac": (lambda n, rng: (200000.0, n, 9.0, 0.0), calculos.simular_sac),
+    "contas_fixas_quitadas": (_contas_fixas, _executar_contas_fixas),
+}
+
+# ==============================================================================
+# ⏱️ MEDIÇÃO
+# ==============================================================================
+
+def medir(funcao, args, tempo_min, repeticoes_min=3, repeticoes_max=1000):
+    """Mediana e melhor tempo (s) de `funcao(*args)`, repetindo até somar `tempo_min`."""
+    tempos = []
+    while len(tempos) < repeticoes_min or (sum(tempos) < tempo_min and len(tempos) < repeticoes_max):
+        inicio = time.perf_counter()
+        funcao(*args)
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos), min(tempos), len(tempos)
+
+
+def medir_caso(nome, tamanhos, tempo_min, limite_s):
+    preparar, executar = CASOS[nome]
+    pontos = []
+    for n in tamanhos:
+        anterior = pontos[-1] if pontos else None
+        if anterior and not anterior.get("pulado"):
+            # Estimativa pelo expoente observado (no mínimo linear)
+            expoente = max(1.0, anterior.get("expoente") or 1.0)
+            estimado = anterior["mediana_s"] * (n / anterior["tamanho"]) ** expoente
+            if estimado > limite_s:
+                pontos.append({"tamanho": n, "pulado": True, "estimado_s": estimado})
+                print(f"  {nome:<32} n={n:>9,}  pulado (estimativa {estimado:,.1f} s por chamada)", flush=True)
+                continue
+        elif anterior:
+            pontos.append({"tamanho": n, "pulado": True})
+            continue
+
+        args = preparar(n, np.random.default_rng([SEED, n]))
+        mediana, melhor, repeticoes = medir(executar, args, tempo_min)
+        ponto = {
+            "tamanho": n, "mediana_s": mediana, "melhor_s": melhor, "repeticoes": repeticoes,
+            "linhas_por_s": n / mediana if mediana > 0 else None,
+        }
+        if anterior:
+            ponto["expoente"] = math.log(mediana / anterior["mediana_s"]) / math.log(n / anterior["tamanho"])
+        pontos.append(ponto)
+        print(f"  {nome:<32} n={n:>9,}  {mediana * 1000:>10.2f} ms  {ponto['linhas_por_s'] or 0:>14,.0f} linhas/s"
+              + (f"  expoente {ponto['expoente']:.2f}" if "expoente" in ponto else ""), flush=True)
+    return pontos
+
+
+def comparar(atual, base, tolerancia):
+    """Lista de regressões: pontos em que a vazão caiu mais que `tolerancia` em relação à base."""
+    regressoes = []
+    for nome, pontos in atual["casos"].items():
+        anteriores = {p["tamanho"]: p for p in base.get("casos", {}).get(nome, []) if not p.get("pulado")}
+        for p in pontos:
+            b = anteriores.get(p["tamanho"])
+            if p.get("pulado") or not b or not b.get("linhas_por_s"):
+                continue
+            razao = p["linhas_por_s"] / b["linhas_por_s"]
+            if razao < 1 - tolerancia:
+                regressoes.append({"caso": nome, "tamanho": p["tamanho"], "razao": razao})
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--casos", nargs="*", choices=list(CASOS), help="Padrão: todos")
+    parser.add_argument("--tamanhos", nargs="*", type=int, default=TAMANHOS_PADRAO)
+    parser.add_argument("--tempo-min", type=float, default=0.5, help="Segundos somados por ponto")
+    parser.add_argument("--limite-s", type=float, default=10.0, help="Pula tamanhos cuja chamada estimada passe disso")
+    parser.add_argument("--base", type=Path, help="Resultado anterior para checar regressão")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_PADRAO, help="Queda de vazão aceita (0.2 = 20%%)")
+    parser.add_argument("--saida", type=Path, default=RAIZ / "benchmarks" / "resultados" / "micro.json")
+    args = parser.parse_args()
+
+    resultado = {
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "plataforma": platform.platform(),
+        "casos": {},
+    }
+    for nome in args.casos or list(CASOS):
+        resultado["casos"][nome] = medir_caso(nome, sorted(args.tamanhos), args.tempo_min, args.limite_s)
+
+    args.saida.parent.mkdir(parents=True, exist_ok=True)
+    args.saida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Resultados salvos em {args.saida}")
+
+    if args.base:
+        regressoes = comparar(resultado, json.loads(args.base.read_text(encoding="utf-8")), args.tolerancia)
+        for r in regressoes:
+            print(f"REGRESSÃO {r['caso']} n={r['tamanho']:,}: vazão em {r['razao']:.0%} da base")
+        if regressoes:
+            sys.exit(1)
+        print(f"Sem regressões acima de {args.tolerancia:.0%} em relação a {args.base}")
+
+
+if __name__ == "__main__":
+    main()
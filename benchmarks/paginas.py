@@ -0,0 +1,147 @@
+"""
+Benchmark de renderização ponta a ponta de cada página do menu, com orçamento.
+
+Para cada rota de main.py (via ?pagina=), com um usuário sintético já logado:
+  frio    caches do Streamlit limpos: tempo de parede e consultas ao banco;
+  quente  reexecução da mesma sessão (o que o usuário sente a cada clique);
+  memória pico de alocação (tracemalloc) numa renderização fria à parte.
+As consultas incluem a sidebar (notificações), então um N+1 ali aparece em
+todas as páginas.
+
+Os limites ficam em benchmarks/orcamentos_paginas.json:
+  {"Dashboard": {"consultas": 5, "consultas_quente": 2, "tempo_ms": ..., "memoria_mb": ...}, ...}
+Só as chaves presentes são conferidas. Estourou algum => código de saída 1.
+Páginas com "provisorio": true têm limites estimados a partir dos loaders, nunca
+medidos: o estouro é só avisado até a primeira medição.
+--atualizar-orcamentos grava as consultas medidas e tempo/memória com folga
+(e tira o "provisorio" das páginas medidas).
+
+Uso:
+    python benchmarks/paginas.py [--linhas 10000] [--paginas Dashboard Cartões] [--dsn ...]
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from benchmarks import comum  # noqa: E402
+
+ARQUIVO_ORCAMENTOS = RAIZ / "benchmarks" / "orcamentos_paginas.json"
+FOLGA = 1.5  # margem de tempo/memória ao atualizar os orçamentos
+
+
+def _renderizar(at):
+    """Executa o script; devolve (ms, consultas por origem, erro)."""
+    antes = comum.consultas_por_origem()
+    inicio = time.perf_counter()
+    at.run()
+    ms = (time.perf_counter() - inicio) * 1000
+    erro = at.exception[0].message if at.exception else None
+    return ms, comum.diferenca_origens(antes, comum.consultas_por_origem()), erro
+
+
+def medir_pagina(dsn, user_id, pagina, medir_memoria=True):
+    from modules import database
+
+    database.clear_cache()
+    at = comum.nova_sessao(dsn, user_id, pagina)
+    frio_ms, frio_origens, erro = _renderizar(at)
+    quente_ms, quente_origens, erro_quente = _renderizar(at)
+    resultado = {
+        "tempo_ms": frio_ms, "consultas": sum(frio_origens.values()), "por_origem": frio_origens,
+        "tempo_quente_ms": quente_ms, "consultas_quente": sum(quente_origens.values()),
+        "erro": erro or erro_quente,
+    }
+    if medir_memoria:
+        database.clear_cache()
+        at = comum.nova_sessao(dsn, user_id, pagina)
+        tracemalloc.start()
+        try:
+            base, _ = tracemalloc.get_traced_memory()
+            at.run()
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        resultado["memoria_mb"] = (pico - base) / 2**20
+    return resultado
+
+
+def conferir(resultados, orcamentos):
+    """Lista de (página, métrica, medido, limite, provisório) acima do orçamento."""
+    estouros = []
+    for pagina, r in resultados.items():
+        orcamento = orcamentos.get(pagina, {})
+        for metrica, limite in orcamento.items():
+            if metrica == "provisorio":
+                continue
+            if metrica in r and r[metrica] is not None and r[metrica] > limite:
+                estouros.append((pagina, metrica, r[metrica], limite, bool(orcamento.get("provisorio"))))
+    return estouros
+
+
+def novos_orcamentos(resultados):
+    return {
+        pagina: {
+            "consultas": r["consultas"], "consultas_quente": r["consultas_quente"],
+            "tempo_ms": round(r["tempo_ms"] * FOLGA), "tempo_quente_ms": round(r["tempo_quente_ms"] * FOLGA),
+            **({"memoria_mb": round(r["memoria_mb"] * FOLGA, 1)} if "memoria_mb" in r else {}),
+        }
+        for pagina, r in resultados.items() if not r["erro"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paginas", nargs="*", help="Padrão: todas as do menu")
+    parser.add_argument("--linhas", type=int, default=10_000, help="Lançamentos do usuário sintético")
+    parser.add_argument("--dsn", help="Banco existente (as tabelas são truncadas); padrão: Postgres descartável")
+    parser.add_argument("--sem-memoria", action="store_true", help="Pula a medição com tracemalloc")
+    parser.add_argument("--orcamentos", type=Path, default=ARQUIVO_ORCAMENTOS)
+    parser.add_argument("--atualizar-orcamentos", action="store_true")
+    parser.add_argument("--saida", type=Path, default=RAIZ / "benchmarks" / "resultados" / "paginas.json")
+    args = parser.parse_args()
+
+    resultados = {}
+    with comum.cotacoes_falsas(), comum.banco_com_usuario(args.dsn, args.linhas) as (dsn, user_id):
+        for pagina in comum.paginas(args.paginas):
+            r = resultados[pagina] = medir_pagina(dsn, user_id, pagina, not args.sem_memoria)
+            print(f"{pagina:<16} frio {r['tempo_ms']:>8.0f} ms {r['consultas']:>3} consultas | "
+                  f"quente {r['tempo_quente_ms']:>7.0f} ms {r['consultas_quente']:>3} consultas"
+                  + (f" | {r['memoria_mb']:.1f} MB" if "memoria_mb" in r else "")
+                  + (f" | ERRO: {r['erro']}" if r["erro"] else ""), flush=True)
+
+    args.saida.parent.mkdir(parents=True, exist_ok=True)
+    args.saida.write_text(json.dumps({
+        "data": datetime.now().isoformat(timespec="seconds"), "linhas": args.linhas, "paginas": resultados,
+    }, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    if args.atualizar_orcamentos:
+        atuais = json.loads(args.orcamentos.read_text(encoding="utf-8")) if args.orcamentos.exists() else {}
+        atuais.update(novos_orcamentos(resultados))
+        args.orcamentos.write_text(json.dumps(atuais, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"Orçamentos atualizados em {args.orcamentos}")
+        return
+
+    orcamentos = json.loads(args.orcamentos.read_text(encoding="utf-8")) if args.orcamentos.exists() else {}
+    estouros = conferir(resultados, orcamentos)
+    erros = [p for p, r in resultados.items() if r["erro"]]
+    for pagina, metrica, medido, limite, provisorio in estouros:
+        if provisorio:
+            print(f"Aviso: {pagina}: {metrica} = {medido:.0f} acima do limite provisório {limite} "
+                  "(rode com --atualizar-orcamentos)")
+        else:
+            print(f"ORÇAMENTO ESTOURADO {pagina}: {metrica} = {medido:.0f} (limite {limite})")
+    for pagina in erros:
+        print(f"ERRO ao renderizar {pagina}")
+    if erros or any(not provisorio for *_, provisorio in estouros):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
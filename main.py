@@ -2,24 +2,24 @@ import streamlit as st
 import extra_streamlit_components as stx
 from streamlit_option_menu import option_menu
 from modules.database import init_db, criar_usuario, verificar_login, criar_sessao, validar_sessao, apagar_sessao
-import modules.ui_lancamentos as ui_lancamentos
-import modules.ui_dashboard as ui_dashboard
-import modules.ui_investimentos as ui_investimentos
-import modules.ui_metasgasto as ui_metasgasto
-import time
-import modules.ui_cartoes as ui_cartoes
-import modules.ui_despesas_fixas as ui_despesas_fixas
-import modules.ui_ferramentas as ui_ferramentas
 import modules.notifications as notifications
-import modules.ui_reserva as ui_reserva
-import modules.ui_despesas_fixas as ui_despesas_fixas
-import modules.ui_projecao as ui_projecao
-import modules.ui_receitas_fixas as ui_receitas_fixas
-import modules.ui_metasgasto as ui_metasgasto
+from modules.manutencao import iniciar_manutencao
+from modules.metricas import iniciar_exportador
+from modules.senhas import permitir_tentativa
+from modules.config import obter_config
+from modules.paginas import PAGINAS, mostrar_pagina, relatorio_importacoes
+import modules.instrumentacao as instrumentacao
+import modules.rastreamento as rastreamento
+import modules.perfilador as perfilador
 
 # 1. Configuração da Página
 st.set_page_config(page_title="Sistema Financeiro", page_icon="💰", layout="wide")
 
+# Zera a contagem de consultas ao banco desta reexecução (e inicia o trace, se ligado)
+instrumentacao.iniciar_rerun()
+rastreamento.iniciar_rastreamento(forcar=st.session_state.get('rastrear_proxima', False))
+st.session_state['rastrear_proxima'] = False
+
 # CSS Personalizado
 st.markdown("""
 <style>
@@ -35,6 +35,17 @@ st.markdown("""
 # 2. Inicializar Gerenciador de Cookies
 cookie_manager = stx.CookieManager(key="cookie_manager")
 
+def token_do_cookie():
+    """Token de sessão do navegador: o da requisição (st.context.cookies) ou, na falta, o do CookieManager."""
+    token = st.context.cookies.get("financas_token")
+    if not isinstance(token, str):  # sem navegador (ex: AppTest) não há cookies na requisição
+        token = cookie_manager.get(cookie="financas_token")
+    return token
+
+# Limpeza periódica das sessões e exportador de métricas (threads únicas por processo)
+iniciar_manutencao()
+iniciar_exportador()
+
 # Inicializar Estado de Sessão
 if 'logged_in' not in st.session_state:
     st.session_state['logged_in'] = False
@@ -44,10 +55,12 @@ if 'user_name' not in st.session_state:
     st.session_state['user_name'] = ""
 
 # 3. Lógica de Auto-Login (Verificar Cookie)
-if not st.session_state['logged_in']:
-    time.sleep(0.5) 
-    
-    cookie_token = cookie_manager.get(cookie="financas_token")
+# O cookie já chega com a própria requisição (st.context.cookies), então a sessão é
+# restaurada na primeira execução, sem esperar o componente. O CookieManager fica
+# como reserva: quando ele reporta os cookies do navegador, o Streamlit reexecuta
+# o script sozinho, sem sleep.
+if not st.session_state['logged_in'] and not st.session_state.get('logout_feito'):
+    cookie_token = token_do_cookie()
     
     if cookie_token:
         user_data = validar_sessao(cookie_token)
@@ -55,6 +68,7 @@ if not st.session_state['logged_in']:
             st.session_state['logged_in'] = True
             st.session_state['user_id'] = user_data['id']
             st.session_state['user_name'] = user_data['name']
+            st.session_state['username'] = user_data['username']
             st.rerun() 
 
 # --- TELA DE LOGIN / CADASTRO ---
@@ -70,28 +84,41 @@ if not st.session_state['logged_in']:
         tab_login, tab_cadastro = st.tabs(["Entrar", "Criar Conta"])
         
         with tab_login:
+            novo_cookie = None
             with st.form("login_form"):
                 user = st.text_input("Usuário")
                 pw = st.text_input("Senha", type="password")
                 manter_conectado = st.checkbox("Manter-me conectado")
                 
                 if st.form_submit_button("Entrar", type="primary"):
+                    if not permitir_tentativa(user):
+                        st.error("Muitas tentativas. Aguarde um minuto e tente novamente.")
+                        st.stop()
                     dados_user = verificar_login(user, pw)
                     if dados_user:
                         st.session_state['logged_in'] = True
                         st.session_state['user_id'] = dados_user['id']
                         st.session_state['user_name'] = dados_user['name']
+                        st.session_state['username'] = dados_user['username']
+                        st.session_state['logout_feito'] = False
                         
                         if manter_conectado:
-                            token, validade = criar_sessao(dados_user['id'])
+                            token, validade = criar_sessao(dados_user['id'], dados_user['name'], dados_user['username'])
                             if token:
-                                cookie_manager.set("financas_token", token, expires_at=validade)
+                                novo_cookie = (token, validade)
                         
-                        st.success(f"Bem-vindo, {dados_user['name']}!")
-                        time.sleep(1)
-                        st.rerun()
+                        if not novo_cookie:
+                            st.rerun()
                     else:
                         st.error("Usuário ou senha incorretos.")
+            
+            if novo_cookie:
+                # O componente precisa montar no navegador para gravar o cookie (fora do form,
+                # senão o valor dele só seria enviado no próximo submit). Quando grava, ele
+                # devolve um valor e o Streamlit reexecuta sozinho, já na área logada.
+                cookie_manager.set("financas_token", novo_cookie[0], expires_at=novo_cookie[1])
+                st.success(f"Bem-vindo, {st.session_state['user_name']}!")
+                st.stop()
         
         with tab_cadastro:
             with st.form("signup_form"):
@@ -110,13 +137,18 @@ else:
         st.write(f"👤 **{st.session_state['user_name']}**")
         
         if st.button("Sair (Logout)"):
-            token_atual = cookie_manager.get("financas_token")
+            token_atual = token_do_cookie()
             if token_atual:
                 apagar_sessao(token_atual)
-                cookie_manager.delete("financas_token")
+                try:
+                    cookie_manager.delete("financas_token")
+                except KeyError:  # o componente ainda não reportou o cookie (veio só da requisição)
+                    pass
             
             st.session_state['logged_in'] = False
             st.session_state['user_id'] = None
+            # O st.context.cookies desta conexão ainda traz o token antigo
+            st.session_state['logout_feito'] = True
             st.rerun()
             
         st.divider()
@@ -124,14 +156,17 @@ else:
         # --- EXIBIR NOTIFICAÇÕES (VOCÊ FEZ CORRETO) ---
         notifications.exibir_notificacoes_na_sidebar(st.session_state['user_id'])
         
+        # ?pagina=Cartões abre direto numa página (links e benchmarks de renderização)
+        pagina_inicial = st.query_params.get("pagina")
+        
         selected = option_menu(
             menu_title="Menu Principal",
             # --- CORREÇÃO AQUI: ADICIONEI "Reserva" ---
-            options=["Dashboard", "Lançamentos", "Receitas Fixas","Despesas Fixas", "Projeção", "Cartões", "Investimentos", "Reserva", "Metas de Gasto", "Ferramentas"],
+            options=list(PAGINAS),
             # --- CORREÇÃO AQUI: ADICIONEI ÍCONE "safe" ou "shield-lock" ---
             icons=["graph-up-arrow", "pencil-square", "cash-stack", "calendar-x", "activity", "credit-card", "bank", "safe", "calculator", "arrow-repeat", "tools"],
             menu_icon="cast",
-            default_index=0,
+            default_index=list(PAGINAS).index(pagina_inicial) if pagina_inicial in PAGINAS else 0,
             styles={
                 "container": {"padding": "5!important", "background-color": "#1F2229"},
                 "icon": {"color": "#9D9D9D", "font-size": "20px"}, 
@@ -140,24 +175,30 @@ else:
             }
         )
 
-    # Roteamento
-    if selected == "Lançamentos":
-        ui_lancamentos.show_lancamentos()
-    elif selected == "Dashboard":
-        ui_dashboard.show_dashboard()
-    elif selected == "Investimentos":
-        ui_investimentos.show_investimentos()
-    elif selected == "Metas de Gasto":
-        ui_metasgasto.show_orcamento()
-    elif selected == "Cartões":
-        ui_cartoes.show_cartoes()
-    elif selected == "Ferramentas":
-        ui_ferramentas.show_ferramentas()
-    elif selected == "Reserva":
-        ui_reserva.show_reserva()
-    elif selected == "Despesas Fixas":
-        ui_despesas_fixas.show_despesas_fixas()
-    elif selected == "Projeção":
-        ui_projecao.show_projecao()
-    elif selected == "Receitas Fixas":
-        ui_receitas_fixas.show_receitas_fixas()
\ No newline at end of file
+    # Roteamento (o módulo da página só é importado quando ela é aberta).
+    # st.rerun()/st.stop() numa página interrompem o script com exceção: o finally
+    # garante que essas reexecuções também passem pelo orçamento e pelo trace
+    try:
+        with rastreamento.span("roteador", "app", pagina=selected):
+            if perfilador.deve_perfilar(selected):
+                perfilador.executar_perfilado(lambda: mostrar_pagina(selected), selected)
+            else:
+                mostrar_pagina(selected)
+    finally:
+        resumo_banco = instrumentacao.finalizar_rerun()
+        arquivo_trace = rastreamento.finalizar_rastreamento(selected)
+
+    perfilador.mostrar_controles(selected)
+
+    if obter_config("DEBUG_PERFORMANCE"):
+        instrumentacao.mostrar_painel_debug(resumo_banco)
+        with st.sidebar.expander("🧵 Trace"):
+            if arquivo_trace:
+                st.caption(f"Gravado em {arquivo_trace}")
+                st.download_button("Baixar trace (JSON)", data=arquivo_trace.read_bytes(), file_name=arquivo_trace.name, mime="application/json")
+            if st.button("Rastrear próxima renderização"):
+                st.session_state['rastrear_proxima'] = True
+                st.rerun()
+        with st.sidebar.expander("⏱️ Importação das páginas"):
+            for nome, ms in relatorio_importacoes():
+                st.caption(f"{nome}: {ms:.0f} ms")
\ No newline at end of file
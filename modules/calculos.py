@@ -0,0 +1,215 @@
+import calendar
+from datetime import timedelta
+import pandas as pd
+
+# ==============================================================================
+# 🧮 CÁLCULOS PUROS (SEM STREAMLIT E SEM BANCO)
+# ==============================================================================
+# Núcleo numérico das páginas, separado da interface para poder ser chamado e
+# medido fora do app (benchmarks/micro.py). As páginas só leem os widgets,
+# chamam estas funções e desenham o resultado.
+
+# --- INVESTIMENTOS ---
+
+def calcular_carteira(df):
+    """Posição atual por ticker (quantidade, preço médio e custo) a partir das operações."""
+    if df.empty: return pd.DataFrame()
+    carteira = {}
+    df = df.sort_values(by='data')
+    for _, row in df.iterrows():
+        ticker = row['ticker']; qtd = float(row['quantidade']); total = float(row['total_operacao'])
+        tipo = row['tipo_operacao']; classe = row['classe']
+        if ticker not in carteira: carteira[ticker] = {'qtd': 0, 'custo_total': 0.0, 'classe': classe}
+        if tipo == 'Compra':
+            carteira[ticker]['qtd'] += qtd; carteira[ticker]['custo_total'] += total
+        elif tipo == 'Venda':
+            pm = carteira[ticker]['custo_total'] / carteira[ticker]['qtd'] if carteira[ticker]['qtd'] > 0 else 0
+            carteira[ticker]['qtd'] -= qtd; carteira[ticker]['custo_total'] -= (qtd * pm)
+    dados = []
+    for t, d in carteira.items():
+        if d['qtd'] > 0: dados.append({'Ticker': t, 'Classe': d['classe'], 'Quantidade': d['qtd'], 'Preço Médio': d['custo_total']/d['qtd'], 'Custo Total': d['custo_total']})
+    return pd.DataFrame(dados)
+
+# --- DASHBOARD ---
+
+def preparar_dados_pizza_detalhada(df_filtrado, tipo_filtro='Despesa'):
+    """
+    Gera um dataframe pronto para o gráfico de pizza, incluindo
+    uma string HTML com as top subcategorias para o tooltip.
+    """
+    # 1. Filtra pelo tipo (ex: Despesa)
+    df_f = df_filtrado[df_filtrado['tipo'] == tipo_filtro]
+
+    if df_f.empty: return pd.DataFrame()
+
+    # 2. Agrupa por Categoria para o gráfico principal
+    df_cat = df_f.groupby('categoria', observed=True)['valor'].sum().reset_index()
+
+    # 3. Lógica para criar o texto do tooltip (Subcategorias)
+    lista_tooltips = []
+
+    for cat in df_cat['categoria']:
+        # Pega as subcategorias desta categoria
+        df_sub = df_f[df_f['categoria'] == cat]
+        total_cat = df_sub['valor'].sum()
+
+        # Agrupa subcategorias, ordena e pega top 5
+        sub_group = df_sub.groupby('subcategoria', observed=True)['valor'].sum().reset_index()
+        sub_group = sub_group.sort_values('valor', ascending=False).head(5)
+
+        # Monta HTML
+        html_tooltip = ""
+        for _, row in sub_group.iterrows():
+            pct = (row['valor'] / total_cat) * 100
+            # Se a subcategoria for vazia/nula, chama de "Geral"
+            nome_sub = row['subcategoria'] if row['subcategoria'] else "Geral"
+            html_tooltip += f"• {nome_sub}: R$ {row['valor']:,.2f} ({pct:.0f}%)<br>"
+
+        lista_tooltips.append(html_tooltip)
+
+    df_cat['info_extra'] = lista_tooltips
+    return df_cat
+
+# --- PROJEÇÃO DE SALDO ---
+
+def meses_com_provisao(data_inicio, data_fim):
+    """(ano, mes) cujo último dia cai dentro da simulação (é quando as metas são provisionadas)."""
+    meses = []
+    ano, mes = data_inicio.year, data_inicio.month
+    while True:
+        ultimo = data_inicio.replace(year=ano, month=mes, day=calendar.monthrange(ano, mes)[1])
+        if ultimo > data_fim:
+            return meses
+        meses.append((ano, mes))
+        ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+
+
+def simular_projecao(saldo_inicial, df_fixas, df_faturas, data_inicio, data_fim, provisoes=None):
+    """
+    Simula o saldo dia a dia entre `data_inicio` e `data_fim`.
+    `provisoes`: {(ano, mes): (valor, descrição)} lançado no último dia do mês.
+    Retorna a timeline (só os dias com movimento, o primeiro e o último).
+    """
+    provisoes = provisoes or {}
+    timeline = []
+    saldo_corrente = float(saldo_inicial)
+    data_cursor = data_inicio
+
+    # Avança dia a dia
+    while data_cursor <= data_fim:
+        dia = data_cursor.day
+        mes = data_cursor.month
+        ano = data_cursor.year
+
+        entradas = 0.0
+        saidas = 0.0
+        detalhes = []
+
+        # 1. Recorrências (Despesas Fixas / Receitas Fixas)
+        if not df_fixas.empty:
+            recs_do_dia = df_fixas[df_fixas['dia_vencimento'] == dia]
+            for _, row in recs_do_dia.iterrows():
+                val = float(row['valor'])
+                if row['tipo'] == 'Receita':
+                    entradas += val
+                    detalhes.append(f"Receita: {row['nome']}")
+                else:
+                    saidas += val
+                    detalhes.append(f"Fixo: {row['nome']}")
+
+        # 2. Faturas de Cartão
+        if not df_faturas.empty:
+            for _, fat in df_faturas.iterrows():
+                dt_fat = pd.to_datetime(fat['mes_fatura']).date()
+                dia_venc_card = int(fat['dia_vencimento'])
+
+                if dt_fat.month == mes and dt_fat.year == ano and dia_venc_card == dia:
+                    val_fat = float(fat['total_fatura'])
+                    saidas += val_fat
+                    detalhes.append(f"Fatura Cartão: R$ {val_fat:.2f}")
+
+        # 3. Provisão de Metas
+        _, ultimo_dia = calendar.monthrange(ano, mes)
+        if dia == ultimo_dia and (ano, mes) in provisoes:
+            valor, descricao = provisoes[(ano, mes)]
+            saidas += valor
+            detalhes.append(descricao)
+
+        # Atualiza Saldo
+        saldo_corrente = saldo_corrente + entradas - saidas
+
+        # Registra na timeline
+        if entradas != 0 or saidas != 0 or data_cursor == data_inicio or data_cursor == data_fim:
+            timeline.append({
+                "Data": data_cursor,
+                "Saldo": saldo_corrente,
+                "Entrada": entradas,
+                "Saida": saidas,
+                "Descricao": ", ".join(detalhes)
+            })
+
+        data_cursor += timedelta(days=1)
+
+    return pd.DataFrame(timeline)
+
+# --- FERRAMENTAS ---
+
+def simular_fire(patrimonio_atual, aporte_mensal, numero_magico, taxa_mensal, max_meses=600):
+    """Meses até o patrimônio atingir o número mágico. Retorna (saldo, meses, pontos anuais do gráfico)."""
+    saldo = patrimonio_atual
+    meses = 0
+    dados_grafico = []
+    while saldo < numero_magico and meses < max_meses:
+        rendimento = saldo * taxa_mensal
+        saldo += rendimento + aporte_mensal
+        meses += 1
+        if meses % 12 == 0: # Grava ano a ano p/ grafico nao ficar pesado
+            dados_grafico.append({"Ano": meses/12, "Saldo": saldo, "Meta": numero_magico})
+    return saldo, meses, dados_grafico
+
+
+def simular_sac(val_divida, prazo_meses, juros_anual, amort_extra=0.0):
+    """Tabela SAC com amortização extra opcional. Retorna totais, meses usados e a evolução do saldo."""
+    taxa_mensal = (juros_anual / 100) / 12
+    amortizacao_fixa = val_divida / prazo_meses
+
+    saldo_devedor = val_divida
+    total_pago = 0
+    total_juros = 0
+    evolucao = []
+
+    mes_atual = 1
+    while saldo_devedor > 0:
+        juros = saldo_devedor * taxa_mensal
+        parcela = amortizacao_fixa + juros
+
+        # Abate parcela normal
+        saldo_devedor -= amortizacao_fixa
+        total_pago += parcela
+        total_juros += juros
+
+        # Amortização Extra
+        if amort_extra > 0 and saldo_devedor > 0:
+            abatimento = min(amort_extra, saldo_devedor)
+            saldo_devedor -= abatimento
+            total_pago += abatimento
+
+        evolucao.append({"Mês": mes_atual, "Saldo Devedor": max(0, saldo_devedor)})
+        mes_atual += 1
+
+        if saldo_devedor <= 0: break
+
+    return {"total_pago": total_pago, "total_juros": total_juros, "meses": mes_atual - 1, "evolucao": evolucao}
+
+# --- CONTAS FIXAS ---
+
+def descricoes_do_mes(df_lancamentos, tipo, mes, ano):
+    """Descrições dos lançamentos de `tipo` no mês (base do "já foi pago/recebido?")."""
+    if df_lancamentos.empty: return []
+    mask = (df_lancamentos['mes'] == mes) & (df_lancamentos['ano'] == ano) & (df_lancamentos['tipo'] == tipo)
+    return df_lancamentos[mask]['descricao'].tolist()
+
+
+def recorrencia_quitada(nome, descricoes):
+    """A fixa conta como paga se o nome dela estiver contido na descrição de algum lançamento."""
+    return any(nome in item for item in descricoes)
@@ -0,0 +1,18 @@
+import os
+import streamlit as st
+
+# ==============================================================================
+# ⚙️ CONFIGURAÇÃO
+# ==============================================================================
+# Ordem de prioridade: variável de ambiente > st.secrets > padrão.
+
+def obter_config(chave, padrao=None):
+    """Lê uma configuração do ambiente ou dos Secrets do Streamlit."""
+    valor = os.environ.get(chave)
+    if valor is not None:
+        return valor
+    try:
+        return st.secrets[chave]
+    except Exception:
+        # Chave ausente ou nenhum secrets.toml configurado
+        return padrao
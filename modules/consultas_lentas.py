@@ -0,0 +1,137 @@
+import json
+import logging
+import queue
+import re
+import threading
+import time
+import psycopg2
+from modules.config import obter_config
+
+# ==============================================================================
+# 🐢 LOG DE CONSULTAS LENTAS (COM EXPLAIN ANALYZE)
+# ==============================================================================
+# Quando uma instrução passa de CONSULTA_LENTA_MS, o cursor instrumentado chama
+# registrar(). O trabalho pesado vai para um único thread em segundo plano, numa
+# conexão à parte (não instrumentada): para SELECT/WITH roda
+# EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) com os parâmetros reais, sempre com
+# rollback, e grava tudo na tabela `consultas_lentas`. Leituras que travam
+# linhas (FOR UPDATE/SHARE) e WITH com escrita recebem só o EXPLAIN simples:
+# o ANALYZE esperaria a trava que a transação de quem chamou ainda segura. Os parâmetros gravados
+# são só os tipos (redigidos). EXPLAIN no máximo uma vez a cada
+# EXPLAIN_INTERVALO_S por função, para não dobrar a carga justo quando o banco
+# já está lento.
+
+logger = logging.getLogger(__name__)
+
+LIMIAR_PADRAO_MS = 500
+INTERVALO_EXPLAIN_PADRAO_S = 300
+TIMEOUT_EXPLAIN_MS = 15000
+
+_fila = queue.Queue(maxsize=100)
+_trava = threading.Lock()
+_ultimo_explain = {}  # funcao -> monotonic
+_worker = None
+
+# Executar estas com ANALYZE travaria linhas (FOR [NO KEY] UPDATE, FOR [KEY] SHARE)
+# ou escreveria (WITH ... INSERT/UPDATE/DELETE/MERGE)
+_RE_SEM_ANALYZE = re.compile(r"\b(UPDATE|SHARE|INSERT|DELETE|MERGE)\b", re.I)
+
+
+def limiar_ms():
+    return float(obter_config("CONSULTA_LENTA_MS", LIMIAR_PADRAO_MS))
+
+
+def redigir_parametros(params):
+    """Troca cada valor pelo seu tipo (e tamanho, para textos/listas): nada de dado do usuário no log."""
+    def redigir(v):
+        if v is None:
+            return "NULL"
+        if isinstance(v, (str, bytes, list, tuple)):
+            return f"<{type(v).__name__}:{len(v)}>"
+        return f"<{type(v).__name__}>"
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return json.dumps({k: redigir(v) for k, v in params.items()}, ensure_ascii=False)
+    return json.dumps([redigir(v) for v in params], ensure_ascii=False)
+
+
+def _pode_explicar(sql, funcao):
+    inicio = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+    if inicio not in ("SELECT", "WITH"):
+        return False  # EXPLAIN só de leituras
+    intervalo = float(obter_config("EXPLAIN_INTERVALO_S", INTERVALO_EXPLAIN_PADRAO_S))
+    agora = time.monotonic()
+    with _trava:
+        if agora - _ultimo_explain.get(funcao, float("-inf")) < intervalo:
+            return False
+        _ultimo_explain[funcao] = agora
+    return True
+
+
+def _usa_analyze(sql):
+    """ANALYZE executa a instrução: só para leituras que não travam nem escrevem."""
+    return not _RE_SEM_ANALYZE.search(sql)
+
+
+def registrar(dsn, funcao, sql, params, duracao_ms, user_id=None, pagina=None):
+    """Enfileira uma consulta lenta (não bloqueia o script; descarta se a fila estiver cheia)."""
+    if isinstance(sql, bytes):
+        sql = sql.decode("utf-8", errors="replace")
+    elif not isinstance(sql, str):
+        sql = str(sql)  # psycopg2.sql.Composed etc.
+    item = {
+        "dsn": dsn, "funcao": funcao, "sql": sql, "params": params,
+        "duracao_ms": duracao_ms, "user_id": user_id, "pagina": pagina,
+        "explicar": _pode_explicar(sql, funcao), "analyze": _usa_analyze(sql),
+    }
+    logger.warning("Consulta lenta em %s (usuário %s): %.0f ms", funcao, user_id, duracao_ms)
+    _iniciar_worker()
+    try:
+        _fila.put_nowait(item)
+    except queue.Full:
+        pass
+
+
+def _iniciar_worker():
+    global _worker
+    with _trava:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_processar, name="consultas-lentas", daemon=True)
+            _worker.start()
+
+
+def _explain(conn, sql, params, analyze=True):
+    opcoes = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+    c = conn.cursor()
+    try:
+        c.execute(f"SET LOCAL statement_timeout = {TIMEOUT_EXPLAIN_MS}")
+        c.execute(f"EXPLAIN ({opcoes}) " + sql, params)
+        plano = c.fetchone()[0]
+        return plano if isinstance(plano, str) else json.dumps(plano)
+    except Exception as e:
+        return json.dumps({"erro": str(e)})
+    finally:
+        conn.rollback()
+
+
+def _processar():
+    while True:
+        item = _fila.get()
+        try:
+            conn = psycopg2.connect(item["dsn"])
+            try:
+                plano = _explain(conn, item["sql"], item["params"], item["analyze"]) if item["explicar"] else None
+                c = conn.cursor()
+                c.execute("""
+                    INSERT INTO consultas_lentas (funcao, user_id, pagina, duracao_ms, sql, parametros, plano)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                """, (item["funcao"], item["user_id"], item["pagina"], round(item["duracao_ms"], 2),
+                      item["sql"], redigir_parametros(item["params"]), plano))
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception:
+            logger.exception("Falha ao gravar consulta lenta de %s", item["funcao"])
+        finally:
+            _fila.task_done()
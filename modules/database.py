@@ -1,21 +1,77 @@
 import streamlit as st
 import pandas as pd
-import psycopg2
-import bcrypt
+from psycopg2.extras import execute_values
 import uuid
+import io
 from datetime import datetime, timedelta
+from decimal import Decimal
+from modules import sessao_assinada, senhas
+from modules.config import obter_config
+from modules.esquemas import tipar, tipos_arrow
+from modules.instrumentacao import conectar
+from modules.rastreamento import cache_data_rastreado, cache_compartilhado, limpar_compartilhados
 
 # --- HELPER: LIMPAR CACHE ---
 def clear_cache():
     """Limpa o cache do Streamlit para forçar recarregamento de dados."""
     st.cache_data.clear()
-
-# Função para conectar ao Supabase usando st.secrets
-def get_connection():
-    return psycopg2.connect(st.secrets["DATABASE_URL"])
+    limpar_compartilhados()
+
+# Função para conectar ao Supabase usando st.secrets (ou DATABASE_URL no ambiente,
+# para scripts e benchmarks fora do Streamlit)
+# (conexão instrumentada: `origem` é o nome com que as consultas aparecem nos
+# histogramas, no orçamento por reexecução e no log de consultas lentas; quem
+# chama passa o nome da própria função, e helpers recebem o de quem os usa)
+def get_connection(origem):
+    return conectar(obter_config("DATABASE_URL"), origem=origem)
+
+# --- HELPER: CONSULTA -> DATAFRAME ---
+# No lugar do pd.read_sql_query (que avisa a cada chamada por não receber uma
+# conexão SQLAlchemy). Dois caminhos:
+# - cursor comum: fetchall + DataFrame, uma tupla Python por linha;
+# - COPY (SELECT ...) TO STDOUT em CSV lido pelo parser do Arrow (colunar e
+#   multithread), bem mais rápido em resultados grandes. Só para consultas com
+#   `tabela`: os tipos das colunas vêm do esquema (modules/esquemas.py) em vez
+#   de serem adivinhados, e o tipar() termina a conversão, então os dois
+#   caminhos devolvem os mesmos dtypes.
+# O tamanho do resultado só se conhece depois de ler, então a escolha usa o
+# da última leitura da mesma consulta (SQL + parâmetros) neste processo.
+LIMIAR_COPY_PADRAO = 20000  # linhas
+MAX_CONSULTAS_LEMBRADAS = 10000
+_linhas_por_consulta = {}
+
+def _limiar_copy():
+    return int(obter_config("LIMIAR_COPY_LINHAS", LIMIAR_COPY_PADRAO))
+
+def _ler_copy(c, sql, params, tabela):
+    from pyarrow import csv
+    consulta = c.mogrify(sql, params).decode("utf-8")
+    buffer = io.BytesIO()
+    # NULL vira \N para não se confundir com texto vazio; booleanos vêm como t/f
+    c.copy_expert(f"COPY ({consulta}) TO STDOUT WITH (FORMAT csv, HEADER true, NULL '\\N')", buffer)
+    buffer.seek(0)
+    opcoes = csv.ConvertOptions(
+        column_types=tipos_arrow(tabela), null_values=["\\N"], strings_can_be_null=True,
+        quoted_strings_can_be_null=False, true_values=["t"], false_values=["f"],
+    )
+    return csv.read_csv(buffer, convert_options=opcoes).to_pandas(date_as_object=False)
+
+def ler_sql(conn, sql, params=None, tabela=None):
+    """DataFrame com o resultado da consulta; com `tabela`, já tipado pelo esquema dela."""
+    chave = (sql, repr(params))
+    c = conn.cursor()
+    if tabela and _linhas_por_consulta.get(chave, 0) >= _limiar_copy():
+        df = _ler_copy(c, sql, params, tabela)
+    else:
+        c.execute(sql, params)
+        df = pd.DataFrame.from_records(c.fetchall(), columns=[d[0] for d in c.description], coerce_float=True)
+    if len(_linhas_por_consulta) >= MAX_CONSULTAS_LEMBRADAS:
+        _linhas_por_consulta.clear()
+    _linhas_por_consulta[chave] = len(df)
+    return tipar(df, tabela) if tabela else df
 
 def init_db():
-    conn = get_connection()
+    conn = get_connection("init_db")
     c = conn.cursor()
     
     # 1. Usuários
@@ -38,6 +94,18 @@ def init_db():
         )
     ''')
 
+    # Limpeza de expiradas e limite de sessões por usuário
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sessions_user_created ON sessions (user_id, created_at DESC)")
+
+    # 2.1 Sessões assinadas revogadas (logout no modo SESSION_MODE=assinado)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS sessoes_revogadas (
+            jti TEXT PRIMARY KEY,
+            expires_at TIMESTAMP
+        )
+    ''')
+
     # 3. Lançamentos (Caixa)
     c.execute('''
         CREATE TABLE IF NOT EXISTS lancamentos (
@@ -54,6 +122,12 @@ def init_db():
             status TEXT
         )
     ''')
+    # Fingerprint de importação (extratos CSV/OFX) para não duplicar lançamentos
+    c.execute("ALTER TABLE lancamentos ADD COLUMN IF NOT EXISTS hash_importacao TEXT")
+    c.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_lancamentos_hash_importacao
+        ON lancamentos (user_id, hash_importacao) WHERE hash_importacao IS NOT NULL
+    ''')
 
     # 4. Investimentos
     c.execute('''
@@ -195,26 +269,99 @@ def init_db():
             descricao TEXT
         )
     ''')
+    # Soma do extrato por reserva (saldo derivado / reconciliação) sem tocar a tabela
+    c.execute("CREATE INDEX IF NOT EXISTS idx_reserva_transacoes_reserva ON reserva_transacoes (reserva_id) INCLUDE (tipo, valor)")
+    # Extrato paginado por (data, id) do usuário
+    c.execute("CREATE INDEX IF NOT EXISTS idx_reserva_transacoes_user_data ON reserva_transacoes (user_id, data DESC, id DESC)")
+    # Rendimentos lançados pelo motor automático: no máximo um por reserva/dia
+    c.execute("ALTER TABLE reserva_transacoes ADD COLUMN IF NOT EXISTS origem TEXT")
+    c.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_reserva_transacoes_auto
+        ON reserva_transacoes (reserva_id, data) WHERE origem = 'auto'
+    """)
+
+    # 12. Cache local das taxas dos índices (CDI, Selic, IPCA) - taxa em % do período
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS indices_taxas (
+            indice TEXT,
+            data DATE,
+            taxa NUMERIC,
+            PRIMARY KEY (indice, data)
+        )
+    ''')
+    
+    # 13. Log de consultas lentas (modules.consultas_lentas)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS consultas_lentas (
+            id SERIAL PRIMARY KEY,
+            criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            funcao TEXT,
+            user_id INTEGER,
+            pagina TEXT,
+            duracao_ms NUMERIC,
+            sql TEXT,
+            parametros TEXT,
+            plano JSONB
+        )
+    ''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_consultas_lentas_funcao ON consultas_lentas (funcao, criado_em DESC)")
     
     conn.commit()
     conn.close()
 
 # --- SESSÃO E AUTH ---
 
-def criar_sessao(user_id):
-    token = str(uuid.uuid4())
+MAX_SESSOES_POR_USUARIO = 10
+
+def criar_sessao(user_id, name=None, username=None):
     expires = datetime.now() + timedelta(days=30)
-    conn = get_connection()
+    if sessao_assinada.modo_assinado():
+        # Token autocontido: nada é gravado no banco
+        if name is None or username is None:
+            conn = get_connection("criar_sessao")
+            c = conn.cursor()
+            c.execute("SELECT name, username FROM users WHERE id = %s", (user_id,))
+            name, username = c.fetchone()
+            conn.close()
+        token, _ = sessao_assinada.gerar_token(user_id, name, username, expires)
+        return token, expires
+
+    token = str(uuid.uuid4())
+    conn = get_connection("criar_sessao")
     c = conn.cursor()
     try:
         c.execute("INSERT INTO sessions (token, user_id, expires_at) VALUES (%s, %s, %s)", (token, user_id, expires))
+        # Mantém só as sessões mais recentes do usuário (usa idx_sessions_user_created)
+        c.execute("""
+            DELETE FROM sessions WHERE token IN (
+                SELECT token FROM sessions WHERE user_id = %s
+                ORDER BY created_at DESC OFFSET %s
+            )
+        """, (user_id, MAX_SESSOES_POR_USUARIO))
         conn.commit()
         return token, expires
     except: return None, None
     finally: conn.close()
 
+@st.cache_resource(ttl=60, show_spinner=False)
+def carregar_revogacoes():
+    """jti das sessões assinadas revogadas e ainda não expiradas (recarregado a cada minuto)."""
+    conn = get_connection("carregar_revogacoes")
+    c = conn.cursor()
+    c.execute("SELECT jti FROM sessoes_revogadas WHERE expires_at > NOW()")
+    revogados = frozenset(r[0] for r in c.fetchall())
+    conn.close()
+    return revogados
+
 def validar_sessao(token):
-    conn = get_connection()
+    if sessao_assinada.eh_token_assinado(token):
+        # Verificação em memória: HMAC + expiração + lista de revogação em cache
+        payload = sessao_assinada.ler_token(token)
+        if payload is None or payload["jti"] in carregar_revogacoes():
+            return None
+        return {"id": payload["uid"], "name": payload["name"], "username": payload["usr"]}
+
+    conn = get_connection("validar_sessao")
     c = conn.cursor()
     c.execute("""
         SELECT s.user_id, u.name, u.username 
@@ -228,16 +375,67 @@ def validar_sessao(token):
     return None
 
 def apagar_sessao(token):
-    conn = get_connection()
+    conn = get_connection("apagar_sessao")
     c = conn.cursor()
-    c.execute("DELETE FROM sessions WHERE token = %s", (token,))
+    if sessao_assinada.eh_token_assinado(token):
+        payload = sessao_assinada.ler_token(token)
+        if payload:
+            c.execute('''
+                INSERT INTO sessoes_revogadas (jti, expires_at) VALUES (%s, to_timestamp(%s))
+                ON CONFLICT (jti) DO NOTHING
+            ''', (payload["jti"], payload["exp"]))
+            c.execute("DELETE FROM sessoes_revogadas WHERE expires_at < NOW()")
+    else:
+        c.execute("DELETE FROM sessions WHERE token = %s", (token,))
     conn.commit()
     conn.close()
+    carregar_revogacoes.clear()
+
+def limpar_sessoes_expiradas(tamanho_lote=5000):
+    """
+    Apaga sessões (e revogações) expiradas em lotes, com commit a cada lote,
+    para não segurar travas nem gerar uma transação gigante. Retorna o total apagado.
+    """
+    conn = get_connection("limpar_sessoes_expiradas")
+    c = conn.cursor()
+    total = 0
+    try:
+        for tabela in ("sessions", "sessoes_revogadas"):
+            while True:
+                c.execute(f"""
+                    DELETE FROM {tabela} WHERE ctid IN (
+                        SELECT ctid FROM {tabela} WHERE expires_at < NOW() LIMIT %s
+                    )
+                """, (tamanho_lote,))
+                apagadas = c.rowcount
+                conn.commit()
+                total += apagadas
+                if apagadas < tamanho_lote:
+                    break
+    finally:
+        conn.close()
+    return total
+
+def limitar_sessoes_por_usuario(maximo=MAX_SESSOES_POR_USUARIO):
+    """Remove as sessões mais antigas de quem passou do limite. Retorna quantas apagou."""
+    conn = get_connection("limitar_sessoes_por_usuario")
+    c = conn.cursor()
+    c.execute("""
+        DELETE FROM sessions s USING (
+            SELECT token, ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY created_at DESC) AS ordem
+            FROM sessions
+        ) r
+        WHERE s.token = r.token AND r.ordem > %s
+    """, (maximo,))
+    apagadas = c.rowcount
+    conn.commit()
+    conn.close()
+    return apagadas
 
 def criar_usuario(username, password, name):
-    conn = get_connection()
+    conn = get_connection("criar_usuario")
     c = conn.cursor()
-    hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    hashed = senhas.gerar_hash(password)
     try:
         c.execute("INSERT INTO users (username, password_hash, name) VALUES (%s, %s, %s)", (username, hashed, name))
         conn.commit()
@@ -246,21 +444,28 @@ def criar_usuario(username, password, name):
     finally: conn.close()
 
 def verificar_login(username, password):
-    conn = get_connection()
+    conn = get_connection("verificar_login")
     c = conn.cursor()
     c.execute("SELECT id, password_hash, name FROM users WHERE username = %s", (username,))
     user = c.fetchone()
     conn.close()
     if user:
         user_id, stored_hash, name = user
-        if bcrypt.checkpw(password.encode('utf-8'), stored_hash.encode('utf-8')):
+        if senhas.verificar_senha(password, stored_hash):
+            if senhas.precisa_rehash(stored_hash):
+                # Custo mudou na configuração: regrava o hash com a senha em mãos
+                conn = get_connection("verificar_login")
+                c = conn.cursor()
+                c.execute("UPDATE users SET password_hash = %s WHERE id = %s", (senhas.gerar_hash(password), user_id))
+                conn.commit()
+                conn.close()
             return {"id": user_id, "name": name, "username": username}
     return None
 
 # --- LANÇAMENTOS (CAIXA) ---
 
 def salvar_lancamento(user_id, dados: dict):
-    conn = get_connection()
+    conn = get_connection("salvar_lancamento")
     c = conn.cursor()
     c.execute('''
         INSERT INTO lancamentos (user_id, data, tipo, categoria, subcategoria, descricao, valor, conta, forma_pagamento, status)
@@ -271,7 +476,7 @@ def salvar_lancamento(user_id, dados: dict):
     clear_cache() # Limpa cache para atualizar a tela
 
 def atualizar_lancamento(user_id, id_lancamento, dados: dict):
-    conn = get_connection()
+    conn = get_connection("atualizar_lancamento")
     c = conn.cursor()
     c.execute('''
         UPDATE lancamentos
@@ -282,16 +487,19 @@ def atualizar_lancamento(user_id, id_lancamento, dados: dict):
     conn.close()
     clear_cache()
 
-@st.cache_data(ttl=600, show_spinner=False) # Cache de 10 min
+@cache_compartilhado(ttl=600, show_spinner=False) # Cache de 10 min
 def carregar_dados(user_id):
-    conn = get_connection()
-    df = pd.read_sql_query("SELECT * FROM lancamentos WHERE user_id = %s", conn, params=(user_id,))
+    conn = get_connection("carregar_dados")
+    sql = """
+        SELECT id, user_id, data, tipo, categoria, subcategoria, descricao, valor, conta, forma_pagamento, status
+        FROM lancamentos WHERE user_id = %s
+    """
+    df = ler_sql(conn, sql, (user_id,), "lancamentos")
     conn.close()
-    df['data'] = pd.to_datetime(df['data'], errors='coerce')
     return df
 
 def excluir_lancamento(user_id, id_lancamento):
-    conn = get_connection()
+    conn = get_connection("excluir_lancamento")
     c = conn.cursor()
     c.execute("DELETE FROM lancamentos WHERE id=%s AND user_id=%s", (id_lancamento, user_id))
     rows = c.rowcount
@@ -300,10 +508,56 @@ def excluir_lancamento(user_id, id_lancamento):
     clear_cache()
     return rows > 0
 
+def importar_lancamentos(user_id, lotes, ao_progredir=None):
+    """
+    Importação em massa (extratos CSV/OFX já validados por modules.importador).
+    Cada lote vai para uma tabela temporária via COPY FROM STDIN e é inserido de uma vez,
+    ignorando fingerprints já existentes. Uma conexão, uma transação e uma limpeza
+    de cache para o arquivo inteiro.
+    Retorna {"inseridas": n, "duplicadas": n}.
+    """
+    colunas = ["data", "tipo", "categoria", "subcategoria", "descricao", "valor", "conta", "forma_pagamento", "status", "hash_importacao"]
+    lista_cols = ", ".join(colunas)
+    resultado = {"inseridas": 0, "duplicadas": 0}
+
+    conn = get_connection("importar_lancamentos")
+    c = conn.cursor()
+    try:
+        c.execute(f"CREATE TEMP TABLE tmp_importacao ({', '.join(col + ' TEXT' for col in colunas)}) ON COMMIT DROP")
+        for lote in lotes:
+            buffer = io.StringIO()
+            lote[colunas].to_csv(buffer, index=False, header=False, date_format="%Y-%m-%d")
+            buffer.seek(0)
+            c.copy_expert(f"COPY tmp_importacao ({lista_cols}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+            # DISTINCT ON protege contra o mesmo fingerprint repetido dentro do lote
+            c.execute(f'''
+                INSERT INTO lancamentos (user_id, {lista_cols})
+                SELECT DISTINCT ON (hash_importacao)
+                    %s, data::date, tipo, categoria, subcategoria, descricao, valor::numeric,
+                    conta, forma_pagamento, status, hash_importacao
+                FROM tmp_importacao
+                ON CONFLICT (user_id, hash_importacao) WHERE hash_importacao IS NOT NULL DO NOTHING
+            ''', (user_id,))
+            resultado["inseridas"] += c.rowcount
+            resultado["duplicadas"] += len(lote) - c.rowcount
+            c.execute("TRUNCATE tmp_importacao")
+
+            if ao_progredir:
+                ao_progredir(resultado)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+        clear_cache()
+    return resultado
+
 # --- INVESTIMENTOS ---
 
 def salvar_investimento(user_id, dados: dict):
-    conn = get_connection()
+    conn = get_connection("salvar_investimento")
     c = conn.cursor()
     c.execute('''
         INSERT INTO investimentos (user_id, data, ticker, tipo_operacao, classe, quantidade, preco_unitario, taxas, total_operacao, notas)
@@ -314,7 +568,7 @@ def salvar_investimento(user_id, dados: dict):
     clear_cache()
 
 def atualizar_investimento(user_id, id_inv, dados: dict):
-    conn = get_connection()
+    conn = get_connection("atualizar_investimento")
     c = conn.cursor()
     c.execute('''
         UPDATE investimentos
@@ -325,16 +579,15 @@ def atualizar_investimento(user_id, id_inv, dados: dict):
     conn.close()
     clear_cache()
 
-@st.cache_data(ttl=600, show_spinner=False)
+@cache_compartilhado(ttl=600, show_spinner=False)
 def carregar_investimentos(user_id):
-    conn = get_connection()
-    df = pd.read_sql_query("SELECT * FROM investimentos WHERE user_id = %s", conn, params=(user_id,))
+    conn = get_connection("carregar_investimentos")
+    df = ler_sql(conn, "SELECT * FROM investimentos WHERE user_id = %s", (user_id,), "investimentos")
     conn.close()
-    df['data'] = pd.to_datetime(df['data'], errors='coerce')
     return df
 
 def excluir_investimento(user_id, id_investimento):
-    conn = get_connection()
+    conn = get_connection("excluir_investimento")
     c = conn.cursor()
     c.execute("DELETE FROM investimentos WHERE id=%s AND user_id=%s", (id_investimento, user_id))
     rows = c.rowcount
@@ -346,7 +599,7 @@ def excluir_investimento(user_id, id_investimento):
 # --- METAS (MENSAL) ---
 
 def salvar_meta(user_id, categoria, valor, mes, ano):
-    conn = get_connection()
+    conn = get_connection("salvar_meta")
     c = conn.cursor()
     # Upsert com base em User + Categoria + Mês + Ano
     c.execute('''
@@ -359,9 +612,9 @@ def salvar_meta(user_id, categoria, valor, mes, ano):
     conn.close()
     clear_cache()
 
-@st.cache_data(ttl=600, show_spinner=False)
+@cache_compartilhado(ttl=600, show_spinner=False)
 def carregar_metas(user_id, mes=None, ano=None):
-    conn = get_connection()
+    conn = get_connection("carregar_metas")
     sql = "SELECT * FROM metas WHERE user_id = %s"
     params = [user_id]
     
@@ -369,12 +622,12 @@ def carregar_metas(user_id, mes=None, ano=None):
         sql += " AND mes = %s AND ano = %s"
         params.extend([mes, ano])
         
-    df = pd.read_sql_query(sql, conn, params=tuple(params))
+    df = ler_sql(conn, sql, tuple(params), "metas")
     conn.close()
     return df
 
 def excluir_meta(user_id, categoria, mes, ano):
-    conn = get_connection()
+    conn = get_connection("excluir_meta")
     c = conn.cursor()
     c.execute("DELETE FROM metas WHERE category=%s AND user_id=%s AND mes=%s AND ano=%s", (categoria, user_id, mes, ano))
     conn.commit()
@@ -382,10 +635,10 @@ def excluir_meta(user_id, categoria, mes, ano):
     clear_cache()
     return True
 
-@st.cache_data(ttl=600, show_spinner=False)
+@cache_data_rastreado(ttl=600, show_spinner=False)
 def listar_meses_com_metas(user_id):
     """Retorna lista de (mes, ano) que possuem metas cadastradas"""
-    conn = get_connection()
+    conn = get_connection("listar_meses_com_metas")
     c = conn.cursor()
     c.execute("SELECT DISTINCT mes, ano FROM metas WHERE user_id = %s ORDER BY ano DESC, mes DESC", (user_id,))
     dados = c.fetchall()
@@ -395,7 +648,7 @@ def listar_meses_com_metas(user_id):
 # --- CARTÕES DE CRÉDITO ---
 
 def salvar_cartao(user_id, nome, fechamento, vencimento):
-    conn = get_connection()
+    conn = get_connection("salvar_cartao")
     c = conn.cursor()
     c.execute('''
         INSERT INTO cartoes_credito (user_id, nome_cartao, dia_fechamento, dia_vencimento)
@@ -405,15 +658,15 @@ def salvar_cartao(user_id, nome, fechamento, vencimento):
     conn.close()
     clear_cache()
 
-@st.cache_data(ttl=600, show_spinner=False)
+@cache_compartilhado(ttl=600, show_spinner=False)
 def carregar_cartoes(user_id):
-    conn = get_connection()
-    df = pd.read_sql_query("SELECT * FROM cartoes_credito WHERE user_id = %s", conn, params=(user_id,))
+    conn = get_connection("carregar_cartoes")
+    df = ler_sql(conn, "SELECT * FROM cartoes_credito WHERE user_id = %s", (user_id,))
     conn.close()
     return df
 
 def excluir_cartao(user_id, cartao_id):
-    conn = get_connection()
+    conn = get_connection("excluir_cartao")
     c = conn.cursor()
     c.execute("DELETE FROM lancamentos_cartao WHERE cartao_id=%s AND user_id=%s", (cartao_id, user_id))
     c.execute("DELETE FROM cartoes_credito WHERE id=%s AND user_id=%s", (cartao_id, user_id))
@@ -424,7 +677,7 @@ def excluir_cartao(user_id, cartao_id):
     return True
 
 def salvar_compra_credito(user_id, cartao_id, data_compra, descricao, categoria, valor_total, qtd_parcelas, dia_fechamento):
-    conn = get_connection()
+    conn = get_connection("salvar_compra_credito")
     c = conn.cursor()
     valor_parcela = valor_total / qtd_parcelas
     data_obj = pd.to_datetime(data_compra)
@@ -448,19 +701,19 @@ def salvar_compra_credito(user_id, cartao_id, data_compra, descricao, categoria,
     conn.close()
     clear_cache()
 
-@st.cache_data(ttl=600, show_spinner=False)
+@cache_compartilhado(ttl=600, show_spinner=False)
 def carregar_fatura(user_id, cartao_id, mes_fatura_str):
-    conn = get_connection()
+    conn = get_connection("carregar_fatura")
     sql = """
         SELECT * FROM lancamentos_cartao 
         WHERE user_id = %s AND cartao_id = %s AND mes_fatura = %s
     """
-    df = pd.read_sql_query(sql, conn, params=(user_id, cartao_id, mes_fatura_str))
+    df = ler_sql(conn, sql, (user_id, cartao_id, mes_fatura_str), "lancamentos_cartao")
     conn.close()
     return df
 
 def atualizar_item_fatura(user_id, id_item, nova_descricao, novo_valor, nova_data_compra):
-    conn = get_connection()
+    conn = get_connection("atualizar_item_fatura")
     c = conn.cursor()
     c.execute('''
         UPDATE lancamentos_cartao
@@ -475,9 +728,9 @@ def atualizar_item_fatura(user_id, id_item, nova_descricao, novo_valor, nova_dat
 
 def listar_meses_fatura(user_id, cartao_id):
     """Retorna apenas os meses que possuem faturas geradas."""
-    conn = get_connection()
+    conn = get_connection("listar_meses_fatura")
     sql = "SELECT DISTINCT mes_fatura FROM lancamentos_cartao WHERE user_id=%s AND cartao_id=%s ORDER BY mes_fatura DESC"
-    df = pd.read_sql_query(sql, conn, params=(user_id, cartao_id))
+    df = ler_sql(conn, sql, (user_id, cartao_id))
     conn.close()
     if not df.empty:
         # Garante que é data
@@ -486,7 +739,7 @@ def listar_meses_fatura(user_id, cartao_id):
 
 def atualizar_cartao(user_id, cartao_id, nome, fechamento, vencimento):
     """Atualiza dados cadastrais do cartão."""
-    conn = get_connection()
+    conn = get_connection("atualizar_cartao")
     c = conn.cursor()
     c.execute("UPDATE cartoes_credito SET nome_cartao=%s, dia_fechamento=%s, dia_vencimento=%s WHERE id=%s AND user_id=%s", (nome, fechamento, vencimento, cartao_id, user_id))
     conn.commit()
@@ -497,7 +750,7 @@ def buscar_historico_compras(user_id, cartao_id=None):
     """
     Agrupa parcelas para mostrar como 'Compras' únicas no histórico.
     """
-    conn = get_connection()
+    conn = get_connection("buscar_historico_compras")
     sql = """
         SELECT 
             MIN(lc.id) as id_referencia,
@@ -519,12 +772,12 @@ def buscar_historico_compras(user_id, cartao_id=None):
     
     sql += " GROUP BY lc.cartao_id, cc.nome_cartao, lc.data_compra, lc.descricao, lc.categoria, lc.qtd_parcelas ORDER BY lc.data_compra DESC"
     
-    df = pd.read_sql_query(sql, conn, params=tuple(params))
+    df = ler_sql(conn, sql, tuple(params))
     conn.close()
     return df
 
 def excluir_compra_agrupada(user_id, cartao_id, data_compra, descricao, qtd_parcelas):
-    conn = get_connection()
+    conn = get_connection("excluir_compra_agrupada")
     c = conn.cursor()
     c.execute("""
         DELETE FROM lancamentos_cartao 
@@ -538,7 +791,7 @@ def excluir_compra_agrupada(user_id, cartao_id, data_compra, descricao, qtd_parc
 # --- CONTROLE DE PAGAMENTO DE FATURAS ---
 
 def registrar_pagamento_fatura(user_id, cartao_id, mes_referencia, status, valor, data_pagamento):
-    conn = get_connection()
+    conn = get_connection("registrar_pagamento_fatura")
     c = conn.cursor()
     c.execute('''
         INSERT INTO faturas_controle (user_id, cartao_id, mes_referencia, status, valor_pago, data_pagamento)
@@ -551,7 +804,7 @@ def registrar_pagamento_fatura(user_id, cartao_id, mes_referencia, status, valor
     clear_cache()
 
 def excluir_pagamento_fatura(user_id, cartao_id, mes_referencia):
-    conn = get_connection()
+    conn = get_connection("excluir_pagamento_fatura")
     c = conn.cursor()
     c.execute('''
         DELETE FROM faturas_controle 
@@ -562,7 +815,7 @@ def excluir_pagamento_fatura(user_id, cartao_id, mes_referencia):
     clear_cache()
 
 def obter_status_fatura(user_id, cartao_id, mes_referencia):
-    conn = get_connection()
+    conn = get_connection("obter_status_fatura")
     c = conn.cursor()
     c.execute('''
         SELECT status, valor_pago, data_pagamento FROM faturas_controle
@@ -577,7 +830,7 @@ def obter_status_fatura(user_id, cartao_id, mes_referencia):
 # --- RECORRÊNCIAS ---
 
 def salvar_recorrencia(user_id, nome, valor, categoria, dia_vencimento, tipo):
-    conn = get_connection()
+    conn = get_connection("salvar_recorrencia")
     c = conn.cursor()
     c.execute('''
         INSERT INTO recorrencias (user_id, nome, valor, categoria, dia_vencimento, tipo)
@@ -588,7 +841,7 @@ def salvar_recorrencia(user_id, nome, valor, categoria, dia_vencimento, tipo):
     clear_cache()
 
 def atualizar_recorrencia(user_id, id_rec, nome, valor, categoria, dia_vencimento, tipo):
-    conn = get_connection()
+    conn = get_connection("atualizar_recorrencia")
     c = conn.cursor()
     c.execute('''
         UPDATE recorrencias 
@@ -599,15 +852,15 @@ def atualizar_recorrencia(user_id, id_rec, nome, valor, categoria, dia_venciment
     conn.close()
     clear_cache()
 
-@st.cache_data(ttl=600, show_spinner=False)
+@cache_compartilhado(ttl=600, show_spinner=False)
 def carregar_recorrencias(user_id):
-    conn = get_connection()
-    df = pd.read_sql_query("SELECT * FROM recorrencias WHERE user_id = %s", conn, params=(user_id,))
+    conn = get_connection("carregar_recorrencias")
+    df = ler_sql(conn, "SELECT * FROM recorrencias WHERE user_id = %s", (user_id,), "recorrencias")
     conn.close()
     return df
 
 def excluir_recorrencia(user_id, id_rec):
-    conn = get_connection()
+    conn = get_connection("excluir_recorrencia")
     c = conn.cursor()
     c.execute("DELETE FROM recorrencias WHERE id=%s AND user_id=%s", (id_rec, user_id))
     conn.commit()
@@ -618,7 +871,7 @@ def excluir_recorrencia(user_id, id_rec):
 # --- RESERVAS (COMPLETA E OTIMIZADA) ---
 
 def salvar_reserva_conta(user_id, nome, tipo, indice, taxa, meta):
-    conn = get_connection()
+    conn = get_connection("salvar_reserva_conta")
     c = conn.cursor()
     
     # 1. Tenta inserir com as colunas novas
@@ -651,22 +904,22 @@ def salvar_reserva_conta(user_id, nome, tipo, indice, taxa, meta):
         conn.close()
         clear_cache()
 
-@st.cache_data(ttl=600, show_spinner=False)
+@cache_compartilhado(ttl=600, show_spinner=False)
 def carregar_reservas(user_id):
-    conn = get_connection()
+    conn = get_connection("carregar_reservas")
     # Tenta buscar com as novas colunas
     try:
-        df = pd.read_sql_query("SELECT * FROM reservas WHERE user_id = %s", conn, params=(user_id,))
+        df = ler_sql(conn, "SELECT * FROM reservas WHERE user_id = %s", (user_id,), "reservas")
     except:
         conn.rollback()
         # Fallback se a migração falhou (muito raro se o salvar rodar antes)
-        df = pd.read_sql_query("SELECT id, user_id, nome, tipo_aplicacao, saldo_atual, meta_valor FROM reservas WHERE user_id = %s", conn, params=(user_id,))
+        df = ler_sql(conn, "SELECT id, user_id, nome, tipo_aplicacao, saldo_atual, meta_valor FROM reservas WHERE user_id = %s", (user_id,), "reservas")
         df['rentabilidade'] = "-" 
     conn.close()
     return df
 
 def excluir_reserva_conta(user_id, res_id):
-    conn = get_connection()
+    conn = get_connection("excluir_reserva_conta")
     c = conn.cursor()
     # Apaga histórico primeiro
     c.execute("DELETE FROM reserva_transacoes WHERE reserva_id=%s AND user_id=%s", (res_id, user_id))
@@ -675,87 +928,157 @@ def excluir_reserva_conta(user_id, res_id):
     conn.close()
     clear_cache()
 
+# O extrato (reserva_transacoes) é a fonte da verdade; reservas.saldo_atual é só
+# um saldo derivado, mantido em dia por deltas aplicados com a linha da reserva
+# travada (SELECT ... FOR UPDATE). reconciliar_reservas confere os dois.
+SINAL_MOVIMENTO_RESERVA = {'Aporte': 1, 'Rendimento': 1, 'Resgate': -1}
+SQL_VALOR_ASSINADO_RESERVA = "CASE WHEN tipo IN ('Aporte', 'Rendimento') THEN valor WHEN tipo = 'Resgate' THEN -valor ELSE 0 END"
+
+def _travar_reserva(c, user_id, res_id):
+    """Trava a linha da reserva até o fim da transação. Retorna False se não for do usuário."""
+    c.execute("SELECT id FROM reservas WHERE id=%s AND user_id=%s FOR UPDATE", (res_id, user_id))
+    return c.fetchone() is not None
+
+def _aplicar_delta_saldo(c, res_id, tipo, valor):
+    sinal = SINAL_MOVIMENTO_RESERVA.get(tipo, 0)
+    if sinal and valor:
+        c.execute("UPDATE reservas SET saldo_atual = saldo_atual + %s WHERE id=%s", (sinal * valor, res_id))
+
+def _recalcular_saldo_reserva(c, res_id):
+    """Recalcula o saldo inteiro a partir do extrato (uma instrução, usa o índice por reserva)."""
+    c.execute(f"""
+        UPDATE reservas SET saldo_atual = COALESCE(
+            (SELECT SUM({SQL_VALOR_ASSINADO_RESERVA}) FROM reserva_transacoes WHERE reserva_id = %s), 0)
+        WHERE id = %s
+    """, (res_id, res_id))
+
 def salvar_transacao_reserva(user_id, res_id, data, tipo, valor, desc):
-    conn = get_connection()
+    conn = get_connection("salvar_transacao_reserva")
     c = conn.cursor()
-    c.execute('''
-        INSERT INTO reserva_transacoes (user_id, reserva_id, data, tipo, valor, descricao)
-        VALUES (%s, %s, %s, %s, %s, %s)
-    ''', (user_id, res_id, data, tipo, valor, desc))
-    
-    if tipo in ['Aporte', 'Rendimento']:
-        c.execute("UPDATE reservas SET saldo_atual = saldo_atual + %s WHERE id=%s", (valor, res_id))
-    elif tipo == 'Resgate':
-        c.execute("UPDATE reservas SET saldo_atual = saldo_atual - %s WHERE id=%s", (valor, res_id))
-        
-    conn.commit()
-    conn.close()
-    clear_cache()
+    try:
+        if _travar_reserva(c, user_id, res_id):
+            c.execute('''
+                INSERT INTO reserva_transacoes (user_id, reserva_id, data, tipo, valor, descricao)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            ''', (user_id, res_id, data, tipo, valor, desc))
+            _aplicar_delta_saldo(c, res_id, tipo, valor)
+        conn.commit()
+    finally:
+        conn.close()
+        clear_cache()
 
 # --- NOVAS FUNÇÕES PARA EDIÇÃO DE TRANSAÇÕES DE RESERVA ---
 
 def excluir_transacao_reserva(user_id, id_transacao):
-    conn = get_connection()
-    c = conn.cursor()
-    # 1. Busca info para reverter saldo
-    c.execute("SELECT reserva_id, tipo, valor FROM reserva_transacoes WHERE id=%s AND user_id=%s", (id_transacao, user_id))
-    row = c.fetchone()
-    if row:
-        res_id, tipo, valor = row
-        # Reverte o impacto no saldo
-        if tipo in ['Aporte', 'Rendimento']:
-            c.execute("UPDATE reservas SET saldo_atual = saldo_atual - %s WHERE id=%s", (valor, res_id))
-        elif tipo == 'Resgate':
-            c.execute("UPDATE reservas SET saldo_atual = saldo_atual + %s WHERE id=%s", (valor, res_id))
-        
-        # Apaga o registro
-        c.execute("DELETE FROM reserva_transacoes WHERE id=%s", (id_transacao,))
+    conn = get_connection("excluir_transacao_reserva")
+    c = conn.cursor()
+    try:
+        # 1. Trava a transação (e descobre a reserva) antes de travar o saldo
+        c.execute("SELECT reserva_id FROM reserva_transacoes WHERE id=%s AND user_id=%s FOR UPDATE", (id_transacao, user_id))
+        row = c.fetchone()
+        if row and _travar_reserva(c, user_id, row[0]):
+            # 2. Apaga e reverte com o valor que realmente foi apagado (duas abas não revertem duas vezes)
+            c.execute("DELETE FROM reserva_transacoes WHERE id=%s AND user_id=%s RETURNING reserva_id, tipo, valor", (id_transacao, user_id))
+            apagado = c.fetchone()
+            if apagado:
+                res_id, tipo, valor = apagado
+                _aplicar_delta_saldo(c, res_id, tipo, -(valor or Decimal(0)))
         conn.commit()
-    conn.close()
-    clear_cache()
+    finally:
+        conn.close()
+        clear_cache()
 
 def atualizar_transacao_reserva(user_id, id_transacao, nova_data, nova_desc, novo_valor):
-    conn = get_connection()
+    conn = get_connection("atualizar_transacao_reserva")
     c = conn.cursor()
-    
-    # 1. Busca dados antigos
-    c.execute("SELECT reserva_id, tipo, valor FROM reserva_transacoes WHERE id=%s AND user_id=%s", (id_transacao, user_id))
-    row = c.fetchone()
-    if row:
-        res_id, tipo, valor_antigo = row
-        
-        # 2. Reverte efeito antigo no saldo
-        if tipo in ['Aporte', 'Rendimento']:
-            c.execute("UPDATE reservas SET saldo_atual = saldo_atual - %s WHERE id=%s", (valor_antigo, res_id))
-        elif tipo == 'Resgate':
-            c.execute("UPDATE reservas SET saldo_atual = saldo_atual + %s WHERE id=%s", (valor_antigo, res_id))
-            
-        # 3. Atualiza a transação
-        c.execute("UPDATE reserva_transacoes SET data=%s, descricao=%s, valor=%s WHERE id=%s", (nova_data, nova_desc, novo_valor, id_transacao))
-        
-        # 4. Aplica efeito novo no saldo
-        if tipo in ['Aporte', 'Rendimento']:
-            c.execute("UPDATE reservas SET saldo_atual = saldo_atual + %s WHERE id=%s", (novo_valor, res_id))
-        elif tipo == 'Resgate':
-            c.execute("UPDATE reservas SET saldo_atual = saldo_atual - %s WHERE id=%s", (novo_valor, res_id))
-            
+    try:
+        # 1. Busca dados antigos já travando a linha
+        c.execute("SELECT reserva_id, tipo, valor FROM reserva_transacoes WHERE id=%s AND user_id=%s FOR UPDATE", (id_transacao, user_id))
+        row = c.fetchone()
+        if row and _travar_reserva(c, user_id, row[0]):
+            res_id, tipo, valor_antigo = row
+
+            # 2. Atualiza a transação
+            c.execute("UPDATE reserva_transacoes SET data=%s, descricao=%s, valor=%s WHERE id=%s", (nova_data, nova_desc, novo_valor, id_transacao))
+
+            # 3. Aplica só a diferença no saldo
+            _aplicar_delta_saldo(c, res_id, tipo, Decimal(str(novo_valor)) - (valor_antigo or Decimal(0)))
+        conn.commit()
+    finally:
+        conn.close()
+        clear_cache()
+
+def reconciliar_reservas(user_id=None, corrigir=False):
+    """
+    Confere reservas.saldo_atual contra a soma do extrato (uma consulta agregada).
+    Sem user_id confere todos os usuários (rotina de manutenção).
+    Retorna DataFrame com as reservas divergentes; com corrigir=True ajusta o saldo delas.
+    """
+    conn = get_connection("reconciliar_reservas")
+    sql = f"""
+        SELECT r.id, r.user_id, r.nome, r.saldo_atual, COALESCE(l.saldo_extrato, 0) AS saldo_extrato
+        FROM reservas r
+        LEFT JOIN (
+            SELECT reserva_id, SUM({SQL_VALOR_ASSINADO_RESERVA}) AS saldo_extrato
+            FROM reserva_transacoes
+            GROUP BY reserva_id
+        ) l ON l.reserva_id = r.id
+        WHERE COALESCE(r.saldo_atual, 0) <> COALESCE(l.saldo_extrato, 0)
+    """
+    params = ()
+    if user_id is not None:
+        sql += " AND r.user_id = %s"
+        params = (user_id,)
+    df = ler_sql(conn, sql, params)
+
+    if corrigir and not df.empty:
+        c = conn.cursor()
+        for res_id in df['id'].tolist():
+            c.execute("SELECT id FROM reservas WHERE id=%s FOR UPDATE", (int(res_id),))
+            _recalcular_saldo_reserva(c, int(res_id))
         conn.commit()
+        clear_cache()
     conn.close()
-    clear_cache()
+    return df
 
-@st.cache_data(ttl=600, show_spinner=False)
-def carregar_extrato_reserva(user_id):
-    conn = get_connection()
+@cache_compartilhado(ttl=600, show_spinner=False)
+def carregar_extrato_reserva(user_id, reserva_id=None, tipo=None, data_inicio=None, data_fim=None, apos=None, limite=50):
+    """
+    Uma página do extrato das reservas, filtrada no servidor.
+    Paginação por keyset: `apos` é a tupla (data, id) da última linha da página anterior.
+    Retorna (df, tem_mais).
+    """
+    conn = get_connection("carregar_extrato_reserva")
     sql = """
         SELECT t.*, r.nome as nome_reserva 
         FROM reserva_transacoes t
         JOIN reservas r ON t.reserva_id = r.id
         WHERE t.user_id = %s
-        ORDER BY t.data DESC
     """
-    df = pd.read_sql_query(sql, conn, params=(user_id,))
+    params = [user_id]
+    if reserva_id:
+        sql += " AND t.reserva_id = %s"
+        params.append(reserva_id)
+    if tipo:
+        sql += " AND t.tipo = %s"
+        params.append(tipo)
+    if data_inicio:
+        sql += " AND t.data >= %s"
+        params.append(data_inicio)
+    if data_fim:
+        sql += " AND t.data <= %s"
+        params.append(data_fim)
+    if apos:
+        sql += " AND (t.data, t.id) < (%s, %s)"
+        params.extend(apos)
+
+    # Busca uma linha a mais só para saber se existe próxima página
+    sql += " ORDER BY t.data DESC, t.id DESC LIMIT %s"
+    params.append(limite + 1)
+
+    df = ler_sql(conn, sql, tuple(params), "reserva_transacoes")
     conn.close()
-    return df
+    return df.head(limite), len(df) > limite
 
 def migrar_dados_antigos_para_reserva(user_id):
     """
@@ -764,7 +1087,7 @@ def migrar_dados_antigos_para_reserva(user_id):
     2. Busca Despesas (Aportes) e SOMA no saldo.
     3. Busca Receitas (Resgates) e SUBTRAI do saldo.
     """
-    conn = get_connection()
+    conn = get_connection("migrar_dados_antigos_para_reserva")
     c = conn.cursor()
     
     # 1. Cria ou recupera Reserva Geral
@@ -789,48 +1112,229 @@ def migrar_dados_antigos_para_reserva(user_id):
     count = 0
     
     # 2. Busca e Migra APORTES (Despesas)
-    df_aportes = pd.read_sql_query("""
+    df_aportes = ler_sql(conn, """
         SELECT * FROM lancamentos 
         WHERE user_id = %s 
         AND tipo = 'Despesa'
         AND (categoria ILIKE '%%Reserva%%' OR categoria ILIKE '%%Investimento%%' OR categoria = 'Investimentos (Aportes)')
-    """, conn, params=(user_id,))
+    """, (user_id,))
     
     for _, row in df_aportes.iterrows():
         c.execute('''
             INSERT INTO reserva_transacoes (user_id, reserva_id, data, tipo, valor, descricao)
             VALUES (%s, %s, %s, 'Aporte', %s, %s)
         ''', (user_id, res_id, row['data'], row['valor'], f"Migrado: {row['descricao']}"))
-        c.execute("UPDATE reservas SET saldo_atual = saldo_atual + %s WHERE id=%s", (row['valor'], res_id))
         c.execute("DELETE FROM lancamentos WHERE id=%s", (row['id'],))
         count += 1
 
     # 3. Busca e Migra RESGATES (Receitas)
-    df_resgates = pd.read_sql_query("""
+    df_resgates = ler_sql(conn, """
         SELECT * FROM lancamentos 
         WHERE user_id = %s 
         AND tipo = 'Receita'
         AND (categoria ILIKE '%%Resgate%%' OR categoria ILIKE '%%Reserva%%' OR categoria ILIKE '%%Investimento%%' OR categoria = 'Resgates')
-    """, conn, params=(user_id,))
+    """, (user_id,))
     
     for _, row in df_resgates.iterrows():
         c.execute('''
             INSERT INTO reserva_transacoes (user_id, reserva_id, data, tipo, valor, descricao)
             VALUES (%s, %s, %s, 'Resgate', %s, %s)
         ''', (user_id, res_id, row['data'], row['valor'], f"Migrado: {row['descricao']}"))
-        c.execute("UPDATE reservas SET saldo_atual = saldo_atual - %s WHERE id=%s", (row['valor'], res_id))
         c.execute("DELETE FROM lancamentos WHERE id=%s", (row['id'],))
         count += 1
             
+    # 4. Saldo derivado do extrato, numa única instrução
+    _recalcular_saldo_reserva(c, res_id)
     conn.commit()
     conn.close()
     clear_cache()
     return count
 
+# --- RENDIMENTOS AUTOMÁTICOS (TAXAS DE ÍNDICES) ---
+
+def carregar_taxas_indices(indices, data_inicio, data_fim):
+    """Taxas em cache local (indice, data, taxa em %) no intervalo."""
+    conn = get_connection("carregar_taxas_indices")
+    df = ler_sql(
+        conn, "SELECT indice, data, taxa FROM indices_taxas WHERE indice = ANY(%s) AND data BETWEEN %s AND %s ORDER BY data",
+        (list(indices), data_inicio, data_fim)
+    )
+    conn.close()
+    df['data'] = pd.to_datetime(df['data'])
+    df['taxa'] = df['taxa'].astype(float)
+    return df
+
+def intervalos_taxas_indices():
+    """Retorna {indice: (primeira data, última data)} presentes no cache de taxas."""
+    conn = get_connection("intervalos_taxas_indices")
+    c = conn.cursor()
+    c.execute("SELECT indice, MIN(data), MAX(data) FROM indices_taxas GROUP BY indice")
+    dados = {indice: (ini, fim) for indice, ini, fim in c.fetchall()}
+    conn.close()
+    return dados
+
+def salvar_taxas_indices(df):
+    """Upsert em massa de (indice, data, taxa)."""
+    if df.empty: return 0
+    conn = get_connection("salvar_taxas_indices")
+    c = conn.cursor()
+    execute_values(c, '''
+        INSERT INTO indices_taxas (indice, data, taxa) VALUES %s
+        ON CONFLICT (indice, data) DO UPDATE SET taxa = EXCLUDED.taxa
+    ''', list(df[['indice', 'data', 'taxa']].itertuples(index=False, name=None)), page_size=1000)
+    conn.commit()
+    conn.close()
+    return len(df)
+
+# Reservas indexadas e o dia em que cada uma volta a render: o dia seguinte ao último
+# rendimento automático (ou `data_inicio` se nunca rendeu), então dias em que o motor
+# não rodou são completados na próxima execução. Garante a idempotência.
+_SQL_BASE_RENDIMENTOS = """
+    WITH base AS (
+        SELECT r.id, r.user_id, r.indice, r.taxa,
+               (SELECT MAX(a.data) FROM reserva_transacoes a
+                 WHERE a.reserva_id = r.id AND a.origem = 'auto') AS ultimo_auto
+        FROM reservas r
+        WHERE r.indice = ANY(%(indices)s) AND r.taxa > 0 {filtro_user}
+    ), ini AS (
+        SELECT b.*, COALESCE(b.ultimo_auto + 1, %(data_inicio)s::date) AS inicio FROM base b
+    )
+"""
+
+def carregar_base_rendimentos(data_inicio, data_fim, indices, user_id=None):
+    """
+    Base do motor de rendimentos, em duas consultas agregadas:
+    - reservas indexadas com o dia de início e o saldo do extrato antes dele;
+    - movimentos líquidos por reserva/dia entre o início de cada reserva e `data_fim`.
+    """
+    conn = get_connection("carregar_base_rendimentos")
+    params = {"indices": list(indices), "data_inicio": data_inicio, "data_fim": data_fim, "user_id": user_id}
+    base = _SQL_BASE_RENDIMENTOS.format(filtro_user="AND r.user_id = %(user_id)s" if user_id is not None else "")
+
+    df_res = ler_sql(conn, base + f"""
+        SELECT i.id, i.user_id, i.indice, i.taxa, i.inicio,
+               COALESCE(SUM({SQL_VALOR_ASSINADO_RESERVA}) FILTER (WHERE t.data < i.inicio), 0) AS saldo_inicial
+        FROM ini i
+        LEFT JOIN reserva_transacoes t ON t.reserva_id = i.id
+        WHERE i.inicio <= %(data_fim)s
+        GROUP BY i.id, i.user_id, i.indice, i.taxa, i.inicio
+    """, params)
+
+    df_mov = ler_sql(conn, base + f"""
+        SELECT t.reserva_id, t.data, SUM({SQL_VALOR_ASSINADO_RESERVA}) AS valor
+        FROM ini i
+        JOIN reserva_transacoes t ON t.reserva_id = i.id AND t.data BETWEEN i.inicio AND %(data_fim)s
+        GROUP BY t.reserva_id, t.data
+    """, params)
+    conn.close()
+
+    df_res['taxa'] = df_res['taxa'].astype(float)
+    df_res['saldo_inicial'] = df_res['saldo_inicial'].astype(float)
+    df_res['inicio'] = pd.to_datetime(df_res['inicio'])
+    df_mov['data'] = pd.to_datetime(df_mov['data'])
+    df_mov['valor'] = df_mov['valor'].astype(float)
+    return df_res, df_mov
+
+def gravar_rendimentos(df):
+    """
+    Grava rendimentos automáticos em massa (COPY + INSERT ... ON CONFLICT DO NOTHING),
+    idempotente por reserva/dia, e atualiza o saldo derivado das reservas afetadas.
+    df: user_id, reserva_id, data, valor, descricao. Retorna quantos foram inseridos.
+    """
+    if df.empty: return 0
+    conn = get_connection("gravar_rendimentos")
+    c = conn.cursor()
+    try:
+        reservas_ids = sorted(int(i) for i in df['reserva_id'].unique())
+        # Mesma ordem de travas que as escritas do usuário (linha da reserva primeiro)
+        c.execute("SELECT id FROM reservas WHERE id = ANY(%s) ORDER BY id FOR UPDATE", (reservas_ids,))
+
+        c.execute("CREATE TEMP TABLE tmp_rendimentos (user_id INTEGER, reserva_id INTEGER, data DATE, valor NUMERIC, descricao TEXT) ON COMMIT DROP")
+        buffer = io.StringIO()
+        df[['user_id', 'reserva_id', 'data', 'valor', 'descricao']].to_csv(buffer, index=False, header=False, date_format="%Y-%m-%d")
+        buffer.seek(0)
+        c.copy_expert("COPY tmp_rendimentos FROM STDIN WITH (FORMAT csv)", buffer)
+
+        c.execute("""
+            INSERT INTO reserva_transacoes (user_id, reserva_id, data, tipo, valor, descricao, origem)
+            SELECT user_id, reserva_id, data, 'Rendimento', valor, descricao, 'auto' FROM tmp_rendimentos
+            ON CONFLICT (reserva_id, data) WHERE origem = 'auto' DO NOTHING
+        """)
+        inseridos = c.rowcount
+
+        c.execute(f"""
+            UPDATE reservas r SET saldo_atual = s.total
+            FROM (
+                SELECT reserva_id, SUM({SQL_VALOR_ASSINADO_RESERVA}) AS total
+                FROM reserva_transacoes WHERE reserva_id = ANY(%s)
+                GROUP BY reserva_id
+            ) s
+            WHERE r.id = s.reserva_id
+        """, (reservas_ids,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+        clear_cache()
+    return inseridos
+
+# --- EXPORTAÇÃO (STREAMING, MEMÓRIA CONSTANTE) ---
+
+# Tabelas exportáveis -> ordenação estável do dump
+TABELAS_EXPORTACAO = {
+    "lancamentos": "data, id",
+    "cartoes_credito": "id",
+    "lancamentos_cartao": "mes_fatura, id",
+    "faturas_controle": "mes_referencia, cartao_id",
+    "investimentos": "data, id",
+    "reservas": "id",
+    "reserva_transacoes": "data, id",
+    "metas": "ano, mes, categoria",
+    "recorrencias": "id",
+}
+
+def _sql_exportacao(tabela):
+    if tabela not in TABELAS_EXPORTACAO:
+        raise ValueError(f"Tabela não exportável: {tabela}")
+    return f"SELECT * FROM {tabela} WHERE user_id = %s ORDER BY {TABELAS_EXPORTACAO[tabela]}"
+
+def exportar_tabela_csv(user_id, tabela, destino, origem="exportar_tabela_csv"):
+    """Escreve a tabela do usuário em CSV direto no arquivo `destino` via COPY TO STDOUT."""
+    conn = get_connection(origem)
+    c = conn.cursor()
+    try:
+        sql = c.mogrify(_sql_exportacao(tabela), (user_id,)).decode("utf-8")
+        c.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER true)", destino)
+    finally:
+        conn.close()
+
+def iterar_tabela(user_id, tabela, tamanho_lote=10000, origem="iterar_tabela"):
+    """
+    Percorre a tabela do usuário com cursor do lado do servidor (named cursor),
+    gerando (description do cursor, linhas) em lotes de `tamanho_lote`.
+    O primeiro lote sai mesmo vazio, para quem precisa das colunas (Parquet).
+    """
+    conn = get_connection(origem)
+    c = conn.cursor(name=f"exp_{tabela}_{uuid.uuid4().hex[:8]}")
+    c.itersize = tamanho_lote
+    try:
+        c.execute(_sql_exportacao(tabela), (user_id,))
+        linhas = c.fetchmany(tamanho_lote)
+        yield c.description, linhas
+        while linhas:
+            linhas = c.fetchmany(tamanho_lote)
+            if linhas:
+                yield c.description, linhas
+    finally:
+        c.close()
+        conn.close()
+
 # --- NOTIFICAÇÕES (LEITURA APENAS) ---
 
 def buscar_pendencias_proximas(user_id):
-    conn = get_connection()
+    conn = get_connection("buscar_pendencias_proximas")
     sql = """
         SELECT descricao, valor, data, conta 
         FROM lancamentos 
@@ -838,27 +1342,40 @@ def buscar_pendencias_proximas(user_id):
         AND status IN ('Pendente', 'Agendado')
         AND data BETWEEN CURRENT_DATE AND CURRENT_DATE + INTERVAL '1 day'
     """
-    df = pd.read_sql_query(sql, conn, params=(user_id,))
+    df = ler_sql(conn, sql, (user_id,))
     conn.close()
     return df
 
+def buscar_status_faturas(user_id, meses_referencia):
+    """Status das faturas de todos os cartões nos meses dados, numa consulta só: {(cartao_id, mes): status}."""
+    if not meses_referencia: return {}
+    conn = get_connection("buscar_status_faturas")
+    c = conn.cursor()
+    c.execute('''
+        SELECT cartao_id, mes_referencia, status FROM faturas_controle
+        WHERE user_id = %s AND mes_referencia = ANY(%s)
+    ''', (user_id, sorted(set(meses_referencia))))
+    status = {(cartao_id, mes): st_fatura for cartao_id, mes, st_fatura in c.fetchall()}
+    conn.close()
+    return status
+
 # --- PROJEÇÃO / SALDO FUTURO (LEITURAS OTIMIZADAS) ---
 
-@st.cache_data(ttl=300, show_spinner=False)
+@cache_data_rastreado(ttl=300, show_spinner=False)
 def calcular_saldo_atual(user_id):
     """Retorna o saldo líquido atual (apenas contas correntes/carteira)"""
-    conn = get_connection()
-    df = pd.read_sql_query("SELECT tipo, valor FROM lancamentos WHERE user_id = %s AND status = 'Pago/Recebido'", conn, params=(user_id,))
+    conn = get_connection("calcular_saldo_atual")
+    df = ler_sql(conn, "SELECT tipo, valor FROM lancamentos WHERE user_id = %s AND status = 'Pago/Recebido'", (user_id,), "lancamentos")
     conn.close()
     
     receitas = df[df['tipo'] == 'Receita']['valor'].sum()
     despesas = df[df['tipo'] == 'Despesa']['valor'].sum()
     return receitas - despesas
 
-@st.cache_data(ttl=300, show_spinner=False)
+@cache_compartilhado(ttl=300, show_spinner=False)
 def buscar_faturas_futuras(user_id):
     """Agrupa as parcelas futuras de cartão por data de vencimento"""
-    conn = get_connection()
+    conn = get_connection("buscar_faturas_futuras")
     sql = """
         SELECT 
             lc.mes_fatura, 
@@ -870,19 +1387,19 @@ def buscar_faturas_futuras(user_id):
         AND lc.mes_fatura >= CURRENT_DATE
         GROUP BY lc.mes_fatura, cc.dia_vencimento
     """
-    df = pd.read_sql_query(sql, conn, params=(user_id,))
+    df = ler_sql(conn, sql, (user_id,), "lancamentos_cartao")
     conn.close()
     return df
 
-@st.cache_data(ttl=300, show_spinner=False)
+@cache_compartilhado(ttl=300, show_spinner=False)
 def buscar_metas_saldo_restante(user_id, mes, ano):
     """
     Calcula quanto falta gastar de cada meta no mês atual.
     """
-    conn = get_connection()
+    conn = get_connection("buscar_metas_saldo_restante")
     # 1. Busca Metas
-    df_metas = pd.read_sql_query("SELECT categoria, valor_meta FROM metas WHERE user_id=%s AND mes=%s AND ano=%s", 
-                                 conn, params=(user_id, mes, ano))
+    df_metas = ler_sql(conn, "SELECT categoria, valor_meta FROM metas WHERE user_id=%s AND mes=%s AND ano=%s",
+                       (user_id, mes, ano), "metas")
     if df_metas.empty:
         conn.close()
         return pd.DataFrame()
@@ -895,7 +1412,7 @@ def buscar_metas_saldo_restante(user_id, mes, ano):
         AND EXTRACT(MONTH FROM data) = %s AND EXTRACT(YEAR FROM data) = %s
         GROUP BY categoria
     """
-    df_gastos = pd.read_sql_query(sql_gastos, conn, params=(user_id, mes, ano))
+    df_gastos = ler_sql(conn, sql_gastos, (user_id, mes, ano), "metas")
     conn.close()
     
     # 3. Cruza os dados
@@ -0,0 +1,90 @@
+import pandas as pd
+
+# ==============================================================================
+# 🧱 ESQUEMAS DOS DATAFRAMES (TIPOS COMPACTOS POR TABELA)
+# ==============================================================================
+# O psycopg2 devolve DATE como date e TEXT como str do Python (e o caminho
+# COPY de database.ler_sql devolve tudo como texto do CSV), o que deixa
+# colunas object em que cada .sum()/groupby/filtro das páginas roda em
+# velocidade de Python. Os loaders de database.py passam o resultado por
+# tipar(), que leva cada coluna conhecida para um dtype nativo, igual nos
+# dois caminhos de leitura:
+#   numero     float64 (valores em R$ e quantidades; as telas somam e formatam
+#              com :,.2f, então centavos inteiros obrigariam a converter em
+#              toda página)
+#   categoria  category, para texto de poucos valores distintos
+#   data       datetime64[ns]
+#   periodo    datetime64[ns] e mais as colunas 'ano' e 'mes' já calculadas
+#   id         int32 (SERIAL/INTEGER, nunca nulo nas consultas dos loaders)
+#   texto      fica como str (declarado para o COPY não inferir número/data
+#              num texto que por acaso só tenha dígitos)
+# category só vale nas tabelas com volume (lançamentos, cartão, investimentos
+# e extrato das reservas); nas pequenas só os números mudam.
+# Colunas fora do esquema ficam como vieram do banco; por isso toda coluna de
+# texto, data ou NUMERIC de uma consulta que pode ir por COPY está declarada.
+
+ESQUEMAS = {
+    "lancamentos": {
+        "id": "id", "user_id": "id", "data": "periodo", "valor": "numero",
+        "tipo": "categoria", "categoria": "categoria", "subcategoria": "categoria",
+        "conta": "categoria", "forma_pagamento": "categoria", "status": "categoria",
+        "descricao": "texto", "hash_importacao": "texto",
+    },
+    "investimentos": {
+        "id": "id", "user_id": "id", "data": "data",
+        "ticker": "categoria", "tipo_operacao": "categoria", "classe": "categoria",
+        "quantidade": "numero", "preco_unitario": "numero", "taxas": "numero", "total_operacao": "numero",
+        "notas": "texto",
+    },
+    "lancamentos_cartao": {
+        "id": "id", "user_id": "id", "cartao_id": "id",
+        "data_compra": "data", "mes_fatura": "data", "categoria": "categoria", "valor_parcela": "numero",
+        "descricao": "texto",
+        # buscar_faturas_futuras
+        "total_fatura": "numero",
+    },
+    "reserva_transacoes": {
+        "id": "id", "user_id": "id", "reserva_id": "id", "data": "data",
+        "tipo": "categoria", "origem": "categoria", "nome_reserva": "categoria", "valor": "numero",
+        "descricao": "texto",
+    },
+    "reservas": {
+        "taxa": "numero", "saldo_atual": "numero", "meta_valor": "numero",
+        "nome": "texto", "tipo_aplicacao": "texto", "indice": "texto", "rentabilidade": "texto",
+    },
+    "recorrencias": {"valor": "numero", "nome": "texto", "categoria": "texto", "tipo": "texto"},
+    "metas": {"valor_meta": "numero", "gasto_real": "numero", "categoria": "texto"},
+}
+
+_DTYPES = {"numero": "float64", "categoria": "category", "id": "int32"}
+
+
+def tipar(df, tabela):
+    """Converte as colunas de `df` que estão no esquema de `tabela` (as ausentes são ignoradas)."""
+    esquema = ESQUEMAS[tabela]
+    convertidas = {}
+    for coluna, tipo in esquema.items():
+        if coluna not in df.columns or tipo == "texto": continue
+        if tipo in ("data", "periodo"):
+            convertidas[coluna] = pd.to_datetime(df[coluna], errors="coerce").astype("datetime64[ns]")
+        else:
+            convertidas[coluna] = df[coluna].astype(_DTYPES[tipo])
+        if tipo == "periodo":
+            convertidas.update(_periodo(convertidas[coluna]))
+    return df.assign(**convertidas)
+
+
+def _periodo(datas):
+    """{'ano', 'mes'} de uma coluna datetime64 (inteiros pequenos quando não há data nula)."""
+    ano, mes = datas.dt.year, datas.dt.month
+    if not datas.isna().any():
+        ano, mes = ano.astype("int16"), mes.astype("int8")
+    return {"ano": ano, "mes": mes}
+
+
+def tipos_arrow(tabela):
+    """Tipos do pyarrow.csv para as colunas do esquema (leitura por COPY em database.ler_sql)."""
+    import pyarrow as pa
+    tipos = {"numero": pa.float64(), "categoria": pa.string(), "texto": pa.string(),
+             "data": pa.date32(), "periodo": pa.date32(), "id": pa.int32()}
+    return {coluna: tipos[tipo] for coluna, tipo in ESQUEMAS[tabela].items()}
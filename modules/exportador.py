@@ -0,0 +1,154 @@
+import os
+import tempfile
+import zipfile
+from datetime import date, datetime
+from modules.config import obter_config
+from modules.database import TABELAS_EXPORTACAO, exportar_tabela_csv, iterar_tabela
+
+# ==============================================================================
+# 📦 EXPORTAÇÃO DO HISTÓRICO FINANCEIRO
+# ==============================================================================
+# Nada passa por DataFrame: CSV vai do COPY TO STDOUT direto para o arquivo,
+# Parquet é montado em row groups a partir de um cursor do lado do servidor.
+# Os arquivos são gerados em disco (tempfile), então a geração usa memória
+# constante independente do tamanho da conta.
+# Limitação: a entrega passa pelo st.download_button, que lê o arquivo pronto
+# inteiro para o armazenamento de mídia em memória do Streamlit. Por isso o
+# download tem teto (EXPORTACAO_LIMITE_MB); acima dele o usuário exporta por
+# tabela ou em Parquet, que comprime bem mais.
+
+FORMATOS = ["ZIP (CSV)", "ZIP (Parquet)", "CSV (tabela única)", "Parquet (tabela única)"]
+
+TAMANHO_LOTE_PARQUET = 50000
+LIMITE_DOWNLOAD_MB_PADRAO = 200
+
+# OIDs do Postgres -> tipos Arrow (o resto vira texto)
+_TIPOS_ARROW = {
+    16: "bool",        # boolean
+    20: "int64",       # bigint
+    21: "int64",       # smallint
+    23: "int64",       # integer
+    700: "float64",    # real
+    701: "float64",    # double precision
+    1700: "float64",   # numeric
+    1082: "date32",    # date
+    1114: "timestamp", # timestamp
+}
+
+
+def _schema_arrow(description):
+    import pyarrow as pa
+    fabricas = {
+        "bool": pa.bool_(), "int64": pa.int64(), "float64": pa.float64(),
+        "date32": pa.date32(), "timestamp": pa.timestamp("us"),
+    }
+    return pa.schema([(d.name, fabricas.get(_TIPOS_ARROW.get(d.type_code), pa.string())) for d in description])
+
+
+def _converter_coluna(valores, tipo):
+    """Decimal -> float e demais valores não nativos -> texto, para o Arrow aceitar."""
+    if str(tipo) == "double":
+        return [float(v) if v is not None else None for v in valores]
+    if str(tipo) == "string":
+        return [str(v) if v is not None else None for v in valores]
+    return valores
+
+
+def escrever_parquet(user_id, tabela, destino):
+    """
+    Escreve a tabela do usuário em Parquet, um row group por lote do cursor.
+    Tabela vazia vira um arquivo válido só com o esquema. Retorna quantas linhas escreveu.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Exportação em Parquet requer o pacote 'pyarrow'.")
+
+    escritor = None
+    total = 0
+    try:
+        for description, linhas in iterar_tabela(user_id, tabela, TAMANHO_LOTE_PARQUET, origem="escrever_parquet"):
+            if escritor is None:
+                schema = _schema_arrow(description)
+                escritor = pq.ParquetWriter(destino, schema, compression="snappy")
+            if not linhas:
+                continue
+            total += len(linhas)
+            colunas = list(zip(*linhas))
+            arrays = [
+                pa.array(_converter_coluna(colunas[i], campo.type), type=campo.type)
+                for i, campo in enumerate(schema)
+            ]
+            escritor.write_table(pa.Table.from_arrays(arrays, schema=schema))
+    finally:
+        if escritor is not None:
+            escritor.close()
+    return total
+
+
+def gerar_exportacao(user_id, formato, tabela=None):
+    """
+    Gera o arquivo de exportação em disco e retorna (arquivo aberto para leitura, nome, mime).
+    `tabela` só é usada nos formatos de tabela única.
+    """
+    sufixo = datetime.now().strftime("%Y%m%d_%H%M")
+    saida = tempfile.TemporaryFile()
+
+    if formato == "CSV (tabela única)":
+        exportar_tabela_csv(user_id, tabela, saida, origem="gerar_exportacao")
+        nome, mime = f"{tabela}_{sufixo}.csv", "text/csv"
+
+    elif formato == "Parquet (tabela única)":
+        escrever_parquet(user_id, tabela, saida)
+        nome, mime = f"{tabela}_{sufixo}.parquet", "application/octet-stream"
+
+    else:
+        parquet = formato == "ZIP (Parquet)"
+        with zipfile.ZipFile(saida, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+            for t in TABELAS_EXPORTACAO:
+                if parquet:
+                    # ParquetWriter precisa de arquivo com seek: gera em disco e copia para o zip
+                    # (tabela vazia entra só com o esquema, como o CSV só com o cabeçalho)
+                    with tempfile.TemporaryFile() as tmp:
+                        escrever_parquet(user_id, t, tmp)
+                        tmp.seek(0)
+                        with zf.open(f"{t}.parquet", "w", force_zip64=True) as entrada:
+                            _copiar(tmp, entrada)
+                else:
+                    with zf.open(f"{t}.csv", "w", force_zip64=True) as entrada:
+                        exportar_tabela_csv(user_id, t, entrada, origem="gerar_exportacao")
+            zf.writestr("LEIAME.txt", f"Exportação gerada em {date.today():%d/%m/%Y} - usuário {user_id}\n")
+        nome, mime = f"financas_{sufixo}.zip", "application/zip"
+
+    saida.seek(0)
+    return saida, nome, mime
+
+
+def limite_download_mb():
+    return float(obter_config("EXPORTACAO_LIMITE_MB", LIMITE_DOWNLOAD_MB_PADRAO))
+
+
+def conteudo_para_download(arquivo):
+    """
+    Bytes do arquivo gerado para o st.download_button (que os guarda em memória)
+    e fecha o arquivo temporário. Acima de EXPORTACAO_LIMITE_MB, ValueError.
+    """
+    with arquivo:
+        tamanho = arquivo.seek(0, os.SEEK_END)
+        limite = limite_download_mb()
+        if tamanho > limite * 2**20:
+            raise ValueError(
+                f"Exportação com {tamanho / 2**20:.0f} MB passa do limite de {limite:.0f} MB. "
+                "Exporte tabela por tabela ou em Parquet."
+            )
+        arquivo.seek(0)
+        return arquivo.read()
+
+
+def _copiar(origem, destino, tamanho_bloco=1024 * 1024):
+    while True:
+        bloco = origem.read(tamanho_bloco)
+        if not bloco:
+            break
+        destino.write(bloco)
@@ -0,0 +1,277 @@
+import csv
+import re
+import pandas as pd
+from modules.constants import CATEGORIAS
+
+# ==============================================================================
+# 📥 IMPORTAÇÃO DE EXTRATOS (CSV / OFX)
+# ==============================================================================
+# O arquivo é lido em lotes (nunca inteiro em memória como DataFrame), cada lote
+# é normalizado para o formato da tabela `lancamentos`, validado contra
+# constants.CATEGORIAS e recebe um fingerprint para detecção de duplicados.
+# A gravação em massa (COPY) fica em database.importar_lancamentos.
+
+TAMANHO_LOTE = 5000
+AMOSTRA_REJEITADAS = 100  # linhas rejeitadas guardadas para mostrar na tela
+
+COLUNAS_IMPORTACAO = [
+    "data", "tipo", "categoria", "subcategoria", "descricao",
+    "valor", "conta", "forma_pagamento", "status", "hash_importacao"
+]
+
+# Nomes de coluna aceitos nos CSVs (exportações de banco / planilhas)
+ALIASES_COLUNAS = {
+    "data": ["data", "date", "data lançamento", "data lancamento", "data movimento", "dt"],
+    "descricao": ["descricao", "descrição", "historico", "histórico", "memo", "lançamento", "lancamento", "description"],
+    "valor": ["valor", "valor (r$)", "amount", "quantia"],
+    "tipo": ["tipo", "type"],
+    "categoria": ["categoria", "category"],
+    "subcategoria": ["subcategoria", "sub", "subcategory"],
+    "conta": ["conta", "account", "banco"],
+    "forma_pagamento": ["forma_pagamento", "forma pagamento", "forma"],
+    "status": ["status", "situação", "situacao"],
+}
+
+# Pares (tipo, categoria) e (tipo, categoria, sub) válidos
+_CATEGORIAS_VALIDAS = {(t, c) for t, cats in CATEGORIAS.items() for c in cats}
+_SUBCATEGORIAS_VALIDAS = {(t, c, s) for t, cats in CATEGORIAS.items() for c, subs in cats.items() for s in subs}
+_PRIMEIRA_SUBCATEGORIA = {c: subs[0] for cats in CATEGORIAS.values() for c, subs in cats.items() if subs}
+
+# ==============================================================================
+# 🛠️ LEITURA
+# ==============================================================================
+
+def _detectar_formato(conteudo_inicial: str):
+    """Detecta separador e separador decimal a partir das primeiras linhas do CSV."""
+    try:
+        sep = csv.Sniffer().sniff(conteudo_inicial, delimiters=",;\t|").delimiter
+    except csv.Error:
+        sep = ","
+    # Planilhas brasileiras usam ';' como separador e ',' como decimal
+    decimal = "," if sep == ";" else "."
+    return sep, decimal
+
+
+def _mapear_colunas(colunas):
+    """Retorna {nome_original: nome_padrao} para as colunas reconhecidas."""
+    mapa = {}
+    for original in colunas:
+        chave = str(original).strip().lower()
+        for padrao, aliases in ALIASES_COLUNAS.items():
+            if chave in aliases and padrao not in mapa.values():
+                mapa[original] = padrao
+                break
+    return mapa
+
+
+def _converter_valor(serie, decimal):
+    """Converte textos como '1.234,56' / '-10.5' / 'R$ 3,00' em float (vetorizado)."""
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype(float)
+    txt = serie.astype(str).str.replace(r"[R$\s]", "", regex=True)
+    if decimal == ",":
+        txt = txt.str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+    return pd.to_numeric(txt, errors="coerce")
+
+
+def ler_csv(arquivo, tamanho_lote=TAMANHO_LOTE):
+    """Gera DataFrames brutos (colunas padronizadas) a partir de um CSV, lote a lote."""
+    bruto = arquivo.read(4096)
+    amostra = bruto.decode("utf-8", errors="replace") if isinstance(bruto, bytes) else bruto
+    arquivo.seek(0)
+    sep, decimal = _detectar_formato(amostra)
+
+    leitor = pd.read_csv(
+        arquivo, sep=sep, dtype=str, chunksize=tamanho_lote,
+        encoding="utf-8", encoding_errors="replace", skipinitialspace=True
+    )
+    for lote in leitor:
+        lote = lote.rename(columns=_mapear_colunas(lote.columns))
+        lote["valor"] = _converter_valor(lote["valor"], decimal) if "valor" in lote.columns else float("nan")
+        lote["data"] = pd.to_datetime(lote["data"], dayfirst=True, errors="coerce") if "data" in lote.columns else pd.NaT
+        yield lote
+
+
+TAMANHO_PEDACO_OFX = 1024 * 1024  # bytes lidos por vez do OFX
+
+# Uma transação termina no fechamento, na próxima transação (SGML sem fechamento),
+# no fim da lista ou no fim do trecho já lido (que sempre para antes de um <STMTTRN>)
+_RE_TRANSACAO_OFX = re.compile(r"<STMTTRN>(.*?)(?:</STMTTRN>|(?=<STMTTRN>)|(?=</BANKTRANLIST>)|\Z)", re.S | re.I)
+_RE_INICIO_OFX = re.compile(r"<STMTTRN>", re.I)
+_RE_CAMPO_OFX = re.compile(r"<(TRNTYPE|DTPOSTED|TRNAMT|FITID|MEMO|NAME)>([^<\r\n]*)", re.I)
+
+
+def _transacoes_ofx(arquivo, tamanho_pedaco=TAMANHO_PEDACO_OFX):
+    """
+    Conteúdo de cada <STMTTRN>, lendo o arquivo em pedaços: em memória fica só o
+    pedaço atual mais a transação que ficou cortada no fim dele.
+    """
+    resto = ""
+    while True:
+        pedaco = arquivo.read(tamanho_pedaco)
+        fim = not pedaco
+        texto = resto + (pedaco.decode("latin-1") if isinstance(pedaco, bytes) else pedaco)
+        if fim:
+            corte = len(texto)
+        else:
+            # Só as transações antes do último <STMTTRN> estão completas; sem nenhum,
+            # guarda apenas o bastante para um <STMTTRN> partido entre dois pedaços
+            ultimo = None
+            for ultimo in _RE_INICIO_OFX.finditer(texto):
+                pass
+            corte = ultimo.start() if ultimo else max(0, len(texto) - len("<STMTTRN>"))
+        for bloco in _RE_TRANSACAO_OFX.finditer(texto[:corte]):
+            yield bloco.group(1)
+        if fim:
+            return
+        resto = texto[corte:]
+
+
+def ler_ofx(arquivo, tamanho_lote=TAMANHO_LOTE):
+    """Gera DataFrames brutos a partir de um arquivo OFX (SGML ou XML), lote a lote."""
+    registros = []
+    for bloco in _transacoes_ofx(arquivo):
+        campos = {k.upper(): v.strip() for k, v in _RE_CAMPO_OFX.findall(bloco)}
+        registros.append({
+            "data": campos.get("DTPOSTED", "")[:8],
+            "valor": campos.get("TRNAMT", ""),
+            "descricao": campos.get("MEMO") or campos.get("NAME", ""),
+            "fitid": campos.get("FITID", ""),
+        })
+        if len(registros) >= tamanho_lote:
+            yield _finalizar_lote_ofx(registros)
+            registros = []
+    if registros:
+        yield _finalizar_lote_ofx(registros)
+
+
+def _finalizar_lote_ofx(registros):
+    lote = pd.DataFrame(registros)
+    lote["data"] = pd.to_datetime(lote["data"], format="%Y%m%d", errors="coerce")
+    lote["valor"] = _converter_valor(lote["valor"], ".")
+    return lote
+
+
+def ler_extrato(arquivo, nome_arquivo, tamanho_lote=TAMANHO_LOTE):
+    """Escolhe o leitor pelo nome do arquivo (.ofx ou CSV)."""
+    if nome_arquivo.lower().endswith(".ofx"):
+        return ler_ofx(arquivo, tamanho_lote)
+    return ler_csv(arquivo, tamanho_lote)
+
+# ==============================================================================
+# ✅ NORMALIZAÇÃO, VALIDAÇÃO E FINGERPRINT
+# ==============================================================================
+
+def _texto(lote, coluna, padrao):
+    if coluna not in lote.columns:
+        return pd.Series(padrao, index=lote.index, dtype=object)
+    serie = lote[coluna].astype(object).where(lote[coluna].notna(), None)
+    serie = serie.map(lambda x: x.strip() if isinstance(x, str) else x)
+    return serie.where(serie.notna() & (serie != ""), padrao)
+
+
+def normalizar_lote(lote, padroes: dict):
+    """
+    Converte um lote bruto no formato de `lancamentos`.
+    `padroes` traz conta, forma_pagamento, status e a categoria padrão por tipo
+    (usados quando o extrato não informa). O tipo é inferido pelo sinal do valor.
+    """
+    df = pd.DataFrame(index=lote.index)
+    df["data"] = lote["data"]
+
+    valor = lote["valor"]
+    tipo_inferido = pd.Series("Receita", index=lote.index, dtype=object).where(valor >= 0, "Despesa")
+    df["tipo"] = _texto(lote, "tipo", None).fillna(tipo_inferido)
+    df["valor"] = valor.abs().round(2)
+
+    cat_padrao = df["tipo"].map(padroes.get("categorias", {}))
+    df["categoria"] = _texto(lote, "categoria", None).fillna(cat_padrao)
+    # Sem subcategoria no extrato: usa a escolhida na tela ou a primeira da categoria
+    sub_padrao = df["categoria"].map(
+        lambda c: padroes.get("subcategorias", {}).get(c, _PRIMEIRA_SUBCATEGORIA.get(c))
+    )
+    df["subcategoria"] = _texto(lote, "subcategoria", None).fillna(sub_padrao)
+    df["descricao"] = _texto(lote, "descricao", "")
+    df["conta"] = _texto(lote, "conta", padroes.get("conta"))
+    df["forma_pagamento"] = _texto(lote, "forma_pagamento", padroes.get("forma_pagamento"))
+    df["status"] = _texto(lote, "status", padroes.get("status", "Pago/Recebido"))
+
+    if "fitid" in lote.columns:
+        df["fitid"] = lote["fitid"]
+    return df
+
+
+def validar_lote(df):
+    """Separa linhas válidas das rejeitadas. Retorna (validos, rejeitados com coluna 'motivo')."""
+    motivo = pd.Series(None, index=df.index, dtype=object)
+
+    chave_cat = pd.Series(list(zip(df["tipo"], df["categoria"])), index=df.index)
+    chave_sub = pd.Series(list(zip(df["tipo"], df["categoria"], df["subcategoria"])), index=df.index)
+
+    motivo = motivo.where(chave_sub.isin(_SUBCATEGORIAS_VALIDAS), "Subcategoria inválida")
+    motivo = motivo.where(chave_cat.isin(_CATEGORIAS_VALIDAS), "Categoria inválida")
+    motivo = motivo.where(df["tipo"].isin(list(CATEGORIAS.keys())), "Tipo inválido")
+    motivo = motivo.where(df["valor"].notna() & (df["valor"] > 0), "Valor inválido")
+    motivo = motivo.where(df["data"].notna(), "Data inválida")
+
+    validos = df[motivo.isna()]
+    rejeitados = df[motivo.notna()].assign(motivo=motivo[motivo.notna()])
+    return validos, rejeitados
+
+
+class GeradorFingerprint:
+    """
+    Gera o hash de deduplicação de cada linha: conta + FITID quando o OFX traz o
+    identificador da transação, senão data + valor + tipo + descrição + conta.
+    A escolha é por linha, então não depende de onde caem os limites dos lotes.
+    Linhas idênticas dentro do mesmo arquivo recebem um contador de ocorrência,
+    para que reimportar o mesmo extrato não duplique nada, mas dois cafés iguais
+    no mesmo dia continuem sendo dois lançamentos. O contador é mantido entre lotes.
+    """
+    def __init__(self):
+        self.contagem = {}
+
+    def aplicar(self, df):
+        chave = (
+            df["data"].dt.strftime("%Y-%m-%d") + "|" +
+            df["valor"].map("{:.2f}".format) + "|" +
+            df["tipo"].astype(str) + "|" +
+            df["descricao"].astype(str).str.strip().str.upper() + "|" +
+            df["conta"].astype(str)
+        )
+        if "fitid" in df.columns:
+            # OFX já traz identificador único por transação
+            fitid = df["fitid"].fillna("").astype(str).str.strip()
+            chave = chave.where(fitid.eq(""), "ofx|" + df["conta"].astype(str) + "|" + fitid)
+        anteriores = chave.map(self.contagem).fillna(0).astype(int)
+        ocorrencia = chave.groupby(chave).cumcount() + anteriores
+        for k, n in chave.value_counts().items():
+            self.contagem[k] = self.contagem.get(k, 0) + int(n)
+
+        chave_final = chave + "#" + ocorrencia.astype(str)
+        hashes = pd.util.hash_pandas_object(chave_final, index=False)
+        return df.assign(hash_importacao=hashes.map("{:016x}".format))
+
+
+def preparar_lotes(arquivo, nome_arquivo, padroes: dict, relatorio: dict, tamanho_lote=TAMANHO_LOTE):
+    """
+    Pipeline completo: lê, normaliza, valida e gera fingerprint lote a lote.
+    Gera apenas as linhas válidas (já em COLUNAS_IMPORTACAO); contadores e uma
+    amostra das rejeitadas são acumulados em `relatorio`.
+    """
+    relatorio.setdefault("lidas", 0)
+    relatorio.setdefault("rejeitadas", 0)
+    relatorio.setdefault("amostra_rejeitadas", [])
+    fingerprint = GeradorFingerprint()
+
+    for lote in ler_extrato(arquivo, nome_arquivo, tamanho_lote):
+        relatorio["lidas"] += len(lote)
+        validos, rejeitados = validar_lote(normalizar_lote(lote, padroes))
+
+        relatorio["rejeitadas"] += len(rejeitados)
+        faltam = AMOSTRA_REJEITADAS - sum(len(a) for a in relatorio["amostra_rejeitadas"])
+        if faltam > 0 and not rejeitados.empty:
+            relatorio["amostra_rejeitadas"].append(rejeitados.head(faltam))
+
+        if not validos.empty:
+            yield fingerprint.aplicar(validos)[COLUNAS_IMPORTACAO]
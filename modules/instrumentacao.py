@@ -0,0 +1,188 @@
+import logging
+import threading
+import time
+import psycopg2
+import psycopg2.extensions
+import streamlit as st
+from modules.config import obter_config
+from modules.rastreamento import span
+from modules import metricas, consultas_lentas
+
+# ==============================================================================
+# 🔬 INSTRUMENTAÇÃO DAS CONSULTAS
+# ==============================================================================
+# Toda conexão aberta por database.get_connection usa as classes abaixo, então
+# cada execute/executemany/copy_expert é cronometrado com a contagem de linhas,
+# marcado com a origem passada a get_connection (a função de database.py que
+# pediu a conexão, ou a de quem usa um helper), o usuário e a página.
+#
+# - Por reexecução: lista de consultas no thread do script (iniciar_rerun zera,
+#   finalizar_rerun resume e confere o orçamento).
+# - Por processo: histograma de latência por função.
+# Orçamento: ORCAMENTO_CONSULTAS (qtd) e ORCAMENTO_DB_MS (ms) por reexecução.
+
+logger = logging.getLogger(__name__)
+
+ORCAMENTO_CONSULTAS_PADRAO = 25
+ORCAMENTO_DB_MS_PADRAO = 1000
+
+# Limites superiores (ms) dos baldes do histograma
+BALDES_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf")]
+
+_local = threading.local()
+_trava = threading.Lock()
+_histogramas = {}  # origem -> {"baldes": [...], "total_ms": x, "qtd": n, "linhas": n}
+
+
+def _usuario_atual():
+    try:
+        return st.session_state.get("user_id")
+    except Exception:
+        return None
+
+
+def registrar(origem, operacao, segundos, linhas):
+    """Guarda uma chamada ao banco na reexecução atual (se houver) e no histograma do processo."""
+    ms = segundos * 1000
+    linhas = linhas if linhas is not None and linhas >= 0 else 0
+
+    metricas.observar("financas_db_consulta_segundos", segundos, {"funcao": origem})
+
+    rerun = getattr(_local, "rerun", None)
+    if rerun is not None:
+        rerun["consultas"].append({"origem": origem, "operacao": operacao, "ms": ms, "linhas": linhas})
+
+    with _trava:
+        h = _histogramas.get(origem)
+        if h is None:
+            h = _histogramas[origem] = {"baldes": [0] * len(BALDES_MS), "total_ms": 0.0, "qtd": 0, "linhas": 0}
+        h["baldes"][next(i for i, limite in enumerate(BALDES_MS) if ms <= limite)] += 1
+        h["total_ms"] += ms
+        h["qtd"] += 1
+        h["linhas"] += linhas
+
+# ==============================================================================
+# 🔌 CONEXÃO E CURSOR
+# ==============================================================================
+
+class CursorInstrumentado(psycopg2.extensions.cursor):
+    def _medir(self, operacao, funcao, *args, sql=None, params=None):
+        origem = getattr(self.connection, "origem", "?")
+        inicio = time.perf_counter()
+        try:
+            with span(f"{origem}: {operacao}", "sql") as dados:
+                resultado = funcao(*args)
+                dados["linhas"] = self.rowcount
+            return resultado
+        finally:
+            segundos = time.perf_counter() - inicio
+            registrar(origem, operacao, segundos, self.rowcount)
+            if sql is not None and segundos * 1000 > consultas_lentas.limiar_ms():
+                rerun = getattr(_local, "rerun", None) or {}
+                consultas_lentas.registrar(
+                    self.connection.dsn_original, origem, sql, params, segundos * 1000,
+                    user_id=rerun.get("usuario"), pagina=rerun.get("pagina")
+                )
+
+    def execute(self, query, vars=None):
+        return self._medir("execute", super().execute, query, vars, sql=query, params=vars)
+
+    def executemany(self, query, vars_list):
+        return self._medir("executemany", super().executemany, query, vars_list)
+
+    def copy_expert(self, sql, file, size=8192):
+        return self._medir("copy", super().copy_expert, sql, file, size)
+
+
+class ConexaoInstrumentada(psycopg2.extensions.connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cursor_factory = CursorInstrumentado
+        self.origem = "?"
+        self.dsn_original = None  # conn.dsn mascara a senha; o log de lentas abre conexão própria
+
+
+def conectar(dsn, origem):
+    """psycopg2.connect com as classes instrumentadas; `origem` marca as consultas."""
+    conn = psycopg2.connect(dsn, connection_factory=ConexaoInstrumentada)
+    metricas.registrar_conexao()
+    conn.origem = origem
+    conn.dsn_original = dsn
+    return conn
+
+# ==============================================================================
+# 🔁 POR REEXECUÇÃO
+# ==============================================================================
+
+def iniciar_rerun():
+    _local.rerun = {"pagina": None, "usuario": _usuario_atual(), "inicio": time.perf_counter(), "consultas": []}
+
+
+def definir_pagina(pagina):
+    rerun = getattr(_local, "rerun", None)
+    if rerun is not None:
+        rerun["pagina"] = pagina
+
+
+def resumo_rerun():
+    """Resumo da reexecução em andamento: totais e agregado por função."""
+    rerun = getattr(_local, "rerun", None)
+    if rerun is None:
+        return None
+    por_origem = {}
+    for q in rerun["consultas"]:
+        a = por_origem.setdefault(q["origem"], {"consultas": 0, "ms": 0.0, "linhas": 0})
+        a["consultas"] += 1
+        a["ms"] += q["ms"]
+        a["linhas"] += q["linhas"]
+    return {
+        "pagina": rerun["pagina"],
+        "usuario": rerun["usuario"],
+        "consultas": len(rerun["consultas"]),
+        "db_ms": sum(q["ms"] for q in rerun["consultas"]),
+        "total_ms": (time.perf_counter() - rerun["inicio"]) * 1000,
+        "por_origem": por_origem,
+    }
+
+
+def finalizar_rerun():
+    """Confere o orçamento da reexecução e registra aviso no log se estourou. Retorna o resumo."""
+    resumo = resumo_rerun()
+    if resumo is None:
+        return None
+    max_consultas = int(obter_config("ORCAMENTO_CONSULTAS", ORCAMENTO_CONSULTAS_PADRAO))
+    max_ms = float(obter_config("ORCAMENTO_DB_MS", ORCAMENTO_DB_MS_PADRAO))
+    if resumo["consultas"] > max_consultas or resumo["db_ms"] > max_ms:
+        mais_lentas = sorted(resumo["por_origem"].items(), key=lambda x: x[1]["ms"], reverse=True)[:3]
+        logger.warning(
+            "Orçamento de banco estourado em %s (usuário %s): %d consultas, %.0f ms (limite %d / %.0f ms). Mais lentas: %s",
+            resumo["pagina"], resumo["usuario"], resumo["consultas"], resumo["db_ms"], max_consultas, max_ms,
+            ", ".join(f"{o} {a['ms']:.0f} ms" for o, a in mais_lentas)
+        )
+    return resumo
+
+# ==============================================================================
+# 📊 POR PROCESSO
+# ==============================================================================
+
+def histogramas():
+    """Cópia dos histogramas do processo: {origem: {"baldes": {limite_ms: qtd}, "total_ms", "qtd", "linhas"}}."""
+    with _trava:
+        return {
+            origem: {**h, "baldes": dict(zip(BALDES_MS, h["baldes"]))}
+            for origem, h in _histogramas.items()
+        }
+
+
+def mostrar_painel_debug(resumo):
+    """Painel da reexecução (na sidebar), exibido quando DEBUG_PERFORMANCE está ligado."""
+    if not resumo:
+        return
+    with st.sidebar.expander("🔬 Banco nesta renderização"):
+        st.caption(f"{resumo['pagina']}: {resumo['consultas']} consultas, {resumo['db_ms']:.0f} ms no banco "
+                   f"({resumo['total_ms']:.0f} ms no total)")
+        linhas = sorted(resumo["por_origem"].items(), key=lambda x: x[1]["ms"], reverse=True)
+        st.dataframe(
+            [{"Função": o, "Consultas": a["consultas"], "ms": round(a["ms"], 1), "Linhas": a["linhas"]} for o, a in linhas],
+            hide_index=True, use_container_width=True
+        )
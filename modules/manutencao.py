@@ -0,0 +1,44 @@
+import logging
+import threading
+import streamlit as st
+from modules.config import obter_config
+from modules.database import limpar_sessoes_expiradas, limitar_sessoes_por_usuario
+
+# ==============================================================================
+# 🧹 MANUTENÇÃO EM SEGUNDO PLANO
+# ==============================================================================
+# Uma thread por processo (st.cache_resource garante que só inicia uma vez),
+# fora das threads de execução dos scripts. Mantém a tabela `sessions` pequena:
+# apaga expiradas em lotes e corta sessões excedentes por usuário.
+
+logger = logging.getLogger(__name__)
+
+INTERVALO_PADRAO = 3600  # segundos entre execuções
+
+
+def executar_manutencao():
+    """Executa uma rodada de limpeza. Retorna um resumo."""
+    return {
+        "expiradas": limpar_sessoes_expiradas(),
+        "excedentes": limitar_sessoes_por_usuario(),
+    }
+
+
+def _laco(parar: threading.Event, intervalo):
+    while not parar.is_set():
+        try:
+            resumo = executar_manutencao()
+            if any(resumo.values()):
+                logger.info("Manutenção de sessões: %s", resumo)
+        except Exception:
+            logger.exception("Falha na manutenção de sessões")
+        parar.wait(intervalo)
+
+
+@st.cache_resource(show_spinner=False)
+def iniciar_manutencao():
+    """Inicia a thread de manutenção (uma vez por processo). Retorna o Event para pará-la."""
+    intervalo = float(obter_config("MANUTENCAO_INTERVALO", INTERVALO_PADRAO))
+    parar = threading.Event()
+    threading.Thread(target=_laco, args=(parar, intervalo), name="manutencao-sessoes", daemon=True).start()
+    return parar
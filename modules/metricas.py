@@ -0,0 +1,188 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import streamlit as st
+from modules.config import obter_config
+
+# ==============================================================================
+# 📡 MÉTRICAS (FORMATO TEXTO DO PROMETHEUS)
+# ==============================================================================
+# Registro em memória, por processo (cada réplica expõe as suas):
+#   financas_cache_total{loader,resultado}       hits/misses de cada loader em cache
+#   financas_db_conexoes_total                    conexões abertas (rate() = por minuto)
+#   financas_db_consulta_segundos{funcao}         latência por função de database.py (p50/p90/p99)
+#   financas_cotacoes_segundos / _falhas_total    buscar_cotacoes (yfinance)
+#   financas_sessoes_ativas                       sessões Streamlit conectadas
+# Exposição: METRICAS_PORTA (HTTP em /metrics, só em 127.0.0.1; outra interface
+# só com METRICAS_HOST) e/ou METRICAS_ARQUIVO (reescrito a cada
+# METRICAS_INTERVALO s, para o textfile collector).
+
+logger = logging.getLogger(__name__)
+
+QUANTIS = (0.5, 0.9, 0.99)
+JANELA_AMOSTRAS = 1000  # últimas N observações por série, para os quantis
+
+_trava = threading.Lock()
+_contadores = {}   # (nome, rotulos) -> valor
+_resumos = {}      # (nome, rotulos) -> {"amostras": deque, "soma": x, "qtd": n}
+_descricoes = {
+    "financas_cache_total": ("counter", "Chamadas a loaders em cache por resultado (hit/miss)."),
+    "financas_db_conexoes_total": ("counter", "Conexões abertas com o banco."),
+    "financas_db_conexoes_ultimo_minuto": ("gauge", "Conexões abertas nos últimos 60 segundos."),
+    "financas_db_consulta_segundos": ("summary", "Latência das chamadas ao banco por função."),
+    "financas_cotacoes_segundos": ("summary", "Latência da busca de cotações (yfinance)."),
+    "financas_cotacoes_falhas_total": ("counter", "Falhas na busca de cotações."),
+    "financas_sessoes_ativas": ("gauge", "Sessões Streamlit ativas neste processo."),
+}
+_conexoes_recentes = deque()
+
+
+def _chave(rotulos):
+    return tuple(sorted((rotulos or {}).items()))
+
+
+def contar(nome, rotulos=None, valor=1):
+    with _trava:
+        k = (nome, _chave(rotulos))
+        _contadores[k] = _contadores.get(k, 0) + valor
+
+
+def observar(nome, valor, rotulos=None):
+    with _trava:
+        k = (nome, _chave(rotulos))
+        r = _resumos.get(k)
+        if r is None:
+            r = _resumos[k] = {"amostras": deque(maxlen=JANELA_AMOSTRAS), "soma": 0.0, "qtd": 0}
+        r["amostras"].append(valor)
+        r["soma"] += valor
+        r["qtd"] += 1
+
+
+def valor(nome, rotulos=None):
+    """Valor atual de um contador (0 se nunca foi incrementado)."""
+    with _trava:
+        return _contadores.get((nome, _chave(rotulos)), 0)
+
+
+def registrar_conexao():
+    agora = time.monotonic()
+    contar("financas_db_conexoes_total")
+    with _trava:
+        _conexoes_recentes.append(agora)
+
+
+def _conexoes_ultimo_minuto():
+    limite = time.monotonic() - 60
+    with _trava:
+        while _conexoes_recentes and _conexoes_recentes[0] < limite:
+            _conexoes_recentes.popleft()
+        return len(_conexoes_recentes)
+
+
+def _sessoes_ativas():
+    try:
+        from streamlit.runtime import Runtime
+        return Runtime.instance()._session_mgr.num_active_sessions()
+    except Exception:
+        return None
+
+# ==============================================================================
+# 📝 EXPOSIÇÃO
+# ==============================================================================
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _rotulos_texto(rotulos):
+    if not rotulos:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in rotulos) + "}"
+
+
+def _quantil(ordenadas, q):
+    if not ordenadas:
+        return float("nan")
+    return ordenadas[min(len(ordenadas) - 1, int(q * len(ordenadas)))]
+
+
+def gerar_texto():
+    """Todas as métricas no formato de exposição texto do Prometheus."""
+    with _trava:
+        contadores = dict(_contadores)
+        resumos = {k: (sorted(r["amostras"]), r["soma"], r["qtd"]) for k, r in _resumos.items()}
+
+    series = {}
+    for (nome, rotulos), valor in contadores.items():
+        series.setdefault(nome, []).append(f"{nome}{_rotulos_texto(rotulos)} {valor}")
+    for (nome, rotulos), (amostras, soma, qtd) in resumos.items():
+        linhas = series.setdefault(nome, [])
+        for q in QUANTIS:
+            linhas.append(f"{nome}{_rotulos_texto(rotulos + (('quantile', q),))} {_quantil(amostras, q)}")
+        linhas.append(f"{nome}_sum{_rotulos_texto(rotulos)} {soma}")
+        linhas.append(f"{nome}_count{_rotulos_texto(rotulos)} {qtd}")
+
+    series["financas_db_conexoes_ultimo_minuto"] = [f"financas_db_conexoes_ultimo_minuto {_conexoes_ultimo_minuto()}"]
+    sessoes = _sessoes_ativas()
+    if sessoes is not None:
+        series["financas_sessoes_ativas"] = [f"financas_sessoes_ativas {sessoes}"]
+
+    saida = []
+    for nome in sorted(series):
+        tipo, ajuda = _descricoes.get(nome, ("untyped", nome))
+        saida.append(f"# HELP {nome} {ajuda}")
+        saida.append(f"# TYPE {nome} {tipo}")
+        saida.extend(series[nome])
+    return "\n".join(saida) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        corpo = gerar_texto().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def _escrever_arquivo(caminho, intervalo):
+    while True:
+        try:
+            temporario = f"{caminho}.tmp"
+            with open(temporario, "w", encoding="utf-8") as f:
+                f.write(gerar_texto())
+            os.replace(temporario, caminho)  # troca atômica: o coletor nunca lê arquivo pela metade
+        except Exception:
+            logger.exception("Falha ao gravar métricas em %s", caminho)
+        time.sleep(intervalo)
+
+
+@st.cache_resource(show_spinner=False)
+def iniciar_exportador():
+    """Sobe o servidor HTTP e/ou o gravador de arquivo (uma vez por processo), conforme a configuração."""
+    porta = obter_config("METRICAS_PORTA")
+    arquivo = obter_config("METRICAS_ARQUIVO")
+    servidor = None
+    if porta:
+        host = obter_config("METRICAS_HOST", "127.0.0.1")
+        try:
+            servidor = ThreadingHTTPServer((host, int(porta)), _Handler)
+        except OSError as e:
+            # Porta ocupada (ex: outra réplica no mesmo host): segue sem o endpoint
+            logger.warning("Métricas HTTP não iniciadas em %s:%s: %s", host, porta, e)
+        else:
+            threading.Thread(target=servidor.serve_forever, name="metricas-http", daemon=True).start()
+    if arquivo:
+        intervalo = float(obter_config("METRICAS_INTERVALO", 15))
+        threading.Thread(target=_escrever_arquivo, args=(arquivo, intervalo), name="metricas-arquivo", daemon=True).start()
+    return servidor
@@ -1,6 +1,6 @@
 import streamlit as st
 from datetime import date, timedelta
-from modules.database import carregar_cartoes, obter_status_fatura, buscar_pendencias_proximas
+from modules.database import carregar_cartoes, buscar_status_faturas, buscar_pendencias_proximas
 
 def verificar_notificacoes(user_id):
     """
@@ -25,6 +25,9 @@ def verificar_notificacoes(user_id):
     # 2. VERIFICAR FATURAS DE CARTÃO
     df_cartoes = carregar_cartoes(user_id)
     if not df_cartoes.empty:
+        # Primeiro calcula o vencimento de cada cartão; depois busca o status de
+        # todas as faturas envolvidas numa consulta só (nada de uma por cartão)
+        verificacoes = []
         for _, cartao in df_cartoes.iterrows():
             cartao_id = int(cartao['id'])
             dia_venc = int(cartao['dia_vencimento'])
@@ -39,23 +42,28 @@ def verificar_notificacoes(user_id):
 
             # Se o vencimento deste mês já passou (ex: hoje 15, venceu 10),
             # olhamos para o mês que vem.
+            vencimento_passado = None
             if data_vencimento_atual < hoje:
                 # Mas antes, checamos se a fatura passada ficou em aberto (Atrasada!)
-                mes_ref_passado = data_vencimento_atual.replace(day=1)
-                status_passado = obter_status_fatura(user_id, cartao_id, mes_ref_passado)
-                if not (status_passado and status_passado['status'] in ['Paga', 'Paga Externo']):
-                     alertas.append(("error", f"🔥 **ATRASADO:** A fatura do {nome} venceu dia {data_vencimento_atual.strftime('%d/%m')}!"))
+                vencimento_passado = data_vencimento_atual
                 
                 # Avança para o próximo mês
                 mes_proximo = (hoje.replace(day=1) + timedelta(days=32)).replace(day=dia_venc)
                 data_vencimento_atual = mes_proximo
 
-            # Data base para buscar no banco (Sempre dia 1 do mês do vencimento)
-            mes_ref = data_vencimento_atual.replace(day=1)
-            
+            verificacoes.append((cartao_id, dia_venc, nome, vencimento_passado, data_vencimento_atual))
+
+        # Data base para buscar no banco (Sempre dia 1 do mês do vencimento)
+        meses = [v[4].replace(day=1) for v in verificacoes] + [v[3].replace(day=1) for v in verificacoes if v[3]]
+        status_faturas = buscar_status_faturas(user_id, meses)
+        pagas = ['Paga', 'Paga Externo']
+
+        for cartao_id, dia_venc, nome, vencimento_passado, data_vencimento_atual in verificacoes:
+            if vencimento_passado and status_faturas.get((cartao_id, vencimento_passado.replace(day=1))) not in pagas:
+                alertas.append(("error", f"🔥 **ATRASADO:** A fatura do {nome} venceu dia {vencimento_passado.strftime('%d/%m')}!"))
+
             # Verifica se já pagou a fatura vigente
-            status_info = obter_status_fatura(user_id, cartao_id, mes_ref)
-            ja_pagou = status_info and status_info['status'] in ['Paga', 'Paga Externo']
+            ja_pagou = status_faturas.get((cartao_id, data_vencimento_atual.replace(day=1))) in pagas
             
             if not ja_pagou:
                 dias_para_vencer = (data_vencimento_atual - hoje).days
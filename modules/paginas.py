@@ -0,0 +1,60 @@
+import importlib
+import logging
+import threading
+import time
+from modules.instrumentacao import definir_pagina
+from modules.rastreamento import span
+
+# ==============================================================================
+# 🧭 REGISTRO DE PÁGINAS (IMPORTAÇÃO SOB DEMANDA)
+# ==============================================================================
+# Cada opção do menu aponta para (módulo, função). O módulo só é importado na
+# primeira vez que a página é aberta, então a tela de login e quem só usa
+# Lançamentos não pagam por yfinance, plotly etc. O tempo de cada importação
+# fica registrado para o relatório.
+
+logger = logging.getLogger(__name__)
+
+PAGINAS = {
+    "Dashboard": ("modules.ui_dashboard", "show_dashboard"),
+    "Lançamentos": ("modules.ui_lancamentos", "show_lancamentos"),
+    "Receitas Fixas": ("modules.ui_receitas_fixas", "show_receitas_fixas"),
+    "Despesas Fixas": ("modules.ui_despesas_fixas", "show_despesas_fixas"),
+    "Projeção": ("modules.ui_projecao", "show_projecao"),
+    "Cartões": ("modules.ui_cartoes", "show_cartoes"),
+    "Investimentos": ("modules.ui_investimentos", "show_investimentos"),
+    "Reserva": ("modules.ui_reserva", "show_reserva"),
+    "Metas de Gasto": ("modules.ui_metasgasto", "show_orcamento"),
+    "Ferramentas": ("modules.ui_ferramentas", "show_ferramentas"),
+}
+
+# {página: segundos gastos na primeira importação}
+_tempos_importacao = {}
+_trava = threading.Lock()
+
+
+def carregar_pagina(nome):
+    """Retorna a função da página, importando o módulo na primeira vez."""
+    modulo, funcao = PAGINAS[nome]
+    with _trava:
+        if nome not in _tempos_importacao:
+            inicio = time.perf_counter()
+            importlib.import_module(modulo)
+            _tempos_importacao[nome] = time.perf_counter() - inicio
+            logger.info("Página %s importada em %.0f ms", nome, _tempos_importacao[nome] * 1000)
+    return getattr(importlib.import_module(modulo), funcao)
+
+
+def mostrar_pagina(nome):
+    definir_pagina(nome)
+    with span(f"importar {nome}", "pagina"):
+        funcao = carregar_pagina(nome)
+    with span(funcao.__name__, "pagina", pagina=nome):
+        funcao()
+
+
+def relatorio_importacoes():
+    """Lista (página, ms) das páginas já importadas neste processo, da mais lenta para a mais rápida."""
+    with _trava:
+        itens = list(_tempos_importacao.items())
+    return sorted(((nome, seg * 1000) for nome, seg in itens), key=lambda x: x[1], reverse=True)
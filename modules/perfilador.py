@@ -0,0 +1,95 @@
+import cProfile
+import io
+import marshal
+import pstats
+import time
+import streamlit as st
+from modules.config import obter_config
+
+# ==============================================================================
+# 🩺 PERFILADOR SOB DEMANDA (SÓ ADMIN)
+# ==============================================================================
+# Um admin marca "perfilar a próxima renderização" e a página selecionada roda
+# uma vez sob cProfile. O cProfile só mede o thread que o ativou, então o perfil
+# fica restrito à sessão do admin (os outros usuários não pagam nada).
+# Resultado: ranking das funções mais pesadas + arquivo .prof (snakeviz, pstats).
+# Admins: ADMIN_USERS = "usuario1,usuario2" (env ou secrets).
+
+TOP_FUNCOES = 30
+
+
+def eh_admin():
+    admins = {u.strip().lower() for u in str(obter_config("ADMIN_USERS", "")).split(",") if u.strip()}
+    return st.session_state.get("username", "").lower() in admins
+
+
+def _ranking(stats, chave):
+    """Lista de dicts com as TOP_FUNCOES funções ordenadas por `chave` (tottime/cumtime)."""
+    linhas = []
+    for (arquivo, linha, nome), (cc, nc, tt, ct, _) in stats.stats.items():
+        linhas.append({
+            "Função": nome, "Arquivo": f"{arquivo}:{linha}",
+            "Chamadas": nc, "tottime (ms)": round(tt * 1000, 2), "cumtime (ms)": round(ct * 1000, 2),
+        })
+    campo = "tottime (ms)" if chave == "tottime" else "cumtime (ms)"
+    return sorted(linhas, key=lambda x: x[campo], reverse=True)[:TOP_FUNCOES]
+
+
+def executar_perfilado(funcao, pagina):
+    """Executa `funcao` sob cProfile e guarda o resultado na sessão."""
+    perfil = cProfile.Profile()
+    inicio = time.perf_counter()
+    perfil.enable()
+    try:
+        funcao()
+    finally:
+        perfil.disable()
+        duracao = time.perf_counter() - inicio
+        texto = io.StringIO()
+        stats = pstats.Stats(perfil, stream=texto)
+        # Mesmo formato de Profile.dump_stats (lido por pstats/snakeviz)
+        prof = marshal.dumps(stats.stats)
+        stats.sort_stats("cumulative").print_stats(TOP_FUNCOES)
+        st.session_state["perfil_resultado"] = {
+            "pagina": pagina,
+            "duracao_ms": duracao * 1000,
+            "por_tottime": _ranking(stats, "tottime"),
+            "por_cumtime": _ranking(stats, "cumtime"),
+            "texto": texto.getvalue(),
+            "prof": prof,
+        }
+
+
+def deve_perfilar(pagina):
+    """True (uma única vez) se o admin pediu para perfilar esta página."""
+    if st.session_state.get("perfilar_proxima") == pagina and eh_admin():
+        st.session_state["perfilar_proxima"] = None
+        return True
+    return False
+
+
+def mostrar_controles(pagina):
+    """Controles na sidebar: pedir o perfil da próxima renderização e ver o último."""
+    if not eh_admin():
+        return
+    with st.sidebar.expander("🩺 Perfilador"):
+        if st.button(f"Perfilar próxima renderização de {pagina}"):
+            st.session_state["perfilar_proxima"] = pagina
+            st.rerun()
+
+        resultado = st.session_state.get("perfil_resultado")
+        if resultado:
+            st.caption(f"Último perfil: {resultado['pagina']} em {resultado['duracao_ms']:.0f} ms")
+            visao = st.radio("Ordenar por", ["tempo próprio", "tempo acumulado"], horizontal=True, key="perfil_ordem")
+            st.dataframe(
+                resultado["por_tottime"] if visao == "tempo próprio" else resultado["por_cumtime"],
+                hide_index=True, use_container_width=True
+            )
+            st.download_button(
+                "Baixar perfil (.prof)", data=resultado["prof"],
+                file_name=f"perfil_{resultado['pagina']}.prof", mime="application/octet-stream"
+            )
+            st.download_button(
+                "Baixar relatório (.txt)", data=resultado["texto"],
+                file_name=f"perfil_{resultado['pagina']}.txt", mime="text/plain"
+            )
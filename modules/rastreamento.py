@@ -0,0 +1,164 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+import streamlit as st
+from modules.config import obter_config
+from modules import metricas
+
+# ==============================================================================
+# 🧵 RASTREAMENTO (SPANS NO FORMATO CHROME TRACE)
+# ==============================================================================
+# Spans aninhados por reexecução: roteador, página, loaders em cache (hit/miss),
+# SQL, yfinance e montagem de gráficos. Ligado com TRACE=1 (ou pelo painel de
+# debug); cada reexecução rastreada vira um arquivo JSON em TRACE_DIR que abre
+# direto em chrome://tracing, Perfetto ou speedscope (visão de chama).
+# Desligado, span() não registra nada e custa só uma consulta ao thread-local.
+
+_local = threading.local()
+
+
+def ativo():
+    return getattr(_local, "eventos", None) is not None
+
+
+def iniciar_rastreamento(forcar=False):
+    """Começa a gravar spans nesta reexecução se TRACE estiver ligado (ou `forcar`)."""
+    _local.eventos = [] if (forcar or obter_config("TRACE")) else None
+
+
+@contextmanager
+def span(nome, categoria="app", **args):
+    """Mede o bloco como um evento 'X' (completo). Devolve um dict para anexar args."""
+    eventos = getattr(_local, "eventos", None)
+    if eventos is None:
+        yield args
+        return
+    inicio = time.perf_counter_ns()
+    try:
+        yield args
+    finally:
+        eventos.append({
+            "name": nome, "cat": categoria, "ph": "X",
+            "ts": inicio / 1000, "dur": (time.perf_counter_ns() - inicio) / 1000,
+            "pid": os.getpid(), "tid": threading.get_ident(), "args": args,
+        })
+
+
+def rastrear(nome=None, categoria="app"):
+    """Decorador: envolve a função num span."""
+    def decorador(funcao):
+        rotulo = nome or funcao.__name__
+
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            with span(rotulo, categoria):
+                return funcao(*args, **kwargs)
+        return envolvida
+    return decorador
+
+
+def _instrumentar(funcao, cache, nome):
+    """
+    Aplica `cache` (decorador do Streamlit) a `funcao` e devolve (cacheada, chamar):
+    chamar conta hit/miss nas métricas e, com o rastreamento ligado, vira um span
+    marcado com cache=hit/miss (miss = a função original chegou a executar).
+    """
+    @functools.wraps(funcao)
+    def executar(*args, **kwargs):
+        _local.misses = getattr(_local, "misses", 0) + 1
+        return funcao(*args, **kwargs)
+
+    cacheada = cache(executar)
+
+    def chamar(*args, **kwargs):
+        with span(nome, "cache") as dados:
+            antes = getattr(_local, "misses", 0)
+            resultado = cacheada(*args, **kwargs)
+            dados["cache"] = "miss" if getattr(_local, "misses", 0) != antes else "hit"
+        metricas.contar("financas_cache_total", {"loader": nome, "resultado": dados["cache"]})
+        return resultado
+    return cacheada, chamar
+
+
+def cache_data_rastreado(**opcoes):
+    """Igual a @st.cache_data(**opcoes), com hit/miss nas métricas e nos spans."""
+    def decorador(funcao):
+        cacheada, chamar = _instrumentar(funcao, st.cache_data(**opcoes), funcao.__name__)
+        envolvida = functools.wraps(funcao)(chamar)
+        envolvida.clear = cacheada.clear
+        return envolvida
+    return decorador
+
+# ==============================================================================
+# 🤝 FRAMES COMPARTILHADOS ENTRE SESSÕES
+# ==============================================================================
+# Cada hit do st.cache_data desserializa uma cópia inteira do resultado (o
+# carregar_dados de um usuário grande, às vezes mais de uma vez na mesma
+# reexecução). cache_compartilhado guarda o DataFrame uma vez por processo
+# (st.cache_resource) e cada chamada recebe uma visão rasa (copy(deep=False)):
+# com o copy-on-write do pandas 3 a página pode filtrar, derivar colunas ou
+# até atribuir na visão sem copiar os dados e sem alterar o frame guardado.
+# A geração dos dados entra na chave: limpar_compartilhados() (chamado pelo
+# database.clear_cache) a avança e esvazia os caches, então uma leitura que
+# estava em curso durante a limpeza fica gravada numa geração que ninguém lê.
+
+_geracao = 0
+_trava_geracao = threading.Lock()
+_compartilhados = []
+
+
+def _visao(resultado):
+    """Visão sem cópia de um DataFrame (ou dos DataFrames de uma tupla)."""
+    if isinstance(resultado, pd.DataFrame):
+        return resultado.copy(deep=False)
+    if isinstance(resultado, tuple):
+        return tuple(_visao(r) for r in resultado)
+    return resultado
+
+
+def cache_compartilhado(**opcoes):
+    """Como cache_data_rastreado, mas sem cópia por hit: @st.cache_resource + visões."""
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def por_geracao(geracao, *args, **kwargs):
+            return funcao(*args, **kwargs)
+
+        cacheada, chamar = _instrumentar(por_geracao, st.cache_resource(**opcoes), funcao.__name__)
+
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            return _visao(chamar(_geracao, *args, **kwargs))
+
+        envolvida.clear = cacheada.clear
+        _compartilhados.append(cacheada)
+        return envolvida
+    return decorador
+
+
+def limpar_compartilhados():
+    """Nova geração de dados: descarta os frames de todos os loaders compartilhados."""
+    global _geracao
+    with _trava_geracao:
+        _geracao += 1
+        for cacheada in _compartilhados:
+            cacheada.clear()
+
+
+def finalizar_rastreamento(rotulo="rerun"):
+    """Grava os spans da reexecução em TRACE_DIR e retorna o caminho (ou None se não rastreou)."""
+    eventos = getattr(_local, "eventos", None)
+    _local.eventos = None
+    if not eventos:
+        return None
+    pasta = Path(obter_config("TRACE_DIR", "traces"))
+    pasta.mkdir(parents=True, exist_ok=True)
+    seguro = "".join(ch if ch.isalnum() else "_" for ch in str(rotulo))
+    caminho = pasta / f"trace_{seguro}_{datetime.now():%Y%m%d_%H%M%S_%f}.json"
+    caminho.write_text(json.dumps({"traceEvents": eventos, "displayTimeUnit": "ms"}), encoding="utf-8")
+    return caminho
@@ -0,0 +1,307 @@
+import json
+import urllib.request
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from modules.database import (
+    carregar_base_rendimentos, carregar_taxas_indices, intervalos_taxas_indices,
+    salvar_taxas_indices, gravar_rendimentos
+)
+
+# ==============================================================================
+# 📈 RENDIMENTOS AUTOMÁTICOS DAS RESERVAS
+# ==============================================================================
+# Aplica as taxas diárias dos índices a todas as reservas indexadas de uma vez
+# (matrizes reservas x dias, em blocos de tamanho limitado), capitalizando dia
+# útil a dia útil, e grava os "Rendimento" em massa. Cada reserva recomeça no
+# dia seguinte ao seu último rendimento automático, então rodar de novo (ou
+# depois de dias parado) só completa o que falta. Cada reserva para no último
+# dia com taxa publicada do seu índice (o IPCA do mês sai ~10 dias depois): dia
+# sem taxa não rende zero, fica para a próxima execução. As taxas ficam em cache
+# na tabela `indices_taxas`.
+#
+# Interpretação de `reservas.taxa`:
+#   CDI / Selic -> % do índice (ex: 110 = 110% do CDI)
+#   IPCA        -> spread ao ano sobre o IPCA (ex: 6 = IPCA + 6% a.a.)
+#   Pré-fixado  -> taxa ao ano
+# Poupança, TR e Outro não têm regra automática e continuam manuais.
+
+DIAS_UTEIS_ANO = 252
+
+# Teto de células (reservas x dias) de cada matriz do cálculo; acima disso as
+# reservas são calculadas em blocos (uma recuperação longa não estoura a memória)
+MAX_CELULAS_MATRIZ = 1_000_000
+
+# Séries do SGS (Banco Central): CDI e Selic em % ao dia, IPCA em % ao mês
+SERIES_BCB = {"CDI": 12, "Selic": 11, "IPCA": 433}
+
+INDICES_AUTOMATICOS = ["CDI", "Selic", "IPCA", "Pré-fixado"]
+
+# ==============================================================================
+# 🌐 PROVEDORES DE TAXAS
+# ==============================================================================
+
+def _dias_uteis(data_inicio, data_fim):
+    """Dias úteis (seg-sex; sem calendário de feriados)."""
+    return pd.bdate_range(data_inicio, data_fim)
+
+
+def _ipca_mensal_para_diario(df_mensal, data_inicio, data_fim):
+    """Distribui a taxa mensal do IPCA pelos dias úteis do mês (taxa equivalente composta)."""
+    linhas = []
+    for mes, taxa in df_mensal.itertuples(index=False):
+        inicio_mes = pd.Timestamp(mes).replace(day=1)
+        dias = _dias_uteis(inicio_mes, inicio_mes + pd.offsets.MonthEnd(0))
+        diaria = ((1 + taxa / 100) ** (1 / len(dias)) - 1) * 100
+        linhas.append(pd.DataFrame({"data": dias, "taxa": diaria}))
+    if not linhas:
+        return pd.DataFrame(columns=["data", "taxa"])
+    df = pd.concat(linhas, ignore_index=True)
+    return df[(df["data"] >= pd.Timestamp(data_inicio)) & (df["data"] <= pd.Timestamp(data_fim))]
+
+
+class ProvedorBCB:
+    """Busca as séries na API pública do SGS/BCB."""
+    URL = "https://api.bcb.gov.br/dados/serie/bcdata.sgs.{serie}/dados?formato=json&dataInicial={ini}&dataFinal={fim}"
+
+    def __init__(self, timeout=20):
+        self.timeout = timeout
+
+    def _buscar(self, serie, data_inicio, data_fim):
+        url = self.URL.format(serie=serie, ini=f"{data_inicio:%d/%m/%Y}", fim=f"{data_fim:%d/%m/%Y}")
+        with urllib.request.urlopen(url, timeout=self.timeout) as resp:
+            dados = json.loads(resp.read().decode("utf-8"))
+        df = pd.DataFrame(dados, columns=["data", "valor"])
+        return pd.DataFrame({
+            "data": pd.to_datetime(df["data"], format="%d/%m/%Y"),
+            "taxa": pd.to_numeric(df["valor"], errors="coerce"),
+        }).dropna()
+
+    def obter(self, indice, data_inicio, data_fim):
+        """Retorna DataFrame (data, taxa em % ao dia útil) do índice no intervalo."""
+        if indice == "IPCA":
+            inicio_mes = data_inicio.replace(day=1)
+            mensal = self._buscar(SERIES_BCB["IPCA"], inicio_mes, data_fim)
+            return _ipca_mensal_para_diario(mensal, data_inicio, data_fim)
+        return self._buscar(SERIES_BCB[indice], data_inicio, data_fim)
+
+
+class ProvedorFalso:
+    """Taxas constantes em % ao dia útil (testes e ambientes sem acesso à internet)."""
+    PADRAO = {"CDI": 0.04, "Selic": 0.04, "IPCA": 0.02}
+
+    def __init__(self, taxas=None):
+        self.taxas = taxas or self.PADRAO
+
+    def obter(self, indice, data_inicio, data_fim):
+        dias = _dias_uteis(data_inicio, data_fim)
+        return pd.DataFrame({"data": dias, "taxa": self.taxas.get(indice, 0.0)})
+
+# ==============================================================================
+# 🗄️ CACHE DE TAXAS
+# ==============================================================================
+
+def sincronizar_taxas(provedor, indices, data_inicio, data_fim):
+    """Busca no provedor só os trechos que faltam no cache local. Retorna quantas taxas gravou."""
+    intervalos = intervalos_taxas_indices()
+    gravadas = 0
+    for indice in indices:
+        if indice not in SERIES_BCB:
+            continue
+        faltando = []
+        if indice not in intervalos:
+            faltando.append((data_inicio, data_fim))
+        else:
+            ini_cache, fim_cache = intervalos[indice]
+            if data_inicio < ini_cache:
+                faltando.append((data_inicio, ini_cache - timedelta(days=1)))
+            if data_fim > fim_cache:
+                faltando.append((fim_cache + timedelta(days=1), data_fim))
+
+        for ini, fim in faltando:
+            df = provedor.obter(indice, ini, fim)
+            if df.empty:
+                continue
+            df = df.assign(indice=indice, data=df["data"].dt.date)
+            gravadas += salvar_taxas_indices(df)
+    return gravadas
+
+# ==============================================================================
+# 🧮 CÁLCULO VETORIZADO
+# ==============================================================================
+
+def _fim_das_reservas(df_res, df_taxas, data_fim):
+    """
+    Último dia que cada reserva pode render com as taxas disponíveis:
+    - CDI / Selic: última data com taxa do índice (as séries do SGS só trazem dias
+      úteis, então um dia sem taxa entre duas publicadas é feriado e não rende);
+    - IPCA: véspera do primeiro dia útil sem taxa a partir do início da reserva
+      (cada mês publicado cobre todos os seus dias úteis; mês faltando interrompe);
+    - Pré-fixado: `data_fim`.
+    """
+    data_fim = pd.Timestamp(data_fim)
+    um_dia = pd.Timedelta(days=1)
+    fim = pd.Series(data_fim, index=df_res.index)
+    datas = {indice: pd.DatetimeIndex(g["data"]) for indice, g in df_taxas.groupby("indice")}
+
+    for indice in ("CDI", "Selic"):
+        m = df_res["indice"] == indice
+        publicadas = datas.get(indice, pd.DatetimeIndex([]))
+        publicadas = publicadas[publicadas <= data_fim]
+        fim[m] = publicadas.max() if len(publicadas) else df_res.loc[m, "inicio"] - um_dia
+
+    m = df_res["indice"] == "IPCA"
+    if m.any():
+        uteis = _dias_uteis(df_res.loc[m, "inicio"].min(), data_fim)
+        faltando = uteis[~uteis.isin(datas.get("IPCA", pd.DatetimeIndex([])))]
+        # Primeiro dia útil sem taxa a partir do início de cada reserva (ou o dia após data_fim)
+        primeiro = faltando.append(pd.DatetimeIndex([data_fim + um_dia]))
+        fim[m] = primeiro[faltando.searchsorted(df_res.loc[m, "inicio"])] - um_dia
+    return fim
+
+
+def _matriz_taxas(df_res, df_taxas, dias):
+    """
+    Taxa diária efetiva (fração) de cada reserva em cada dia: matriz reservas x dias.
+    df_res traz `fim` (ver _fim_das_reservas): depois dele a reserva não rende, e antes
+    dele os únicos dias sem taxa são dias não úteis do índice.
+    """
+    idx_dias = pd.DatetimeIndex(dias)
+    por_indice = (
+        df_taxas.pivot_table(index="indice", columns="data", values="taxa", aggfunc="last")
+        .reindex(columns=idx_dias).fillna(0.0) / 100
+    )
+    util = idx_dias.dayofweek < 5
+
+    def serie(indice):
+        if indice in por_indice.index:
+            return por_indice.loc[indice].to_numpy()
+        return np.zeros(len(idx_dias))
+
+    taxa = df_res["taxa"].to_numpy()[:, None]
+    indices = df_res["indice"].to_numpy()
+    r = np.zeros((len(df_res), len(idx_dias)))
+
+    for indice in ("CDI", "Selic"):
+        m = indices == indice
+        r[m] = serie(indice)[None, :] * taxa[m] / 100
+
+    m = indices == "IPCA"
+    spread = (1 + taxa[m] / 100) ** (1 / DIAS_UTEIS_ANO) - 1
+    r[m] = ((1 + serie("IPCA")[None, :]) * (1 + spread) - 1) * util[None, :]
+
+    m = indices == "Pré-fixado"
+    r[m] = ((1 + taxa[m] / 100) ** (1 / DIAS_UTEIS_ANO) - 1) * util[None, :]
+
+    # Antes do início de cada reserva não há rendimento (já lançado ou fora da janela),
+    # nem depois do último dia com taxa publicada (fica para a próxima execução)
+    r[idx_dias.to_numpy()[None, :] < df_res["inicio"].to_numpy()[:, None]] = 0.0
+    r[idx_dias.to_numpy()[None, :] > df_res["fim"].to_numpy()[:, None]] = 0.0
+    return r
+
+
+def _blocos(df_res, data_fim):
+    """Fatias de df_res (por data de início) com no máximo MAX_CELULAS_MATRIZ reservas x dias."""
+    df_res = df_res.sort_values("inicio", kind="stable")
+    pos = 0
+    while pos < len(df_res):
+        dias = (pd.Timestamp(data_fim) - df_res["inicio"].iloc[pos]).days + 1
+        tamanho = max(1, MAX_CELULAS_MATRIZ // max(dias, 1))
+        yield df_res.iloc[pos:pos + tamanho]
+        pos += tamanho
+
+
+def calcular_rendimentos(df_res, df_mov, df_taxas, data_fim):
+    """
+    Calcula os rendimentos diários das reservas, uma passada por bloco de reservas
+    (cada bloco vai só do seu início mais antigo até `data_fim`). Cada reserva para
+    no último dia com taxa publicada do seu índice (ver _fim_das_reservas).
+
+    Com o saldo ao fim do dia S_d = S_{d-1}(1 + r_d) + F_d (movimentos do dia entram
+    depois do rendimento), a recorrência tem forma fechada:
+        P_d = prod(1 + r_k, k <= d)
+        S_d = P_d * (S_0 + cumsum(F_k / P_k))
+    e o rendimento do dia é S_{d-1} * r_d (saldo negativo não rende).
+    Retorna DataFrame (user_id, reserva_id, data, valor, descricao) pronto para gravar.
+    """
+    colunas = ["user_id", "reserva_id", "data", "valor", "descricao"]
+    df_res = df_res.assign(fim=_fim_das_reservas(df_res, df_taxas, data_fim))
+    partes = [_calcular_bloco(bloco, df_mov[df_mov["reserva_id"].isin(bloco["id"])], df_taxas, data_fim)
+              for bloco in _blocos(df_res, data_fim)]
+    partes = [p for p in partes if not p.empty]
+    if not partes:
+        return pd.DataFrame(columns=colunas)
+    return pd.concat(partes, ignore_index=True)
+
+
+def _calcular_bloco(df_res, df_mov, df_taxas, data_fim):
+    colunas = ["user_id", "reserva_id", "data", "valor", "descricao"]
+    dias = pd.date_range(df_res["inicio"].min(), pd.Timestamp(data_fim), freq="D")
+    r = _matriz_taxas(df_res, df_taxas, dias)
+
+    fluxos = (
+        df_mov.pivot_table(index="reserva_id", columns="data", values="valor", aggfunc="sum")
+        .reindex(index=df_res["id"], columns=dias).fillna(0.0).to_numpy()
+    )
+    s0 = df_res["saldo_inicial"].to_numpy()[:, None]
+
+    p = np.cumprod(1 + r, axis=1)
+    saldo = p * (s0 + np.cumsum(fluxos / p, axis=1))
+    saldo_anterior = np.hstack([s0, saldo[:, :-1]])
+    rendimento = np.round(np.clip(saldo_anterior, 0, None) * r, 2)
+
+    linhas, cols = np.nonzero(rendimento >= 0.01)
+    if len(linhas) == 0:
+        return pd.DataFrame(columns=colunas)
+
+    res = df_res.iloc[linhas]
+    descricao = "Rendimento automático (" + res["indice"] + " " + res["taxa"].map("{:g}".format) + ")"
+    return pd.DataFrame({
+        "user_id": res["user_id"].to_numpy(),
+        "reserva_id": res["id"].to_numpy(),
+        "data": dias[cols].date,
+        "valor": rendimento[linhas, cols],
+        "descricao": descricao.to_numpy(),
+    })
+
+# ==============================================================================
+# 🚀 EXECUÇÃO
+# ==============================================================================
+
+def aplicar_rendimentos(data_fim=None, data_inicio=None, user_id=None, provedor=None):
+    """
+    Lança os rendimentos de todas as reservas indexadas (ou só do `user_id`) até `data_fim`
+    (padrão: ontem), cada uma limitada ao último dia com taxa publicada do seu índice.
+    Reservas que nunca renderam automaticamente começam em `data_inicio` (padrão: `data_fim`).
+    """
+    data_fim = data_fim or date.today() - timedelta(days=1)
+    data_inicio = data_inicio or data_fim
+    provedor = provedor or ProvedorBCB()
+
+    df_res, df_mov = carregar_base_rendimentos(data_inicio, data_fim, INDICES_AUTOMATICOS, user_id)
+    if df_res.empty:
+        return {"reservas": 0, "lancamentos": 0, "total": 0.0}
+
+    inicio = df_res["inicio"].min().date()
+    indices = df_res["indice"].unique().tolist()
+    sincronizar_taxas(provedor, indices, inicio, data_fim)
+    df_taxas = carregar_taxas_indices(indices, inicio, data_fim)
+
+    df_rend = calcular_rendimentos(df_res, df_mov, df_taxas, data_fim)
+    inseridos = gravar_rendimentos(df_rend)
+    return {"reservas": len(df_res), "lancamentos": inseridos, "total": float(df_rend["valor"].sum())}
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Lança os rendimentos automáticos das reservas.")
+    parser.add_argument("--ate", type=date.fromisoformat, help="Último dia a render (padrão: ontem)")
+    parser.add_argument("--desde", type=date.fromisoformat, help="Início para reservas sem rendimento automático")
+    parser.add_argument("--user-id", type=int)
+    parser.add_argument("--falso", action="store_true", help="Usa taxas constantes em vez do BCB")
+    args = parser.parse_args()
+
+    resultado = aplicar_rendimentos(
+        args.ate, args.desde, args.user_id, ProvedorFalso() if args.falso else None
+    )
+    print(f"{resultado['lancamentos']} rendimento(s) lançados em {resultado['reservas']} reserva(s) - R$ {resultado['total']:,.2f}")
@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+import streamlit as st
+from modules.config import obter_config
+
+# ==============================================================================
+# 🔑 SENHAS (BCRYPT FORA DA THREAD DO SCRIPT)
+# ==============================================================================
+# O bcrypt roda num pool pequeno e limitado: num pico de logins no máximo
+# BCRYPT_WORKERS hashes rodam ao mesmo tempo e o resto da CPU continua livre
+# para as reexecuções dos outros usuários. O custo (rounds) é configurável
+# e hashes com custo diferente são refeitos no próximo login.
+# Tentativas de login passam por um balde de fichas por usuário e por IP.
+# O IP é o da conexão; atrás de proxy reverso, defina PROXIES_CONFIAVEIS com
+# quantos proxies (seus) há na frente do app para ler o X-Forwarded-For.
+
+CUSTO_PADRAO = 12
+ALVO_VERIFICACAO_MS = 250
+
+# Balde de fichas: até 5 tentativas seguidas por usuário, repõe 1 a cada 12 s (5 por minuto).
+# Por IP o balde é maior (vários usuários atrás do mesmo NAT).
+CAPACIDADE_BALDE = 5
+REPOSICAO_POR_SEGUNDO = 1 / 12
+CAPACIDADE_BALDE_IP = 30
+REPOSICAO_POR_SEGUNDO_IP = 1 / 2
+# Baldes mantidos em memória por limitador; acima disso sai o usado há mais tempo
+MAX_BALDES = 10_000
+
+
+def custo_configurado():
+    return int(obter_config("BCRYPT_ROUNDS", CUSTO_PADRAO))
+
+
+@st.cache_resource(show_spinner=False)
+def _pool():
+    return ThreadPoolExecutor(max_workers=int(obter_config("BCRYPT_WORKERS", 2)), thread_name_prefix="bcrypt")
+
+
+def gerar_hash(senha, custo=None):
+    custo = custo or custo_configurado()
+    futuro = _pool().submit(bcrypt.hashpw, senha.encode("utf-8"), bcrypt.gensalt(rounds=custo))
+    return futuro.result().decode("utf-8")
+
+
+def verificar_senha(senha, hash_armazenado):
+    futuro = _pool().submit(bcrypt.checkpw, senha.encode("utf-8"), hash_armazenado.encode("utf-8"))
+    return futuro.result()
+
+
+def custo_do_hash(hash_armazenado):
+    """Extrai o custo de um hash no formato $2b$12$..."""
+    try:
+        return int(hash_armazenado.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def precisa_rehash(hash_armazenado):
+    return custo_do_hash(hash_armazenado) != custo_configurado()
+
+
+def calibrar_custo(alvo_ms=ALVO_VERIFICACAO_MS, minimo=10, maximo=16):
+    """
+    Mede o bcrypt nesta máquina e retorna o maior custo cuja verificação fica
+    dentro de `alvo_ms`. Cada round dobra o tempo, então mede um custo e projeta.
+    Retorna (custo, {custo: ms medido/projetado}).
+    """
+    senha = b"calibracao"
+    hash_min = bcrypt.hashpw(senha, bcrypt.gensalt(rounds=minimo))
+    inicio = time.perf_counter()
+    bcrypt.checkpw(senha, hash_min)
+    base_ms = (time.perf_counter() - inicio) * 1000
+
+    tempos = {c: base_ms * 2 ** (c - minimo) for c in range(minimo, maximo + 1)}
+    dentro = [c for c, ms in tempos.items() if ms <= alvo_ms]
+    return (max(dentro) if dentro else minimo), tempos
+
+# ==============================================================================
+# 🚦 LIMITE DE TENTATIVAS
+# ==============================================================================
+
+class BaldeFichas:
+    """Token bucket por chave, seguro entre threads (um por processo), com no máximo `max_baldes` chaves (LRU)."""
+    def __init__(self, capacidade=CAPACIDADE_BALDE, reposicao=REPOSICAO_POR_SEGUNDO, max_baldes=MAX_BALDES):
+        self.capacidade = capacidade
+        self.reposicao = reposicao
+        self.max_baldes = max_baldes
+        self.baldes = OrderedDict()
+        self.trava = threading.Lock()
+
+    def consumir(self, chave):
+        agora = time.monotonic()
+        with self.trava:
+            fichas, ultimo = self.baldes.get(chave, (self.capacidade, agora))
+            fichas = min(self.capacidade, fichas + (agora - ultimo) * self.reposicao)
+            permitido = fichas >= 1
+            self.baldes[chave] = (fichas - 1 if permitido else fichas, agora)
+            self.baldes.move_to_end(chave)
+            # O balde parado há mais tempo é o que mais provavelmente já se encheu de novo
+            while len(self.baldes) > self.max_baldes:
+                self.baldes.popitem(last=False)
+            return permitido
+
+
+@st.cache_resource(show_spinner=False)
+def _baldes():
+    return BaldeFichas(), BaldeFichas(CAPACIDADE_BALDE_IP, REPOSICAO_POR_SEGUNDO_IP)
+
+
+def ip_cliente():
+    """
+    IP do navegador: o da conexão ou, com PROXIES_CONFIAVEIS=N, o N-ésimo valor do
+    X-Forwarded-For a partir da direita. Os valores mais à esquerda vêm do próprio
+    cliente e podem ser forjados a cada requisição.
+    """
+    proxies = int(obter_config("PROXIES_CONFIAVEIS", 0))
+    if proxies > 0:
+        encaminhado = [ip.strip() for ip in (st.context.headers.get("X-Forwarded-For") or "").split(",")]
+        encaminhado = [ip for ip in encaminhado if ip]
+        if len(encaminhado) >= proxies:
+            return encaminhado[-proxies]
+    return getattr(st.context, "ip_address", None) or "desconhecido"
+
+
+def permitir_tentativa(username):
+    """Consome uma ficha do usuário e do IP; False se algum dos dois estiver esgotado."""
+    por_usuario, por_ip = _baldes()
+    ok_usuario = por_usuario.consumir((username or "").strip().lower())
+    ok_ip = por_ip.consumir(ip_cliente())
+    return ok_usuario and ok_ip
+
+
+if __name__ == "__main__":
+    custo, tempos = calibrar_custo()
+    for c, ms in tempos.items():
+        print(f"custo {c:>2}: {ms:8.1f} ms{'  <- recomendado' if c == custo else ''}")
+    print(f"\nDefina BCRYPT_ROUNDS={custo} (alvo {ALVO_VERIFICACAO_MS} ms por verificação).")
@@ -0,0 +1,81 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+import uuid
+from modules.config import obter_config
+
+# ==============================================================================
+# 🔏 SESSÕES ASSINADAS (SEM CONSULTA AO BANCO)
+# ==============================================================================
+# Token = base64url(payload JSON) + "." + base64url(HMAC-SHA256 do payload).
+# O payload carrega id, nome, usuário, expiração e um jti (id único do token),
+# então validar é só recalcular o HMAC em memória. O logout grava o jti na
+# tabela `sessoes_revogadas`, lida com cache em database.carregar_revogacoes.
+#
+# Ativado com SESSION_MODE = "assinado" e um SESSION_SECRET (env ou secrets).
+
+PREFIXO = "v1"
+
+
+def _b64(dados: bytes) -> str:
+    return base64.urlsafe_b64encode(dados).rstrip(b"=").decode("ascii")
+
+
+def _b64_decodificar(texto: str) -> bytes:
+    return base64.urlsafe_b64decode(texto + "=" * (-len(texto) % 4))
+
+
+def _segredo():
+    segredo = obter_config("SESSION_SECRET")
+    return segredo.encode("utf-8") if segredo else None
+
+
+def modo_assinado():
+    """True quando o modo de sessão assinada está configurado (modo + segredo)."""
+    return str(obter_config("SESSION_MODE", "banco")).lower() == "assinado" and _segredo() is not None
+
+
+def eh_token_assinado(token):
+    return isinstance(token, str) and token.startswith(PREFIXO + ".")
+
+
+def _assinar(corpo: str, segredo: bytes) -> str:
+    return _b64(hmac.new(segredo, corpo.encode("ascii"), hashlib.sha256).digest())
+
+
+def gerar_token(user_id, name, username, expires):
+    """Gera um token assinado válido até `expires` (datetime). Retorna (token, jti)."""
+    segredo = _segredo()
+    if segredo is None:
+        raise RuntimeError("SESSION_SECRET não configurado.")
+    jti = uuid.uuid4().hex
+    payload = {"uid": user_id, "name": name, "usr": username, "exp": int(expires.timestamp()), "jti": jti}
+    corpo = _b64(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+    return f"{PREFIXO}.{corpo}.{_assinar(corpo, segredo)}", jti
+
+
+def ler_token(token):
+    """
+    Confere assinatura e expiração. Retorna o payload (dict) ou None.
+    Não consulta revogações: isso fica com quem chama.
+    """
+    segredo = _segredo()
+    if segredo is None or not eh_token_assinado(token):
+        return None
+    try:
+        _, corpo, assinatura = token.split(".")
+        # Cookie vem do navegador: texto não ASCII é só um token inválido
+        valida = hmac.compare_digest(assinatura.encode("utf-8"), _assinar(corpo, segredo).encode("ascii"))
+    except (UnicodeError, ValueError, TypeError):
+        return None
+    if not valida:
+        return None
+    try:
+        payload = json.loads(_b64_decodificar(corpo))
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if payload.get("exp", 0) <= time.time():
+        return None
+    return payload
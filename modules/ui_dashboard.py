@@ -4,6 +4,8 @@ import plotly.graph_objects as go
 import pandas as pd
 from datetime import datetime
 from modules.database import carregar_dados, carregar_reservas
+from modules.rastreamento import span
+from modules.calculos import preparar_dados_pizza_detalhada
 
 # ==============================================================================
 # 🎛️ PAINEL DE CONTROLE (CONFIGURAÇÕES DE UI & DESIGN)
@@ -86,44 +88,6 @@ MAPA_CORES_PLOTLY = {
 # 🛠️ FUNÇÕES AUXILIARES DE DESIGN E DADOS
 # ==============================================================================
 
-def preparar_dados_pizza_detalhada(df_filtrado, tipo_filtro='Despesa'):
-    """
-    Gera um dataframe pronto para o gráfico de pizza, incluindo
-    uma string HTML com as top subcategorias para o tooltip.
-    """
-    # 1. Filtra pelo tipo (ex: Despesa)
-    df_f = df_filtrado[df_filtrado['tipo'] == tipo_filtro].copy()
-    
-    if df_f.empty: return pd.DataFrame()
-
-    # 2. Agrupa por Categoria para o gráfico principal
-    df_cat = df_f.groupby('categoria')['valor'].sum().reset_index()
-    
-    # 3. Lógica para criar o texto do tooltip (Subcategorias)
-    lista_tooltips = []
-    
-    for cat in df_cat['categoria']:
-        # Pega as subcategorias desta categoria
-        df_sub = df_f[df_f['categoria'] == cat]
-        total_cat = df_sub['valor'].sum()
-        
-        # Agrupa subcategorias, ordena e pega top 5
-        sub_group = df_sub.groupby('subcategoria')['valor'].sum().reset_index()
-        sub_group = sub_group.sort_values('valor', ascending=False).head(5)
-        
-        # Monta HTML
-        html_tooltip = ""
-        for _, row in sub_group.iterrows():
-            pct = (row['valor'] / total_cat) * 100
-            # Se a subcategoria for vazia/nula, chama de "Geral"
-            nome_sub = row['subcategoria'] if row['subcategoria'] else "Geral"
-            html_tooltip += f"• {nome_sub}: R$ {row['valor']:,.2f} ({pct:.0f}%)<br>"
-            
-        lista_tooltips.append(html_tooltip)
-        
-    df_cat['info_extra'] = lista_tooltips
-    return df_cat
-
 def aplicar_estilo_tabela(df):
     """
     Aplica cores de fundo na coluna Valor baseada no Tipo (Receita/Despesa).
@@ -148,7 +112,7 @@ def aplicar_estilo_tabela(df):
     colunas_ordem = ['data', 'tipo', 'categoria', 'descricao', 'conta', 'valor']
     # Garante que as colunas existem antes de selecionar
     cols_existentes = [c for c in colunas_ordem if c in df.columns]
-    df_final = df[cols_existentes].copy()
+    df_final = df[cols_existentes]
     
     # Renomeia para exibição (usando Config)
     mapa_nomes = {
@@ -187,11 +151,9 @@ def show_dashboard():
         st.info("Adicione lançamentos para ver o dashboard.")
         return
 
-    # Processamento Inicial
-    df['data'] = pd.to_datetime(df['data'])
-    df['Mes'] = df['data'].dt.month
-    df['Ano'] = df['data'].dt.year
-    df['Dia'] = df['data'].dt.day
+    # Processamento Inicial (data, ano e mês já vêm tipados do loader)
+    with span("preparar dados", "pandas", linhas=len(df)):
+        df = df.rename(columns={'ano': 'Ano', 'mes': 'Mes'}).assign(Dia=df['data'].dt.day)
     
     tab_total, tab_anual, tab_mensal = st.tabs(["🌎 Visão Total (Acumulado)", "📅 Visão Anual", "📆 Visão Mensal"])
 
@@ -216,26 +178,27 @@ def show_dashboard():
 
         st.markdown(f"### 📉 {CONFIG_UI['VISAO_TOTAL']['titulo_grafico']}")
         
-        df_tempo = df.groupby(['Ano', 'Mes', 'tipo'])['valor'].sum().reset_index()
-        df_tempo['Data_Ref'] = pd.to_datetime(df_tempo['Ano'].astype(str) + '-' + df_tempo['Mes'].astype(str) + '-01')
-        df_tempo = df_tempo.sort_values('Data_Ref')
+        with span("grafico evolucao", "plotly"):
+            df_tempo = df.groupby(['Ano', 'Mes', 'tipo'], observed=True)['valor'].sum().reset_index()
+            df_tempo['Data_Ref'] = pd.to_datetime(df_tempo['Ano'].astype(str) + '-' + df_tempo['Mes'].astype(str) + '-01')
+            df_tempo = df_tempo.sort_values('Data_Ref')
         
-        fig_evolucao = px.line(
-            df_tempo, x='Data_Ref', y='valor', color='tipo',
-            category_orders={"tipo": ["Receita", "Despesa"]},
-            color_discrete_map=MAPA_CORES_PLOTLY, line_shape='spline', render_mode='svg'
-        )
-        fig_evolucao.update_traces(fill='tozeroy', mode='lines', line=dict(width=3), opacity=0.7)
-        # Tooltip limpo para o gráfico de linhas
-        fig_evolucao.update_traces(hovertemplate='%{x|%b/%Y}<br><b>%{y:,.2f}</b><extra></extra>')
+            fig_evolucao = px.line(
+                df_tempo, x='Data_Ref', y='valor', color='tipo',
+                category_orders={"tipo": ["Receita", "Despesa"]},
+                color_discrete_map=MAPA_CORES_PLOTLY, line_shape='spline', render_mode='svg'
+            )
+            fig_evolucao.update_traces(fill='tozeroy', mode='lines', line=dict(width=3), opacity=0.7)
+            # Tooltip limpo para o gráfico de linhas
+            fig_evolucao.update_traces(hovertemplate='%{x|%b/%Y}<br><b>%{y:,.2f}</b><extra></extra>')
 
-        fig_evolucao.update_layout(
-            template="plotly_dark", paper_bgcolor=CORES["fundo_transparente"], plot_bgcolor=CORES["fundo_transparente"],
-            xaxis=dict(showgrid=False, title=CONFIG_UI['VISAO_TOTAL']['eixo_x'], linecolor="#333"),
-            yaxis=dict(showgrid=True, gridcolor=CORES["grid_color"], title=CONFIG_UI['VISAO_TOTAL']['eixo_y'], tickprefix="R$ "),
-            legend=dict(orientation="h", y=1.02, x=1, title=None), margin=dict(t=30)
-        )
-        st.plotly_chart(fig_evolucao, use_container_width=True)
+            fig_evolucao.update_layout(
+                template="plotly_dark", paper_bgcolor=CORES["fundo_transparente"], plot_bgcolor=CORES["fundo_transparente"],
+                xaxis=dict(showgrid=False, title=CONFIG_UI['VISAO_TOTAL']['eixo_x'], linecolor="#333"),
+                yaxis=dict(showgrid=True, gridcolor=CORES["grid_color"], title=CONFIG_UI['VISAO_TOTAL']['eixo_y'], tickprefix="R$ "),
+                legend=dict(orientation="h", y=1.02, x=1, title=None), margin=dict(t=30)
+            )
+            st.plotly_chart(fig_evolucao, use_container_width=True)
 
     # ===================================================
     # ABA 2: VISÃO ANUAL (ATUALIZADA)
@@ -262,56 +225,58 @@ def show_dashboard():
             
             # --- GRÁFICO DE BARRAS (Fluxo Mensal) ---
             with g1:
-                df_barras = df_ano.groupby(['Mes', 'tipo'])['valor'].sum().reset_index()
-                mapa_mes = {1:'Jan', 2:'Fev', 3:'Mar', 4:'Abr', 5:'Mai', 6:'Jun', 7:'Jul', 8:'Ago', 9:'Set', 10:'Out', 11:'Nov', 12:'Dez'}
-                df_barras['NomeMes'] = df_barras['Mes'].map(mapa_mes)
+                with span("grafico fluxo anual", "plotly"):
+                    df_barras = df_ano.groupby(['Mes', 'tipo'], observed=True)['valor'].sum().reset_index()
+                    mapa_mes = {1:'Jan', 2:'Fev', 3:'Mar', 4:'Abr', 5:'Mai', 6:'Jun', 7:'Jul', 8:'Ago', 9:'Set', 10:'Out', 11:'Nov', 12:'Dez'}
+                    df_barras['NomeMes'] = df_barras['Mes'].map(mapa_mes)
                 
-                fig_bar = px.bar(
-                    df_barras, x='NomeMes', y='valor', color='tipo', barmode='group',
-                    title=f"{CONFIG_UI['VISAO_ANUAL']['titulo_barras']} ({sel_ano})",
-                    color_discrete_map=MAPA_CORES_PLOTLY, template="plotly_dark",
-                    category_orders={"NomeMes": list(mapa_mes.values())}
-                )
+                    fig_bar = px.bar(
+                        df_barras, x='NomeMes', y='valor', color='tipo', barmode='group',
+                        title=f"{CONFIG_UI['VISAO_ANUAL']['titulo_barras']} ({sel_ano})",
+                        color_discrete_map=MAPA_CORES_PLOTLY, template="plotly_dark",
+                        category_orders={"NomeMes": list(mapa_mes.values())}
+                    )
                 
-                # Tooltip Limpo: "Tipo: R$ Valor"
-                fig_bar.update_traces(hovertemplate='<b>%{data.name}</b><br>R$ %{y:,.2f}<extra></extra>')
+                    # Tooltip Limpo: "Tipo: R$ Valor"
+                    fig_bar.update_traces(hovertemplate='<b>%{data.name}</b><br>R$ %{y:,.2f}<extra></extra>')
                 
-                fig_bar.update_layout(
-                    paper_bgcolor=CORES["fundo_transparente"], plot_bgcolor=CORES["fundo_transparente"],
-                    xaxis_title=CONFIG_UI['VISAO_ANUAL']['label_eixo_x'],
-                    yaxis_title=CONFIG_UI['VISAO_ANUAL']['label_eixo_y'],
-                    legend=dict(title=None, orientation="h")
-                )
-                st.plotly_chart(fig_bar, use_container_width=True)
+                    fig_bar.update_layout(
+                        paper_bgcolor=CORES["fundo_transparente"], plot_bgcolor=CORES["fundo_transparente"],
+                        xaxis_title=CONFIG_UI['VISAO_ANUAL']['label_eixo_x'],
+                        yaxis_title=CONFIG_UI['VISAO_ANUAL']['label_eixo_y'],
+                        legend=dict(title=None, orientation="h")
+                    )
+                    st.plotly_chart(fig_bar, use_container_width=True)
             
             # --- GRÁFICO DE PIZZA (Com Detalhes e Cores Customizadas) ---
             with g2:
-                df_pizza = preparar_dados_pizza_detalhada(df_ano, 'Despesa')
+                with span("grafico pizza anual", "plotly"):
+                    df_pizza = preparar_dados_pizza_detalhada(df_ano, 'Despesa')
                 
-                if not df_pizza.empty:
-                    # GERA LISTA DE CORES NA ORDEM DOS DADOS
-                    # Se a categoria não estiver no dicionário, usa cinza (hsl(0,0,50%))
-                    lista_cores = [CORES_CATEGORIAS.get(cat, "hsl(0, 0%, 50%)") for cat in df_pizza['categoria']]
+                    if not df_pizza.empty:
+                        # GERA LISTA DE CORES NA ORDEM DOS DADOS
+                        # Se a categoria não estiver no dicionário, usa cinza (hsl(0,0,50%))
+                        lista_cores = [CORES_CATEGORIAS.get(cat, "hsl(0, 0%, 50%)") for cat in df_pizza['categoria']]
 
-                    fig_pie = go.Figure(data=[go.Pie(
-                        labels=df_pizza['categoria'],
-                        values=df_pizza['valor'],
-                        hole=0.4,
-                        customdata=df_pizza['info_extra'],
-                        hovertemplate="<b>%{label}</b><br>Total: R$ %{value:,.2f} (%{percent})<br><br><b>Top Detalhes:</b><br>%{customdata}<extra></extra>",
+                        fig_pie = go.Figure(data=[go.Pie(
+                            labels=df_pizza['categoria'],
+                            values=df_pizza['valor'],
+                            hole=0.4,
+                            customdata=df_pizza['info_extra'],
+                            hovertemplate="<b>%{label}</b><br>Total: R$ %{value:,.2f} (%{percent})<br><br><b>Top Detalhes:</b><br>%{customdata}<extra></extra>",
                         
-                        # AQUI ESTA A MUDANÇA: Usamos a lista_cores criada acima
-                        marker=dict(colors=lista_cores) 
-                    )])
+                            # AQUI ESTA A MUDANÇA: Usamos a lista_cores criada acima
+                            marker=dict(colors=lista_cores) 
+                        )])
                     
-                    fig_pie.update_layout(
-                        title=f"{CONFIG_UI['VISAO_ANUAL']['titulo_pizza']} ({sel_ano})",
-                        template="plotly_dark",
-                        paper_bgcolor=CORES["fundo_transparente"]
-                    )
-                    st.plotly_chart(fig_pie, use_container_width=True)
-                else:
-                    st.info("Sem despesas registradas.")
+                        fig_pie.update_layout(
+                            title=f"{CONFIG_UI['VISAO_ANUAL']['titulo_pizza']} ({sel_ano})",
+                            template="plotly_dark",
+                            paper_bgcolor=CORES["fundo_transparente"]
+                        )
+                        st.plotly_chart(fig_pie, use_container_width=True)
+                    else:
+                        st.info("Sem despesas registradas.")
 
     # ===================================================
     # ABA 3: VISÃO MENSAL (COM FILTRO DINÂMICO)
@@ -383,51 +348,54 @@ def show_dashboard():
                     
                     # --- GRÁFICO DIÁRIO ---
                     with gm1:
-                        df_dias = df_mes.groupby(['Dia', 'tipo'])['valor'].sum().reset_index()
-                        fig_bar_dia = px.bar(
-                            df_dias, x='Dia', y='valor', color='tipo', barmode='group',
-                            title=f"{CONFIG_UI['VISAO_MENSAL']['titulo_barras']} - {sel_mes_nome}",
-                            color_discrete_map=MAPA_CORES_PLOTLY, template="plotly_dark"
-                        )
-                        fig_bar_dia.update_traces(hovertemplate='Dia %{x}<br><b>%{data.name}</b>: R$ %{y:,.2f}<extra></extra>')
-                        fig_bar_dia.update_layout(
-                            paper_bgcolor=CORES["fundo_transparente"], plot_bgcolor=CORES["fundo_transparente"],
-                            xaxis_title=CONFIG_UI['VISAO_MENSAL']['label_eixo_x'],
-                            yaxis_title=CONFIG_UI['VISAO_MENSAL']['label_eixo_y'],
-                            legend=dict(title=None, orientation="h")
-                        )
-                        st.plotly_chart(fig_bar_dia, use_container_width=True)
+                        with span("grafico diario", "plotly"):
+                            df_dias = df_mes.groupby(['Dia', 'tipo'], observed=True)['valor'].sum().reset_index()
+                            fig_bar_dia = px.bar(
+                                df_dias, x='Dia', y='valor', color='tipo', barmode='group',
+                                title=f"{CONFIG_UI['VISAO_MENSAL']['titulo_barras']} - {sel_mes_nome}",
+                                color_discrete_map=MAPA_CORES_PLOTLY, template="plotly_dark"
+                            )
+                            fig_bar_dia.update_traces(hovertemplate='Dia %{x}<br><b>%{data.name}</b>: R$ %{y:,.2f}<extra></extra>')
+                            fig_bar_dia.update_layout(
+                                paper_bgcolor=CORES["fundo_transparente"], plot_bgcolor=CORES["fundo_transparente"],
+                                xaxis_title=CONFIG_UI['VISAO_MENSAL']['label_eixo_x'],
+                                yaxis_title=CONFIG_UI['VISAO_MENSAL']['label_eixo_y'],
+                                legend=dict(title=None, orientation="h")
+                            )
+                            st.plotly_chart(fig_bar_dia, use_container_width=True)
 
                     # --- PIZZA MENSAL ---
                     with gm2:
-                        df_pizza_mes = preparar_dados_pizza_detalhada(df_mes, 'Despesa')
-                        if not df_pizza_mes.empty:
-                            # GERA LISTA DE CORES
-                            lista_cores_m = [CORES_CATEGORIAS.get(cat, "hsl(0, 0%, 50%)") for cat in df_pizza_mes['categoria']]
+                        with span("grafico pizza mensal", "plotly"):
+                            df_pizza_mes = preparar_dados_pizza_detalhada(df_mes, 'Despesa')
+                            if not df_pizza_mes.empty:
+                                # GERA LISTA DE CORES
+                                lista_cores_m = [CORES_CATEGORIAS.get(cat, "hsl(0, 0%, 50%)") for cat in df_pizza_mes['categoria']]
 
-                            fig_pie_m = go.Figure(data=[go.Pie(
-                                labels=df_pizza_mes['categoria'],
-                                values=df_pizza_mes['valor'],
-                                hole=0.4,
-                                customdata=df_pizza_mes['info_extra'],
-                                hovertemplate="<b>%{label}</b><br>R$ %{value:,.2f} (%{percent})<br><br><b>Detalhes:</b><br>%{customdata}<extra></extra>",
+                                fig_pie_m = go.Figure(data=[go.Pie(
+                                    labels=df_pizza_mes['categoria'],
+                                    values=df_pizza_mes['valor'],
+                                    hole=0.4,
+                                    customdata=df_pizza_mes['info_extra'],
+                                    hovertemplate="<b>%{label}</b><br>R$ %{value:,.2f} (%{percent})<br><br><b>Detalhes:</b><br>%{customdata}<extra></extra>",
                                 
-                                # AQUI ESTA A MUDANÇA
-                                marker=dict(colors=lista_cores_m)
-                            )])
-                            fig_pie_m.update_layout(
-                                title=f"{CONFIG_UI['VISAO_MENSAL']['titulo_pizza']} - {sel_mes_nome}",
-                                template="plotly_dark", paper_bgcolor=CORES["fundo_transparente"]
-                            )
-                            st.plotly_chart(fig_pie_m, use_container_width=True)
-                        else:
-                            st.info("Sem despesas.")
+                                    # AQUI ESTA A MUDANÇA
+                                    marker=dict(colors=lista_cores_m)
+                                )])
+                                fig_pie_m.update_layout(
+                                    title=f"{CONFIG_UI['VISAO_MENSAL']['titulo_pizza']} - {sel_mes_nome}",
+                                    template="plotly_dark", paper_bgcolor=CORES["fundo_transparente"]
+                                )
+                                st.plotly_chart(fig_pie_m, use_container_width=True)
+                            else:
+                                st.info("Sem despesas.")
                     
                     st.markdown("### 📋 Lançamentos Detalhados")
                     
                     # --- TABELA ESTILIZADA ---
                     # Prepara o Styler (Cores) e o Mapa de Nomes
-                    styler_tabela, mapa_nomes = aplicar_estilo_tabela(df_mes)
+                    with span("estilizar tabela", "pandas"):
+                        styler_tabela, mapa_nomes = aplicar_estilo_tabela(df_mes)
                     
                     st.dataframe(
                         styler_tabela,
@@ -6,6 +6,7 @@ from modules.database import (
     salvar_lancamento, atualizar_recorrencia, carregar_dados
 )
 from modules.constants import LISTA_CATEGORIAS_DESPESA
+from modules.calculos import descricoes_do_mes, recorrencia_quitada
 
 # ==============================================================================
 # 🎛️ PAINEL DE CONTROLE (CONFIGURAÇÕES DE UI & DESIGN)
@@ -65,7 +66,7 @@ def show_despesas_fixas():
     
     # Carrega recorrencias e filtra
     df_all = carregar_recorrencias(user_id)
-    df_fixas = df_all[df_all['tipo'] == 'Despesa'].copy() if not df_all.empty else pd.DataFrame()
+    df_fixas = df_all[df_all['tipo'] == 'Despesa'] if not df_all.empty else pd.DataFrame()
 
     # ===================================================
     # ABA 1: CONTROLE (MÊS ATUAL)
@@ -81,20 +82,13 @@ def show_despesas_fixas():
             st.subheader(f"Vencimentos: {mes_atual}/{ano_atual}")
             
             # Verifica pagamentos feitos no mês
-            df_lancamentos = carregar_dados(user_id)
-            itens_pagos = []
-            if not df_lancamentos.empty:
-                df_lancamentos['data'] = pd.to_datetime(df_lancamentos['data'])
-                mask = (df_lancamentos['data'].dt.month == mes_atual) & \
-                       (df_lancamentos['data'].dt.year == ano_atual) & \
-                       (df_lancamentos['tipo'] == "Despesa")
-                itens_pagos = df_lancamentos[mask]['descricao'].tolist()
+            itens_pagos = descricoes_do_mes(carregar_dados(user_id), "Despesa", mes_atual, ano_atual)
 
             # Prepara dados visuais
             status_list = []
             for _, row in df_fixas.iterrows():
                 # Lógica de "Está pago?": Verifica se o nome da fixa está contido na descrição do lançamento
-                foi_pago = any(row['nome'] in item for item in itens_pagos)
+                foi_pago = recorrencia_quitada(row['nome'], itens_pagos)
                 
                 status_cod = "pendente"
                 if foi_pago:
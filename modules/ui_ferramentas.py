@@ -2,11 +2,14 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import numpy as np
+from modules.database import TABELAS_EXPORTACAO
+from modules.exportador import FORMATOS, conteudo_para_download, gerar_exportacao, limite_download_mb
+from modules.calculos import simular_fire, simular_sac
 
 def show_ferramentas():
     st.header("🧰 Ferramentas Financeiras")
     
-    tab_fire, tab_finan = st.tabs(["🔥 Simulador FIRE", "🏠 Calculadora Financiamento"])
+    tab_fire, tab_finan, tab_export = st.tabs(["🔥 Simulador FIRE", "🏠 Calculadora Financiamento", "📦 Exportar Dados"])
 
     # --- SIMULADOR FIRE (Independência Financeira) ---
     with tab_fire:
@@ -30,17 +33,8 @@ def show_ferramentas():
         if st.button("Simular Futuro", type="primary"):
             st.metric("Seu Número Mágico (Meta)", f"R$ {numero_magico:,.2f}")
             
-            saldo = patrimonio_atual
-            meses = 0
-            dados_grafico = []
-            
             # Projeção de até 50 anos
-            while saldo < numero_magico and meses < 600:
-                rendimento = saldo * taxa_mensal
-                saldo += rendimento + aporte_mensal
-                meses += 1
-                if meses % 12 == 0: # Grava ano a ano p/ grafico nao ficar pesado
-                    dados_grafico.append({"Ano": meses/12, "Saldo": saldo, "Meta": numero_magico})
+            saldo, meses, dados_grafico = simular_fire(patrimonio_atual, aporte_mensal, numero_magico, taxa_mensal)
             
             anos = meses / 12
             if saldo >= numero_magico:
@@ -63,42 +57,39 @@ def show_ferramentas():
         amort_extra = st.number_input("Amortização Extra Mensal (Opcional)", value=0.0)
         
         if st.button("Calcular Economia"):
-            meses = prazo_anos * 12
-            taxa_mensal = (juros_anual / 100) / 12
-            amortizacao_fixa = val_divida / meses
-            
-            saldo_devedor = val_divida
-            total_pago = 0
-            total_juros = 0
-            evolucao = []
-            
-            mes_atual = 1
-            while saldo_devedor > 0:
-                juros = saldo_devedor * taxa_mensal
-                parcela = amortizacao_fixa + juros
-                
-                # Abate parcela normal
-                saldo_devedor -= amortizacao_fixa
-                total_pago += parcela
-                total_juros += juros
-                
-                # Amortização Extra
-                if amort_extra > 0 and saldo_devedor > 0:
-                    abatimento = min(amort_extra, saldo_devedor)
-                    saldo_devedor -= abatimento
-                    total_pago += abatimento
-                
-                evolucao.append({"Mês": mes_atual, "Saldo Devedor": max(0, saldo_devedor)})
-                mes_atual += 1
-                
-                if saldo_devedor <= 0: break
-            
-            tempo_reduzido = (prazo_anos * 12) - (mes_atual - 1)
+            sac = simular_sac(val_divida, prazo_anos * 12, juros_anual, amort_extra)
+            tempo_reduzido = (prazo_anos * 12) - sac["meses"]
             
             col_a, col_b = st.columns(2)
-            col_a.metric("Total Pago", f"R$ {total_pago:,.2f}")
-            col_a.metric("Total Juros", f"R$ {total_juros:,.2f}")
-            col_b.metric("Tempo Total", f"{(mes_atual-1)/12:.1f} anos")
+            col_a.metric("Total Pago", f"R$ {sac['total_pago']:,.2f}")
+            col_a.metric("Total Juros", f"R$ {sac['total_juros']:,.2f}")
+            col_b.metric("Tempo Total", f"{sac['meses']/12:.1f} anos")
             if amort_extra > 0:
                 col_b.success(f"Você economizou {tempo_reduzido} meses pagando extra!")
-                
\ No newline at end of file
+
+    # --- EXPORTAÇÃO DO HISTÓRICO ---
+    with tab_export:
+        st.subheader("Exportar meu histórico financeiro")
+        st.caption("Gera um arquivo com todas as suas tabelas (lançamentos, cartões, investimentos, reservas, metas e recorrências).")
+
+        user_id = st.session_state.get('user_id')
+        if user_id is None:
+            return
+
+        c1, c2 = st.columns(2)
+        formato = c1.selectbox("Formato", FORMATOS)
+        tabela = None
+        if "tabela única" in formato:
+            tabela = c2.selectbox("Tabela", list(TABELAS_EXPORTACAO.keys()))
+
+        extensao = "csv" if formato.startswith("CSV") else "parquet" if formato.startswith("Parquet") else "zip"
+        nome_arquivo = f"{tabela or 'financas'}.{extensao}"
+
+        # Gerado só no clique (em outra thread), direto em disco; a entrega passa pela
+        # memória do Streamlit, daí o limite de tamanho
+        def gerar():
+            arquivo, _, _ = gerar_exportacao(user_id, formato, tabela)
+            return conteudo_para_download(arquivo)
+
+        st.download_button("⬇️ Gerar e Baixar", data=gerar, file_name=nome_arquivo, type="primary")
+        st.caption(f"Limite de {limite_download_mb():.0f} MB por arquivo; contas maiores podem exportar por tabela ou em Parquet.")
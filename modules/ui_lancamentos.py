@@ -1,8 +1,9 @@
 import streamlit as st
 from datetime import datetime
 import pandas as pd
-from modules.database import salvar_lancamento, carregar_dados, excluir_lancamento, atualizar_lancamento
+from modules.database import salvar_lancamento, carregar_dados, excluir_lancamento, atualizar_lancamento, importar_lancamentos
 from modules.constants import CATEGORIAS
+from modules.importador import preparar_lotes
 
 # ==============================================================================
 # 🎛️ PAINEL DE CONTROLE
@@ -12,6 +13,7 @@ CONFIG_UI = {
     "GERAL": {
         "titulo_aba_novo": "➕ Novo Lançamento",
         "titulo_aba_gerenciar": "🔍 Gerenciar e Editar",
+        "titulo_aba_importar": "📥 Importar Extrato",
         "header_novo": "📝 Registrar Movimentação",
     },
     "TABELA": {
@@ -54,15 +56,80 @@ def aplicar_estilo(df):
     
     return df.style.apply(colorir, axis=1).format({'valor': "R$ {:,.2f}", 'data': "{:%d/%m/%Y}"})
 
+def show_importacao(user_id):
+    st.header("Importar Extrato Bancário")
+    st.caption("Aceita CSV (planilha/exportação do banco com colunas Data, Descrição e Valor) ou OFX. "
+               "Linhas já importadas antes são ignoradas automaticamente.")
+
+    arquivo = st.file_uploader("Arquivo do extrato", type=["csv", "ofx", "txt"], key="imp_arquivo")
+
+    st.markdown("**Valores padrão** (usados quando o extrato não traz a informação)")
+    c1, c2, c3 = st.columns(3)
+    conta = c1.selectbox("Conta", LISTA_CONTAS, key="imp_conta")
+    forma = c2.selectbox("Forma Pagto", LISTA_FORMAS, key="imp_forma")
+    status = c3.selectbox("Status", LISTA_STATUS, key="imp_stat")
+
+    c4, c5, c6, c7 = st.columns(4)
+    cat_desp = c4.selectbox("Categoria (Despesas)", list(CATEGORIAS["Despesa"].keys()), key="imp_cat_d")
+    sub_desp = c5.selectbox("Subcategoria (Despesas)", CATEGORIAS["Despesa"][cat_desp], key="imp_sub_d")
+    cat_rec = c6.selectbox("Categoria (Receitas)", list(CATEGORIAS["Receita"].keys()), key="imp_cat_r")
+    sub_rec = c7.selectbox("Subcategoria (Receitas)", CATEGORIAS["Receita"][cat_rec], key="imp_sub_r")
+
+    if arquivo is None:
+        return
+
+    if st.button("📥 Importar", type="primary", use_container_width=True):
+        padroes = {
+            "conta": conta, "forma_pagamento": forma, "status": status,
+            "categorias": {"Despesa": cat_desp, "Receita": cat_rec},
+            "subcategorias": {cat_desp: sub_desp, cat_rec: sub_rec},
+        }
+        relatorio = {}
+        barra = st.progress(0.0, text="Lendo arquivo...")
+        tamanho = max(arquivo.size, 1)
+
+        def ao_progredir(parcial):
+            lidas = relatorio.get("lidas", 0)
+            barra.progress(min(arquivo.tell() / tamanho, 1.0), text=f"{lidas:,} linhas processadas...")
+
+        arquivo.seek(0)
+        lotes = preparar_lotes(arquivo, arquivo.name, padroes, relatorio)
+        try:
+            resultado = importar_lancamentos(user_id, lotes, ao_progredir)
+        except Exception as e:
+            barra.empty()
+            st.error(f"Falha na importação (nada foi gravado): {e}")
+            return
+        barra.progress(1.0, text="Concluído!")
+
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("Linhas lidas", f"{relatorio.get('lidas', 0):,}")
+        m2.metric("Importadas", f"{resultado['inseridas']:,}")
+        m3.metric("Duplicadas (ignoradas)", f"{resultado['duplicadas']:,}")
+        m4.metric("Rejeitadas", f"{relatorio.get('rejeitadas', 0):,}")
+
+        if relatorio.get("amostra_rejeitadas"):
+            with st.expander("⚠️ Linhas rejeitadas (amostra)"):
+                df_rej = pd.concat(relatorio["amostra_rejeitadas"]).head(100)
+                st.dataframe(df_rej, use_container_width=True, hide_index=True)
+
 def show_lancamentos():
     if 'user_id' not in st.session_state: return
     user_id = st.session_state['user_id']
 
-    tab_novo, tab_gerenciar = st.tabs([
+    tab_novo, tab_gerenciar, tab_importar = st.tabs([
         CONFIG_UI["GERAL"]["titulo_aba_novo"], 
-        CONFIG_UI["GERAL"]["titulo_aba_gerenciar"]
+        CONFIG_UI["GERAL"]["titulo_aba_gerenciar"],
+        CONFIG_UI["GERAL"]["titulo_aba_importar"]
     ])
 
+    # ===================================================
+    # ABA 3: IMPORTAR EXTRATO (CSV / OFX)
+    # (renderizada primeiro: a aba 2 encerra a função quando não há dados)
+    # ===================================================
+    with tab_importar:
+        show_importacao(user_id)
+
     # ===================================================
     # ABA 1: NOVO LANCAMENTO
     # ===================================================
@@ -117,8 +184,8 @@ def show_lancamentos():
                 df = df[df['tipo'] == f_tipo]
         
         # 2. Tabela de Seleção
-        # Adiciona coluna de seleção
-        df_view = df.copy()
+        # Adiciona coluna de seleção (visão rasa: o copy-on-write protege o frame do cache)
+        df_view = df.copy(deep=False)
         df_view.insert(0, "Selecionar", False)
         
         # Configuração das Colunas
@@ -132,7 +199,9 @@ def show_lancamentos():
             "descricao": st.column_config.TextColumn(CONFIG_UI["TABELA"]["col_desc"]),
             "conta": st.column_config.TextColumn(CONFIG_UI["TABELA"]["col_conta"]),
             "forma_pagamento": st.column_config.TextColumn(CONFIG_UI["TABELA"]["col_forma"]),
-            "status": st.column_config.TextColumn(CONFIG_UI["TABELA"]["col_status"])
+            "status": st.column_config.TextColumn(CONFIG_UI["TABELA"]["col_status"]),
+            # Colunas auxiliares do loader (não aparecem na tabela)
+            "ano": None, "mes": None
         }
         
         # Tabela (Data Editor usado apenas para selecionar a linha)
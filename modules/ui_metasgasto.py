@@ -110,18 +110,15 @@ def show_orcamento():
             # --- Carregamento de Dados ---
             df_metas = carregar_metas(user_id, mes=mes_sel, ano=ano_sel)
             df_lancamentos = carregar_dados(user_id)
-            
-            if not df_lancamentos.empty:
-                df_lancamentos['data'] = pd.to_datetime(df_lancamentos['data'])
 
             # Função auxiliar para calcular progresso
             def calcular_progresso(df_metas_filtrada, tipo_meta):
                 if df_metas_filtrada.empty: return pd.DataFrame()
 
                 # Filtra lançamentos pelo período
-                mask_periodo = (df_lancamentos['data'].dt.year == ano_sel)
+                mask_periodo = (df_lancamentos['ano'] == ano_sel)
                 if mes_sel != 0: # Se não for anual, filtra mês
-                    mask_periodo = mask_periodo & (df_lancamentos['data'].dt.month == mes_sel)
+                    mask_periodo = mask_periodo & (df_lancamentos['mes'] == mes_sel)
                 
                 df_periodo = df_lancamentos[mask_periodo]
 
@@ -134,7 +131,7 @@ def show_orcamento():
                     # Refina apenas pelas categorias que estão na lista de investimento
                     df_filtrado = df_filtrado[df_filtrado['categoria'].isin(LISTA_CATEGORIAS_INVESTIMENTO)]
 
-                gastos = df_filtrado.groupby('categoria')['valor'].sum().reset_index()
+                gastos = df_filtrado.groupby('categoria', observed=True)['valor'].sum().reset_index()
                 
                 merged = pd.merge(df_metas_filtrada, gastos, on='categoria', how='left')
                 merged['valor'] = merged['valor'].fillna(0)
@@ -152,7 +149,7 @@ def show_orcamento():
                 return merged
 
             # Identifica quais metas são de Investimento
-            df_metas['tipo_meta'] = df_metas['categoria'].apply(lambda x: 'Reserva' if x in LISTA_CATEGORIAS_INVESTIMENTO else 'Despesa')
+            df_metas = df_metas.assign(tipo_meta=df_metas['categoria'].apply(lambda x: 'Reserva' if x in LISTA_CATEGORIAS_INVESTIMENTO else 'Despesa'))
             
             metas_despesa = df_metas[df_metas['tipo_meta'] == 'Despesa']
             metas_reserva = df_metas[df_metas['tipo_meta'] == 'Reserva']
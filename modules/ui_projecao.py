@@ -1,13 +1,12 @@
 import streamlit as st
-import pandas as pd
 import plotly.graph_objects as go
-from datetime import date, timedelta
+from datetime import date
 from dateutil.relativedelta import relativedelta
-import calendar
 from modules.database import (
     calcular_saldo_atual, carregar_recorrencias, buscar_faturas_futuras, 
     buscar_metas_saldo_restante, carregar_metas
 )
+from modules.calculos import meses_com_provisao, simular_projecao
 
 # ==============================================================================
 # 🎛️ PAINEL DE CONTROLE (CONFIGURAÇÕES DE UI & DESIGN)
@@ -73,79 +72,25 @@ def show_projecao():
     df_fixas = carregar_recorrencias(user_id)
     df_faturas = buscar_faturas_futuras(user_id)
     
-    # --- MOTOR DE SIMULAÇÃO ---
-    timeline = []
-    saldo_corrente = float(saldo_atual)
-    data_cursor = date.today()
-    data_fim = data_cursor + relativedelta(months=meses_proj)
-
-    # Avança dia a dia
-    while data_cursor <= data_fim:
-        dia = data_cursor.day
-        mes = data_cursor.month
-        ano = data_cursor.year
-        
-        entradas = 0.0
-        saidas = 0.0
-        detalhes = []
-
-        # 1. Recorrências (Despesas Fixas / Receitas Fixas)
-        if not df_fixas.empty:
-            recs_do_dia = df_fixas[df_fixas['dia_vencimento'] == dia]
-            for _, row in recs_do_dia.iterrows():
-                val = float(row['valor'])
-                if row['tipo'] == 'Receita':
-                    entradas += val
-                    detalhes.append(f"Receita: {row['nome']}")
-                else:
-                    saidas += val
-                    detalhes.append(f"Fixo: {row['nome']}")
-
-        # 2. Faturas de Cartão
-        if not df_faturas.empty:
-            for _, fat in df_faturas.iterrows():
-                dt_fat = pd.to_datetime(fat['mes_fatura']).date()
-                dia_venc_card = int(fat['dia_vencimento'])
-                
-                if dt_fat.month == mes and dt_fat.year == ano and dia_venc_card == dia:
-                    val_fat = float(fat['total_fatura'])
-                    saidas += val_fat
-                    detalhes.append(f"Fatura Cartão: R$ {val_fat:.2f}")
-
-        # 3. Provisão de Metas
-        _, ultimo_dia = calendar.monthrange(ano, mes)
-        if usar_metas and dia == ultimo_dia:
-            if mes == date.today().month and ano == date.today().year:
+    # --- PROVISÃO DAS METAS (último dia de cada mês simulado) ---
+    hoje = date.today()
+    data_fim = hoje + relativedelta(months=meses_proj)
+    provisoes = {}
+    if usar_metas:
+        for ano, mes in meses_com_provisao(hoje, data_fim):
+            if mes == hoje.month and ano == hoje.year:
                 df_rest = buscar_metas_saldo_restante(user_id, mes, ano)
-                if not df_rest.empty:
-                    soma_restante = df_rest['restante'].sum()
-                    if soma_restante > 0:
-                        saidas += soma_restante
-                        detalhes.append(f"Provisão Metas (Restante Mês): R$ {soma_restante:.2f}")
-            elif data_cursor > date.today():
+                soma = df_rest['restante'].sum() if not df_rest.empty else 0
+                if soma > 0:
+                    provisoes[(ano, mes)] = (soma, f"Provisão Metas (Restante Mês): R$ {soma:.2f}")
+            else:
                 df_metas_futuras = carregar_metas(user_id, mes, ano)
-                if not df_metas_futuras.empty:
-                    soma_metas = df_metas_futuras['valor_meta'].sum()
-                    if soma_metas > 0:
-                        saidas += soma_metas
-                        detalhes.append(f"Provisão Metas (Orçamento Cheio): R$ {soma_metas:.2f}")
-
-        # Atualiza Saldo
-        saldo_corrente = saldo_corrente + entradas - saidas
-        
-        # Registra na timeline
-        if entradas != 0 or saidas != 0 or data_cursor == date.today() or data_cursor == data_fim:
-            timeline.append({
-                "Data": data_cursor,
-                "Saldo": saldo_corrente,
-                "Entrada": entradas,
-                "Saida": saidas,
-                "Descricao": ", ".join(detalhes)
-            })
-        
-        data_cursor += timedelta(days=1)
+                soma = df_metas_futuras['valor_meta'].sum() if not df_metas_futuras.empty else 0
+                if soma > 0:
+                    provisoes[(ano, mes)] = (soma, f"Provisão Metas (Orçamento Cheio): R$ {soma:.2f}")
 
-    df_proj = pd.DataFrame(timeline)
+    # --- MOTOR DE SIMULAÇÃO (dia a dia) ---
+    df_proj = simular_projecao(saldo_atual, df_fixas, df_faturas, hoje, data_fim, provisoes)
 
     # --- VISUALIZAÇÃO ---
     if df_proj.empty:
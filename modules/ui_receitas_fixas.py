@@ -6,6 +6,7 @@ from modules.database import (
     salvar_lancamento, atualizar_recorrencia, carregar_dados
 )
 from modules.constants import LISTA_CATEGORIAS_RECEITA
+from modules.calculos import descricoes_do_mes, recorrencia_quitada
 
 # ==============================================================================
 # 🎛️ PAINEL DE CONTROLE (CONFIGURAÇÕES DE UI & DESIGN)
@@ -62,7 +63,7 @@ def show_receitas_fixas():
     
     # Carrega recorrencias e filtra
     df_all = carregar_recorrencias(user_id)
-    df_fixas = df_all[df_all['tipo'] == 'Receita'].copy() if not df_all.empty else pd.DataFrame()
+    df_fixas = df_all[df_all['tipo'] == 'Receita'] if not df_all.empty else pd.DataFrame()
 
     # ===================================================
     # ABA 1: CONTROLE (MÊS ATUAL)
@@ -77,19 +78,12 @@ def show_receitas_fixas():
             st.subheader(f"Competência: {mes_atual}/{ano_atual}")
             
             # Verifica recebimentos feitos no mês
-            df_lancamentos = carregar_dados(user_id)
-            itens_recebidos = []
-            if not df_lancamentos.empty:
-                df_lancamentos['data'] = pd.to_datetime(df_lancamentos['data'])
-                mask = (df_lancamentos['data'].dt.month == mes_atual) & \
-                       (df_lancamentos['data'].dt.year == ano_atual) & \
-                       (df_lancamentos['tipo'] == "Receita")
-                itens_recebidos = df_lancamentos[mask]['descricao'].tolist()
+            itens_recebidos = descricoes_do_mes(carregar_dados(user_id), "Receita", mes_atual, ano_atual)
 
             # Prepara dados visuais
             status_list = []
             for _, row in df_fixas.iterrows():
-                ja_recebeu = any(row['nome'] in item for item in itens_recebidos)
+                ja_recebeu = recorrencia_quitada(row['nome'], itens_recebidos)
                 
                 status_list.append({
                     "id": row['id'], 
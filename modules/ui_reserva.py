@@ -6,8 +6,9 @@ from modules.database import (
     salvar_reserva_conta, carregar_reservas, salvar_transacao_reserva, 
     carregar_extrato_reserva, migrar_dados_antigos_para_reserva, 
     salvar_lancamento, excluir_reserva_conta, carregar_dados,
-    excluir_transacao_reserva, atualizar_transacao_reserva
+    excluir_transacao_reserva, atualizar_transacao_reserva, reconciliar_reservas
 )
+from modules.rendimentos import aplicar_rendimentos
 
 # ==============================================================================
 # 🎛️ PAINEL DE CONTROLE (CONFIGURAÇÕES DE UI & DESIGN)
@@ -46,6 +47,9 @@ CONFIG_UI = {
     }
 }
 
+# Linhas por página no extrato (paginação no banco)
+TAMANHO_PAGINA_EXTRATO = 50
+
 # --- CORES (SISTEMA HSL) ---
 CORES = {
     "positivo": "hsl(140, 100%, 30%)", # Verde Escuro
@@ -75,6 +79,33 @@ def show_reserva():
             else:
                 st.info("Nenhum lançamento antigo encontrado para migrar.")
 
+        st.divider()
+        st.write("Confere o saldo de cada reserva contra a soma do seu extrato.")
+        if st.button("🔍 Conferir Saldos"):
+            df_div = reconciliar_reservas(user_id)
+            if df_div.empty:
+                st.success("Todos os saldos conferem com o extrato.")
+            else:
+                st.warning(f"{len(df_div)} reserva(s) com saldo divergente.")
+                st.dataframe(df_div[['nome', 'saldo_atual', 'saldo_extrato']], use_container_width=True, hide_index=True)
+        if st.button("🛠️ Corrigir Saldos pelo Extrato"):
+            df_div = reconciliar_reservas(user_id, corrigir=True)
+            # Mostrado depois do rerun (senão a mensagem some junto com esta execução)
+            st.session_state['reserva_saldos_corrigidos'] = len(df_div)
+            st.rerun()
+        if 'reserva_saldos_corrigidos' in st.session_state:
+            st.success(f"{st.session_state.pop('reserva_saldos_corrigidos')} saldo(s) corrigido(s).")
+
+        st.divider()
+        st.write("Lança os rendimentos diários das reservas atreladas a CDI, Selic, IPCA ou Pré-fixado até ontem.")
+        if st.button("📈 Aplicar Rendimentos Automáticos"):
+            try:
+                with st.spinner("Calculando rendimentos..."):
+                    res = aplicar_rendimentos(user_id=user_id)
+                st.success(f"{res['lancamentos']} rendimento(s) lançados em {res['reservas']} reserva(s) - R$ {res['total']:,.2f}")
+            except Exception as e:
+                st.error(f"Erro ao buscar taxas dos índices: {e}")
+
     tab_visao, tab_operar, tab_config = st.tabs(["📊 Visão Geral", "💰 Movimentações", "⚙️ Configurar"])
 
     df_reservas = carregar_reservas(user_id)
@@ -91,7 +122,6 @@ def show_reserva():
             df_dash = carregar_dados(user_id)
             media_gastos = 0
             if not df_dash.empty:
-                df_dash['data'] = pd.to_datetime(df_dash['data'])
                 mask = (df_dash['data'] > pd.Timestamp.now() - pd.DateOffset(days=90)) & (df_dash['tipo'] == 'Despesa')
                 total_90d = df_dash[mask]['valor'].sum()
                 media_gastos = total_90d / 3 if total_90d > 0 else 0
@@ -177,25 +207,78 @@ def show_reserva():
                         st.success("Sucesso! Saldo atualizado.")
                         st.rerun()
         
-        # --- COLUNA DIREITA: EDITAR MOVIMENTAÇÕES ---
+        st.divider()
+        st.subheader("Extrato Geral")
+
+        # --- FILTROS (aplicados no banco) ---
+        f1, f2, f3 = st.columns([2, 1, 2])
+        opcoes_res = {"Todas": None}
+        if not df_reservas.empty:
+            opcoes_res.update({row['nome']: int(row['id']) for _, row in df_reservas.iterrows()})
+        filtro_res = f1.selectbox("Reserva", list(opcoes_res.keys()), key="ext_res")
+        filtro_tipo = f2.selectbox("Tipo", ["Todos", "Aporte", "Resgate", "Rendimento"], key="ext_tipo")
+        periodo = f3.date_input("Período", value=(), format="DD/MM/YYYY", key="ext_periodo")
+
+        data_ini = periodo[0] if len(periodo) >= 1 else None
+        data_fim = periodo[1] if len(periodo) == 2 else None
+        filtros = (opcoes_res[filtro_res], filtro_tipo, data_ini, data_fim)
+
+        # --- PAGINAÇÃO (keyset): pilha com o cursor (data, id) de cada página ---
+        if st.session_state.get('extrato_filtros') != filtros:
+            st.session_state['extrato_filtros'] = filtros
+            st.session_state['extrato_paginas'] = [None]
+        paginas = st.session_state['extrato_paginas']
+
+        df_extrato, tem_mais = carregar_extrato_reserva(
+            user_id,
+            reserva_id=opcoes_res[filtro_res],
+            tipo=None if filtro_tipo == "Todos" else filtro_tipo,
+            data_inicio=data_ini, data_fim=data_fim,
+            apos=paginas[-1], limite=TAMANHO_PAGINA_EXTRATO
+        )
+
+        # Tabela Extrato com Nomes Customizados
+        st.dataframe(
+            df_extrato[['data', 'nome_reserva', 'tipo', 'descricao', 'valor']], 
+            use_container_width=True,
+            column_config={
+                "data": st.column_config.DateColumn(CONFIG_UI["TABELA_EXTRATO"]["col_data"], format="DD/MM/YYYY"),
+                "nome_reserva": st.column_config.TextColumn(CONFIG_UI["TABELA_EXTRATO"]["col_reserva"]),
+                "tipo": st.column_config.TextColumn(CONFIG_UI["TABELA_EXTRATO"]["col_tipo"]),
+                "descricao": st.column_config.TextColumn(CONFIG_UI["TABELA_EXTRATO"]["col_desc"]),
+                "valor": st.column_config.NumberColumn(CONFIG_UI["TABELA_EXTRATO"]["col_valor"], format="R$ %.2f")
+            },
+            hide_index=True
+        )
+
+        p_ant, p_info, p_prox = st.columns([1, 2, 1])
+        if p_ant.button("◀ Anterior", disabled=len(paginas) == 1, key="ext_ant"):
+            paginas.pop()
+            st.rerun()
+        p_info.caption(f"Página {len(paginas)}")
+        if p_prox.button("Próxima ▶", disabled=not tem_mais, key="ext_prox"):
+            ultima = df_extrato.iloc[-1]
+            paginas.append((ultima['data'].date(), int(ultima['id'])))
+            st.rerun()
+
+        # --- COLUNA DIREITA: EDITAR MOVIMENTAÇÕES (da página exibida) ---
         with c_edit:
             st.subheader("✏️ Editar Movimentações Antigas")
-            st.caption("Alterar uma transação aqui recalcula o saldo da reserva automaticamente.")
+            st.caption("Alterar uma transação aqui recalcula o saldo da reserva automaticamente. Use os filtros do extrato para encontrar movimentações antigas.")
             
-            df_extrato = carregar_extrato_reserva(user_id)
             if df_extrato.empty:
                 st.info("Nenhuma movimentação para editar.")
             else:
-                # Cria lista de seleção
-                opcoes_trans = df_extrato.apply(
-                    lambda x: f"{x['data']} | {x['tipo']} | R$ {x['valor']:.2f} | {x['nome_reserva']}", axis=1
+                # Seleção por id; o rótulo só é montado para as linhas da página
+                trans_por_id = df_extrato.set_index('id')
+                sel_id = st.selectbox(
+                    "Selecione para Editar/Excluir:", [None] + trans_por_id.index.tolist(),
+                    format_func=lambda i: "Selecione..." if i is None else
+                        f"{trans_por_id.at[i, 'data'].date()} | {trans_por_id.at[i, 'tipo']} | R$ {trans_por_id.at[i, 'valor']:.2f} | {trans_por_id.at[i, 'nome_reserva']}"
                 )
-                sel_trans = st.selectbox("Selecione para Editar/Excluir:", ["Selecione..."] + list(opcoes_trans))
                 
-                if sel_trans != "Selecione...":
-                    idx = list(opcoes_trans).index(sel_trans)
-                    # Ajuste de índice pois o primeiro item é "Selecione..."
-                    item_edit = df_extrato.iloc[idx-1] 
+                if sel_id is not None:
+                    item_edit = trans_por_id.loc[sel_id]
                     
                     with st.form("form_edit_trans"):
                         st.write(f"Editando: **{item_edit['descricao']}**")
@@ -206,32 +289,15 @@ def show_reserva():
                         
                         c_s, c_d = st.columns([2, 1])
                         if c_s.form_submit_button("💾 Atualizar"):
-                            atualizar_transacao_reserva(user_id, int(item_edit['id']), nd, ndesc, nv)
+                            atualizar_transacao_reserva(user_id, int(sel_id), nd, ndesc, nv)
                             st.success("Atualizado!")
                             st.rerun()
                             
                         if c_d.form_submit_button("🗑️ Excluir"):
-                            excluir_transacao_reserva(user_id, int(item_edit['id']))
+                            excluir_transacao_reserva(user_id, int(sel_id))
                             st.success("Excluído!")
                             st.rerun()
 
-        st.divider()
-        st.subheader("Extrato Geral")
-        
-        # Tabela Extrato com Nomes Customizados
-        st.dataframe(
-            df_extrato[['data', 'nome_reserva', 'tipo', 'descricao', 'valor']], 
-            use_container_width=True,
-            column_config={
-                "data": st.column_config.DateColumn(CONFIG_UI["TABELA_EXTRATO"]["col_data"], format="DD/MM/YYYY"),
-                "nome_reserva": st.column_config.TextColumn(CONFIG_UI["TABELA_EXTRATO"]["col_reserva"]),
-                "tipo": st.column_config.TextColumn(CONFIG_UI["TABELA_EXTRATO"]["col_tipo"]),
-                "descricao": st.column_config.TextColumn(CONFIG_UI["TABELA_EXTRATO"]["col_desc"]),
-                "valor": st.column_config.NumberColumn(CONFIG_UI["TABELA_EXTRATO"]["col_valor"], format="R$ %.2f")
-            },
-            hide_index=True
-        )
-
     # --- ABA 3: CONFIGURAR (CRIAR/EXCLUIR RESERVAS) ---
     with tab_config:
         st.subheader("Criar Nova Reserva")
@@ -0,0 +1,77 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from modules import consultas_lentas  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def sem_intervalo(monkeypatch):
+    monkeypatch.setenv("EXPLAIN_INTERVALO_S", "0")
+    monkeypatch.setattr(consultas_lentas, "_ultimo_explain", {})
+
+
+@pytest.mark.parametrize("sql", [
+    "INSERT INTO lancamentos (user_id) VALUES (%s)",
+    "  update reservas SET saldo_atual = 0",
+    "DELETE FROM metas",
+    "",
+])
+def test_escrita_nao_e_explicada(sql):
+    assert not consultas_lentas._pode_explicar(sql, "f")
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT id FROM reservas WHERE id=%s AND user_id=%s FOR UPDATE",
+    "SELECT reserva_id FROM reserva_transacoes WHERE id=%s FOR NO KEY UPDATE",
+    "SELECT id FROM reservas ORDER BY id for share",
+    "SELECT id FROM reservas FOR KEY SHARE",
+    "WITH x AS (DELETE FROM metas RETURNING *) SELECT * FROM x",
+])
+def test_leitura_que_trava_ou_escreve_recebe_explain_sem_analyze(sql):
+    assert consultas_lentas._pode_explicar(sql, "f")
+    assert not consultas_lentas._usa_analyze(sql)
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM lancamentos WHERE user_id = %s",
+    "WITH base AS (SELECT 1) SELECT * FROM base",
+    "select atualizado_em, updated_at from reservas",
+])
+def test_leitura_simples_recebe_analyze(sql):
+    assert consultas_lentas._pode_explicar(sql, "f")
+    assert consultas_lentas._usa_analyze(sql)
+
+
+def test_intervalo_por_funcao(monkeypatch):
+    monkeypatch.setenv("EXPLAIN_INTERVALO_S", "300")
+    assert consultas_lentas._pode_explicar("SELECT 1", "f")
+    assert not consultas_lentas._pode_explicar("SELECT 1", "f")
+    assert consultas_lentas._pode_explicar("SELECT 1", "g")
+
+
+class _ConexaoFalsa:
+    def __init__(self):
+        self.executadas = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=None):
+        self.executadas.append(sql)
+
+    def fetchone(self):
+        return ["[]"]
+
+    def rollback(self):
+        pass
+
+
+def test_explain_sem_analyze_nao_executa_a_instrucao():
+    conn = _ConexaoFalsa()
+    consultas_lentas._explain(conn, "SELECT id FROM reservas FOR UPDATE", (), analyze=False)
+    assert conn.executadas[-1] == "EXPLAIN (FORMAT JSON) SELECT id FROM reservas FOR UPDATE"
@@ -0,0 +1,130 @@
+import io
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from modules import importador  # noqa: E402
+
+
+def _ofx(xml):
+    transacoes = []
+    for i in range(30):
+        campos = f"<TRNTYPE>DEBIT\n<DTPOSTED>202501{i % 28 + 1:02d}\n<TRNAMT>-{i}.50\n<FITID>{i:06d}\n<MEMO>Compra ção {i}\n"
+        if xml:
+            campos = campos.replace("\n<", "</X>\n<")
+        transacoes.append(f"<STMTTRN>\n{campos}" + ("</STMTTRN>\n" if xml else ""))
+    corpo = "OFXHEADER:100\n\n<OFX><BANKTRANLIST>\n" + "".join(transacoes) + "</BANKTRANLIST></OFX>\n"
+    return corpo.encode("latin-1")
+
+
+@pytest.mark.parametrize("xml", [False, True])
+@pytest.mark.parametrize("tamanho_pedaco", [1, 7, 9, 64, 4096])
+def test_ofx_em_pedacos_nao_perde_nem_corta_transacoes(xml, tamanho_pedaco):
+    dados = _ofx(xml)
+    inteiro = [importador._RE_CAMPO_OFX.findall(b) for b in importador._transacoes_ofx(io.BytesIO(dados), len(dados))]
+    em_pedacos = [importador._RE_CAMPO_OFX.findall(b) for b in importador._transacoes_ofx(io.BytesIO(dados), tamanho_pedaco)]
+    assert len(inteiro) == 30
+    assert em_pedacos == inteiro
+
+
+def test_ler_ofx_monta_os_lotes():
+    lote, = importador.ler_ofx(io.BytesIO(_ofx(False)))
+    assert len(lote) == 30
+    assert lote["fitid"].iloc[3] == "000003"
+    assert lote["descricao"].iloc[3] == "Compra ção 3"
+    assert lote["valor"].iloc[3] == pytest.approx(-3.5)
+
+# ==============================================================================
+# ✅ VALIDAÇÃO, FINGERPRINT E DEDUPLICAÇÃO
+# ==============================================================================
+
+PADROES = {
+    "conta": "Nubank", "forma_pagamento": "Pix", "status": "Pago/Recebido",
+    "categorias": {"Despesa": "Alimentação", "Receita": "Trabalho Extra"},
+    "subcategorias": {"Alimentação": "Restaurante", "Trabalho Extra": "Freelance"},
+}
+
+
+def _importar(dados, nome, tamanho_lote=importador.TAMANHO_LOTE):
+    relatorio = {}
+    lotes = list(importador.preparar_lotes(io.BytesIO(dados), nome, PADROES, relatorio, tamanho_lote))
+    validos = pd.concat(lotes, ignore_index=True) if lotes else pd.DataFrame(columns=importador.COLUNAS_IMPORTACAO)
+    return validos, relatorio
+
+
+def _ofx_transacoes(transacoes):
+    """transacoes: [(fitid ou None, dia, valor, memo)]"""
+    blocos = []
+    for fitid, dia, valor, memo in transacoes:
+        blocos.append(f"<STMTTRN>\n<DTPOSTED>202501{dia:02d}\n<TRNAMT>{valor}\n"
+                      + (f"<FITID>{fitid}\n" if fitid else "") + f"<MEMO>{memo}\n")
+    return ("<OFX><BANKTRANLIST>\n" + "".join(blocos) + "</BANKTRANLIST></OFX>\n").encode("latin-1")
+
+
+TRANSACOES = [("A1", 2, "-10.00", "Padaria"), (None, 3, "-20.00", "Mercado"), ("A3", 4, "-30.00", "Posto"),
+              ("A4", 5, "-40.00", "Farmácia"), (None, 6, "-50.00", "Feira"), ("A6", 7, "-60.00", "Cinema")]
+
+
+def _hashes_por_memo(validos):
+    return dict(zip(validos["descricao"], validos["hash_importacao"]))
+
+
+def test_fingerprint_por_linha_nao_depende_dos_lotes():
+    inteiro, _ = _importar(_ofx_transacoes(TRANSACOES), "extrato.ofx")
+    for tamanho_lote in (1, 2, 4):
+        em_lotes, _ = _importar(_ofx_transacoes(TRANSACOES), "extrato.ofx", tamanho_lote)
+        assert _hashes_por_memo(em_lotes) == _hashes_por_memo(inteiro)
+
+
+def test_extratos_sobrepostos_nao_duplicam():
+    # O segundo extrato começa no meio do primeiro: os lotes caem em lugares diferentes
+    primeiro, _ = _importar(_ofx_transacoes(TRANSACOES[:4]), "jan1.ofx", tamanho_lote=2)
+    segundo, _ = _importar(_ofx_transacoes(TRANSACOES[1:]), "jan2.ofx", tamanho_lote=2)
+    comuns = set(primeiro["hash_importacao"]) & set(segundo["hash_importacao"])
+    assert comuns == {_hashes_por_memo(primeiro)[memo] for memo in ("Mercado", "Posto", "Farmácia")}
+
+
+def test_fitid_identifica_mesmo_com_descricao_diferente():
+    a, _ = _importar(_ofx_transacoes([("X9", 2, "-10.00", "PADARIA CENTRAL")]), "a.ofx")
+    b, _ = _importar(_ofx_transacoes([("X9", 2, "-10.00", "Padaria Central Ltda")]), "b.ofx")
+    assert a["hash_importacao"].tolist() == b["hash_importacao"].tolist()
+
+
+def test_csv_reimportado_gera_os_mesmos_hashes_e_repeticoes_continuam_distintas():
+    csv = ("data;descricao;valor\n"
+           "02/01/2025;Café;-5,00\n"
+           "02/01/2025;Café;-5,00\n"
+           "03/01/2025;Salário;1.500,00\n").encode("utf-8")
+    primeira, _ = _importar(csv, "extrato.csv")
+    segunda, _ = _importar(csv, "extrato.csv", tamanho_lote=1)
+    assert primeira["hash_importacao"].tolist() == segunda["hash_importacao"].tolist()
+    assert primeira["hash_importacao"].nunique() == 3
+    assert primeira["tipo"].tolist() == ["Despesa", "Despesa", "Receita"]
+    assert primeira["valor"].tolist() == [5.0, 5.0, 1500.0]
+
+
+def test_validacao_rejeita_com_motivo():
+    csv = ("data;descricao;valor;categoria\n"
+           "02/01/2025;ok;-5,00;\n"
+           "xx/01/2025;sem data;-5,00;\n"
+           "02/01/2025;sem valor;abc;\n"
+           "02/01/2025;zero;0;\n"
+           "02/01/2025;categoria;-5,00;Inexistente\n").encode("utf-8")
+    validos, relatorio = _importar(csv, "extrato.csv")
+    assert validos["descricao"].tolist() == ["ok"]
+    assert (relatorio["lidas"], relatorio["rejeitadas"]) == (5, 4)
+    motivos = pd.concat(relatorio["amostra_rejeitadas"]).set_index("descricao")["motivo"].to_dict()
+    assert motivos == {"sem data": "Data inválida", "sem valor": "Valor inválido",
+                       "zero": "Valor inválido", "categoria": "Categoria inválida"}
+
+
+def test_amostra_de_rejeitadas_limitada_em_linhas():
+    csv = ("data;descricao;valor\n" + "".join(f"xx;linha {i};-1,00\n" for i in range(350))).encode("utf-8")
+    _, relatorio = _importar(csv, "extrato.csv", tamanho_lote=30)
+    assert relatorio["rejeitadas"] == 350
+    assert sum(len(a) for a in relatorio["amostra_rejeitadas"]) == importador.AMOSTRA_REJEITADAS
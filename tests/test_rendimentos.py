@@ -0,0 +1,204 @@
+import glob
+import os
+import shutil
+import sys
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from modules import rendimentos  # noqa: E402
+
+# ==============================================================================
+# 🐘 BANCO
+# ==============================================================================
+# TEST_DATABASE_URL aponta para um banco vazio de testes; sem ela, sobe o
+# Postgres descartável dos benchmarks (precisa de initdb/pg_ctl).
+
+def _tem_postgres():
+    return shutil.which("initdb") or glob.glob("/usr/lib/postgresql/*/bin/initdb")
+
+
+@pytest.fixture(scope="module")
+def dsn():
+    if os.environ.get("TEST_DATABASE_URL"):
+        yield os.environ["TEST_DATABASE_URL"]
+        return
+    if not _tem_postgres():
+        pytest.skip("sem Postgres: defina TEST_DATABASE_URL ou instale initdb/pg_ctl")
+    from benchmarks import banco
+    with banco.postgres_temporario(banco.PORTA_PADRAO + 1) as dsn_temporario:
+        yield dsn_temporario
+
+
+@pytest.fixture
+def reserva_cdi(dsn, monkeypatch):
+    """(user_id, reserva_id) de uma reserva 100% do CDI com R$ 10.000 aportados em 02/01/2026."""
+    monkeypatch.setenv("DATABASE_URL", dsn)
+    from modules import database
+    database.init_db()
+    conn = database.get_connection("teste")
+    c = conn.cursor()
+    c.execute("INSERT INTO users (username, password_hash, name) VALUES (%s, 'x', 'Teste') RETURNING id",
+              (f"rend_{os.urandom(4).hex()}",))
+    user_id = c.fetchone()[0]
+    c.execute("INSERT INTO reservas (user_id, nome, indice, taxa) VALUES (%s, 'CDB', 'CDI', 100) RETURNING id",
+              (user_id,))
+    reserva_id = c.fetchone()[0]
+    c.execute("INSERT INTO reserva_transacoes (user_id, reserva_id, data, tipo, valor) VALUES (%s, %s, %s, 'Aporte', 10000)",
+              (user_id, reserva_id, date(2026, 1, 2)))
+    conn.commit()
+    conn.close()
+    return user_id, reserva_id
+
+
+def _dias_com_rendimento(reserva_id):
+    from modules import database
+    conn = database.get_connection("teste")
+    c = conn.cursor()
+    c.execute("SELECT data FROM reserva_transacoes WHERE reserva_id = %s AND origem = 'auto' ORDER BY data", (reserva_id,))
+    dias = [r[0] for r in c.fetchall()]
+    conn.close()
+    return dias
+
+# ==============================================================================
+# 🔁 RECUPERAÇÃO DE DIAS PARADOS
+# ==============================================================================
+
+def test_recuperacao_completa_os_dias_sem_rendimento(reserva_cdi):
+    user_id, reserva_id = reserva_cdi
+    provedor = rendimentos.ProvedorFalso()
+    rendimentos.aplicar_rendimentos(date(2026, 1, 7), date(2026, 1, 5), user_id, provedor)
+    assert _dias_com_rendimento(reserva_id) == [date(2026, 1, 5), date(2026, 1, 6), date(2026, 1, 7)]
+
+    # Como a página da reserva chama: sem data_inicio, depois de dias parado
+    rendimentos.aplicar_rendimentos(date(2026, 1, 12), user_id=user_id, provedor=provedor)
+    assert _dias_com_rendimento(reserva_id) == [
+        date(2026, 1, 5), date(2026, 1, 6), date(2026, 1, 7),
+        date(2026, 1, 8), date(2026, 1, 9), date(2026, 1, 12),
+    ]
+
+    # Rodar de novo não duplica nada
+    assert rendimentos.aplicar_rendimentos(date(2026, 1, 12), user_id=user_id, provedor=provedor)["lancamentos"] == 0
+
+# ==============================================================================
+# 🧮 CÁLCULO EM BLOCOS
+# ==============================================================================
+
+def test_blocos_limitam_a_matriz_sem_mudar_o_resultado(monkeypatch):
+    rng = np.random.default_rng(1)
+    n = 40
+    fim = date(2025, 12, 31)
+    df_res = pd.DataFrame({
+        "id": np.arange(1, n + 1), "user_id": rng.integers(1, 5, n),
+        "indice": rng.choice(["CDI", "Selic", "IPCA", "Pré-fixado"], n), "taxa": rng.uniform(1, 120, n),
+        "inicio": pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 300, n), "D"),
+        "saldo_inicial": rng.uniform(0, 50_000, n),
+    })
+    df_mov = pd.DataFrame({
+        "reserva_id": rng.integers(1, n + 1, 500),
+        "data": pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 365, 500), "D"),
+        "valor": rng.uniform(-500, 1000, 500),
+    }).groupby(["reserva_id", "data"], as_index=False)["valor"].sum()
+    # Como carregar_base_rendimentos: só movimentos a partir do início de cada reserva
+    inicio = df_mov["reserva_id"].map(df_res.set_index("id")["inicio"])
+    df_mov = df_mov[df_mov["data"] >= inicio]
+    df_taxas = pd.concat([
+        rendimentos.ProvedorFalso().obter(i, date(2025, 1, 1), fim).assign(indice=i) for i in ("CDI", "Selic", "IPCA")
+    ])
+
+    inteiro = rendimentos.calcular_rendimentos(df_res, df_mov, df_taxas, fim)
+    monkeypatch.setattr(rendimentos, "MAX_CELULAS_MATRIZ", 500)
+    blocos = list(rendimentos._blocos(df_res, fim))
+    assert len(blocos) > 1
+    assert all(len(b) * ((pd.Timestamp(fim) - b["inicio"].min()).days + 1) <= 500 or len(b) == 1 for b in blocos)
+    em_blocos = rendimentos.calcular_rendimentos(df_res, df_mov, df_taxas, fim)
+
+    chave = ["reserva_id", "data"]
+    pd.testing.assert_frame_equal(
+        inteiro.sort_values(chave).reset_index(drop=True), em_blocos.sort_values(chave).reset_index(drop=True)
+    )
+
+# ==============================================================================
+# 📅 DIAS SEM TAXA PUBLICADA
+# ==============================================================================
+
+class ProvedorAte(rendimentos.ProvedorFalso):
+    """Taxas constantes, mas só publicadas até `ate` (como o IPCA do mês corrente)."""
+
+    def __init__(self, ate):
+        super().__init__()
+        self.ate = pd.Timestamp(ate)
+
+    def obter(self, indice, data_inicio, data_fim):
+        df = super().obter(indice, data_inicio, data_fim)
+        return df[df["data"] <= self.ate]
+
+
+def _reserva(indice, taxa=6.0, inicio="2026-01-02", saldo=10_000.0, id_=1):
+    return pd.DataFrame({"id": [id_], "user_id": [1], "indice": [indice], "taxa": [taxa],
+                         "inicio": [pd.Timestamp(inicio)], "saldo_inicial": [saldo]})
+
+
+def _sem_movimentos():
+    return pd.DataFrame({"reserva_id": pd.Series(dtype=int), "data": pd.Series(dtype="datetime64[ns]"),
+                         "valor": pd.Series(dtype=float)})
+
+
+def test_ipca_do_mes_sem_taxa_nao_gera_rendimento():
+    df_taxas = ProvedorAte("2026-01-31").obter("IPCA", date(2026, 1, 1), date(2026, 2, 20)).assign(indice="IPCA")
+    df = rendimentos.calcular_rendimentos(_reserva("IPCA"), _sem_movimentos(), df_taxas, date(2026, 2, 20))
+    assert not df.empty
+    assert max(df["data"]) <= date(2026, 1, 31)
+
+
+def test_mes_do_ipca_faltando_no_meio_interrompe_a_reserva():
+    provedor = rendimentos.ProvedorFalso()
+    df_taxas = pd.concat([
+        provedor.obter("IPCA", date(2026, 1, 1), date(2026, 1, 31)),
+        provedor.obter("IPCA", date(2026, 3, 1), date(2026, 3, 31)),
+    ]).assign(indice="IPCA")
+    df = rendimentos.calcular_rendimentos(_reserva("IPCA"), _sem_movimentos(), df_taxas, date(2026, 3, 31))
+    assert max(df["data"]) <= date(2026, 1, 31)
+
+
+def test_cdi_para_no_ultimo_dia_publicado_e_pre_fixado_segue():
+    df_taxas = ProvedorAte("2026-01-09").obter("CDI", date(2026, 1, 1), date(2026, 1, 20)).assign(indice="CDI")
+    df_res = pd.concat([_reserva("CDI", 100), _reserva("Pré-fixado", 12, id_=2)], ignore_index=True)
+    df = rendimentos.calcular_rendimentos(df_res, _sem_movimentos(), df_taxas, date(2026, 1, 20))
+    ultimo = df.groupby("reserva_id")["data"].max()
+    assert ultimo[1] == date(2026, 1, 9)
+    assert ultimo[2] == date(2026, 1, 20)
+
+
+def test_ipca_atrasado_entra_na_execucao_seguinte(dsn, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", dsn)
+    from modules import database
+    database.init_db()
+    conn = database.get_connection("teste")
+    c = conn.cursor()
+    c.execute("DELETE FROM indices_taxas WHERE indice = 'IPCA'")
+    c.execute("INSERT INTO users (username, password_hash, name) VALUES (%s, 'x', 'Teste') RETURNING id",
+              (f"ipca_{os.urandom(4).hex()}",))
+    user_id = c.fetchone()[0]
+    c.execute("INSERT INTO reservas (user_id, nome, indice, taxa) VALUES (%s, 'IPCA+', 'IPCA', 6) RETURNING id",
+              (user_id,))
+    reserva_id = c.fetchone()[0]
+    c.execute("INSERT INTO reserva_transacoes (user_id, reserva_id, data, tipo, valor) VALUES (%s, %s, %s, 'Aporte', 10000)",
+              (user_id, reserva_id, date(2026, 1, 2)))
+    conn.commit()
+    conn.close()
+
+    # Fevereiro ainda não publicado: nada de fevereiro é gravado
+    rendimentos.aplicar_rendimentos(date(2026, 2, 20), date(2026, 1, 5), user_id, ProvedorAte("2026-01-31"))
+    assert max(_dias_com_rendimento(reserva_id)) == date(2026, 1, 30)
+
+    # Publicado: a execução seguinte completa fevereiro a partir de onde parou
+    rendimentos.aplicar_rendimentos(date(2026, 2, 20), user_id=user_id, provedor=rendimentos.ProvedorFalso())
+    dias = _dias_com_rendimento(reserva_id)
+    assert [d for d in dias if d.month == 2] == [d.date() for d in pd.bdate_range("2026-02-02", "2026-02-20")]
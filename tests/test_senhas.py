@@ -0,0 +1,54 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from modules import senhas  # noqa: E402
+
+
+@pytest.fixture
+def contexto(monkeypatch):
+    """Simula st.context com o IP da conexão e o X-Forwarded-For recebido."""
+    def definir(encaminhado=None, ip="10.0.0.9"):
+        headers = {"X-Forwarded-For": encaminhado} if encaminhado else {}
+        monkeypatch.setattr(senhas, "st", SimpleNamespace(context=SimpleNamespace(headers=headers, ip_address=ip)))
+    monkeypatch.delenv("PROXIES_CONFIAVEIS", raising=False)
+    return definir
+
+
+def test_sem_proxy_configurado_usa_o_ip_da_conexao(contexto):
+    contexto("1.2.3.4")
+    assert senhas.ip_cliente() == "10.0.0.9"
+
+
+@pytest.mark.parametrize("proxies, esperado", [("1", "200.1.1.1"), ("2", "1.2.3.4")])
+def test_x_forwarded_for_lido_da_direita(contexto, monkeypatch, proxies, esperado):
+    monkeypatch.setenv("PROXIES_CONFIAVEIS", proxies)
+    contexto("forjado, 1.2.3.4, 200.1.1.1")
+    assert senhas.ip_cliente() == esperado
+
+
+def test_cliente_nao_escapa_do_limite_trocando_o_x_forwarded_for(contexto, monkeypatch):
+    monkeypatch.setenv("PROXIES_CONFIAVEIS", "1")
+    balde = senhas.BaldeFichas(capacidade=3, reposicao=0)
+    permitidas = 0
+    for i in range(10):
+        contexto(f"9.9.9.{i}, 200.1.1.1")
+        permitidas += balde.consumir(senhas.ip_cliente())
+    assert permitidas == 3
+
+
+def test_balde_descarta_o_usado_ha_mais_tempo():
+    balde = senhas.BaldeFichas(capacidade=2, reposicao=0, max_baldes=3)
+    balde.consumir("a")
+    balde.consumir("a")
+    for chave in ("b", "c", "a", "d"):
+        balde.consumir(chave)
+    assert list(balde.baldes) == ["c", "a", "d"]
+    # "a" continua esgotado; "b" saiu e recomeça cheio
+    assert not balde.consumir("a")
+    assert balde.consumir("b")
@@ -0,0 +1,51 @@
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from modules import sessao_assinada  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def segredo(monkeypatch):
+    monkeypatch.setenv("SESSION_MODE", "assinado")
+    monkeypatch.setenv("SESSION_SECRET", "segredo-de-teste")
+
+
+def _token(expira_em=timedelta(hours=1)):
+    token, _ = sessao_assinada.gerar_token(7, "Ana", "ana", datetime.now() + expira_em)
+    return token
+
+
+def test_token_valido_devolve_payload():
+    payload = sessao_assinada.ler_token(_token())
+    assert (payload["uid"], payload["usr"]) == (7, "ana")
+
+
+def test_token_expirado_ou_adulterado_e_rejeitado():
+    assert sessao_assinada.ler_token(_token(timedelta(seconds=-1))) is None
+    prefixo, corpo, assinatura = _token().split(".")
+    assert sessao_assinada.ler_token(f"{prefixo}.{corpo}x.{assinatura}") is None
+    assert sessao_assinada.ler_token(f"{prefixo}.{corpo}.{assinatura[:-2]}AA") is None
+
+
+@pytest.mark.parametrize("cookie", [
+    "v1.abc.é",          # assinatura não ASCII
+    "v1.é.x",            # corpo não ASCII
+    "v1.ção.ção",
+    "v1.abc",            # partes faltando
+    "v1.a.b.c",          # partes sobrando
+    "v1.\x00.\x00",
+])
+def test_cookie_malformado_e_rejeitado_sem_excecao(cookie):
+    assert sessao_assinada.ler_token(cookie) is None
+
+
+def test_validar_sessao_rejeita_cookie_nao_ascii():
+    from modules import database
+    assert database.validar_sessao("v1.abc.é") is None
+    assert database.validar_sessao("v1.é.x") is None